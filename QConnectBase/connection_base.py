@@ -29,16 +29,19 @@
 # *******************************************************************************
 from abc import ABCMeta
 from inspect import currentframe
-from collections import deque
 from robot.libraries.BuiltIn import BuiltIn
-from QConnectBase.qlogger import QLogger
+from QConnectBase.connection_metrics import ConnectionMetrics
+from QConnectBase.qlogger import QAsyncHandler, QLogger
+from QConnectBase.robot_log import TraceLogForwarder, robot_log
+from QConnectBase.trace_archive import TraceArchiveWriter
+from QConnectBase.trace_database import TraceDatabaseWriter
+from QConnectBase.trace_dispatcher import TraceAggregator, TraceCounter, TraceFilter, TraceFilterRegistry, TraceHandoffBuffer, TraceHistory, TraceQueue, compile_pattern, monotonic_ns_to_wall_time
 import QConnectBase.constants as constants
 import queue
 import abc
 import time
 import platform
 import threading
-import re
 
 _platform = platform.system().lower()
 
@@ -61,6 +64,12 @@ Base class for all connection classes.
 
    RECV_MSGS_POLLING_INTERVAL = 0.005
 
+   # Maximum time the receiver thread blocks without any signal from an event driven connection.
+   RECV_IDLE_TIMEOUT = 1.0
+
+   # True if the connection calls _notify_receiver() whenever new data is available for _read().
+   _EVENT_DRIVEN_READ = False
+
    _call_thrd_obj = None
    _call_thrd_init = threading.Event()
    _call_thrd_term = threading.Event()
@@ -69,12 +78,16 @@ Base class for all connection classes.
    # _recv_thrd_term = threading.Event()
    _recv_thrd_term = None
 
+   _dispatch_thrd_obj = None
+   _trace_handoff = None
+   _trace_history = None
+
    _force_seq_lock = threading.RLock()
    _start_dlt_lock = threading.RLock()
 
-   _traceq_handle = 0
-   _traceq_obj = {}
-   _traceq_lock = threading.Lock()
+   # Trace filters in the global scope receive the traces of all connections.
+   # Each connection instance has its own registry in _trace_registry.
+   _global_trace_registry = TraceFilterRegistry(constants.TRACE_SCOPE_GLOBAL)
 
    supported_devices = []
 
@@ -89,6 +102,9 @@ Base class for all connection classes.
 
    _logger = None
    _logger_handler = None
+   _trace_log_forwarder = None
+   _trace_archive = None
+   _trace_database = None
    config = None
    def __new__(cls, *args, **kwargs):
       """
@@ -117,7 +133,14 @@ Override creating instance method to check for conditions.
       """
       if (not cls.is_supported_platform()) or (not cls.is_precondition_pass()):
          return None
-      return super(ConnectionBase, cls).__new__(cls)
+      instance = super(ConnectionBase, cls).__new__(cls)
+      instance._trace_registry = TraceFilterRegistry(constants.TRACE_SCOPE_CONNECTION)
+      instance._recv_data_ready = threading.Event()
+      instance._expectations = {}
+      instance._trace_counters = {}
+      instance._trace_aggregators = {}
+      instance._metrics = ConnectionMetrics()
+      return instance
 
    # region GENERAL METHODS
    @classmethod
@@ -196,7 +219,67 @@ Abstract method for quiting the connection.
 
 (*no returns*)
       """
+      self._stop_receiver_threads()
+      if self._trace_log_forwarder is not None:
+         self._trace_log_forwarder.close()
+      if self._trace_archive is not None:
+         self._trace_archive.close()
+         self._trace_archive = None
+      if self._trace_database is not None:
+         if self._trace_database.dropped > 0:
+            BuiltIn().log("%s: %d traces were not stored in the trace database because its queue was full."
+                          % (self.__class__.__name__, self._trace_database.dropped), constants.LOG_LEVEL_WARNING)
+         if not self._trace_database.close():
+            BuiltIn().log("%s: The trace database is incomplete, %d traces were not inserted. Reason: %s"
+                          % (self.__class__.__name__, self._trace_database.failed, self._trace_database.error), constants.LOG_LEVEL_WARNING)
+         self._trace_database = None
+      if self._logger_handler is None:
+         return
       self._logger.removeHandler(self._logger_handler)
+      # closing the handler writes the last log segment and waits for its compression and index entry
+      self._logger_handler.close()
+      if isinstance(self._logger_handler, QAsyncHandler):
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         log_stats = self._logger_handler.get_statistics()
+         if log_stats['dropped'] > 0:
+            BuiltIn().log("%s: %d trace log records of '%s' were dropped because the log queue was full (%d written)."
+                          % (_mident, log_stats['dropped'], self._logger.name, log_stats['written']), constants.LOG_LEVEL_WARNING)
+         else:
+            BuiltIn().log("%s: %d trace log records of '%s' were written." % (_mident, log_stats['written'], self._logger.name), constants.LOG_LEVEL_INFO)
+
+   def _stop_receiver_threads(self, timeout=constants.RECV_THREAD_STOP_TIMEOUT):
+      """
+Stop the receiver thread, then let the dispatch thread process the lines which were already read and stop it.
+Must be called before the trace log, archive and database are closed, so they get all received lines.
+
+**Arguments:**
+
+* ``timeout``
+
+  / *Condition*: optional / *Type*: float / *Default*: 5 /
+
+  Maximum time in seconds to wait for each thread.
+
+**Returns:**
+
+(*no returns*)
+      """
+      if self._recv_thrd_obj is not None and self._recv_thrd_obj.is_alive():
+         self._recv_thrd_term.set()
+         if getattr(self, '_recv_thrd_start', None) is not None:
+            # release a receiver thread which is still waiting for the start
+            self._recv_thrd_start.set()
+         self._notify_receiver()
+         self._recv_thrd_obj.join(timeout)
+      if self._trace_handoff is not None:
+         # the receiver thread closes the buffer when it terminates, close it as well if it didn't terminate in time
+         self._trace_handoff.close()
+      if self._dispatch_thrd_obj is not None and self._dispatch_thrd_obj.is_alive():
+         self._dispatch_thrd_obj.join(timeout)
+         if self._dispatch_thrd_obj.is_alive():
+            _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+            BuiltIn().log("%s: dispatch thread '%s' didn't terminate within %s seconds, %d received lines are not processed."
+                          % (_mident, self._dispatch_thrd_obj.name, timeout, len(self._trace_handoff)), constants.LOG_LEVEL_WARNING)
 
    @abc.abstractmethod
    def connect(self, device, files=None, test_connection=False):
@@ -288,7 +371,8 @@ The thread which receive message from connection continuously.
 
    def _init_thread_receiver(self, thread_id, mode=None, sync_with_start=False):
       """
-Initialize a thread for receiving data from connection.
+Initialize the receiver pipeline of the connection: a receiver thread which only reads messages from connection and
+hands them over to a dispatch thread, which logs them and matches them with the trace filters.
 
 **Arguments:**
 
@@ -322,11 +406,27 @@ Initialize a thread for receiving data from connection.
       self._logger = QLogger().get_logger(conn_id_name)
       self._logger_handler = QLogger().set_handler(self.config)
       self._recv_thrd_term = threading.Event()
+      self._trace_handoff = TraceHandoffBuffer()
+      history_size = int(getattr(self.config, 'trace_history_size', constants.TRACE_HISTORY_DEFAULT_SIZE))
+      self._trace_history = TraceHistory(max(history_size, self.MAX_LEN_BACKTRACE))
+      self._trace_log_forwarder = TraceLogForwarder(getattr(self, 'connection_name', conn_id_name),
+                                                    getattr(self.config, 'robot_log_policy', constants.RobotLogPolicy.FULL),
+                                                    getattr(self.config, 'robot_log_sample_rate', constants.ROBOT_LOG_DEFAULT_SAMPLE_RATE),
+                                                    getattr(self.config, 'robot_log_rate_limit', constants.ROBOT_LOG_DEFAULT_RATE_LIMIT))
+      if getattr(self.config, 'trace_archive', None):
+         self._trace_archive = TraceArchiveWriter.open(self.config.trace_archive,
+                                                       getattr(self.config, 'trace_archive_index_interval', constants.TRACE_ARCHIVE_INDEX_INTERVAL))
+      if getattr(self.config, 'trace_database', None):
+         self._trace_database = TraceDatabaseWriter.open(self.config.trace_database)
+      self._dispatch_thrd_obj = threading.Thread(target=self._thread_dispatch_traces)
+      self._dispatch_thrd_obj.setDaemon(True)
+      self._dispatch_thrd_obj.name = conn_id_name + "-dispatch"
       self._recv_thrd_obj = threading.Thread(target=self._thread_receive_from_connection, kwargs=dict(sync_with_start=sync_with_start))
       self._recv_thrd_obj.setDaemon(True)
 
       self._recv_thrd_obj.name = conn_id_name
       BuiltIn().log("%s: starting receiver thread '%s'" % (_mident, self._recv_thrd_obj.name))
+      self._dispatch_thrd_obj.start()
       self._recv_thrd_obj.start()
 
    def _thread_receive_from_connection(self, sync_with_start=False):
@@ -347,57 +447,287 @@ Thread to receive data from connection continuously.
       """
       _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
       if sync_with_start is True:
-         BuiltIn().log("%s: receiver thread is waiting to start." % _mident, constants.LOG_LEVEL_DEBUG)
-         while not self._recv_thrd_start.isSet():
-            time.sleep(self.__class__.RECV_MSGS_POLLING_INTERVAL)
+         robot_log.log("%s: receiver thread is waiting to start." % _mident, constants.LOG_LEVEL_DEBUG)
+         self._recv_thrd_start.wait()
 
-      BuiltIn().log("%s: receiver thread started." % _mident, constants.LOG_LEVEL_DEBUG)
+      robot_log.log("%s: receiver thread started." % _mident, constants.LOG_LEVEL_DEBUG)
       while not self._recv_thrd_term.isSet():
+         # Clear before reading, so data signaled while reading wakes up the wait below immediately.
+         self._recv_data_ready.clear()
+         msg = None
          try:
+            read_start_ns = time.monotonic_ns()
             msg = self.read_obj()
+            timestamp_ns = time.monotonic_ns()
             if self._should_check_timeout:
                self.check_timeout(msg)
 
             if msg is not None:
                self._should_check_timeout = False
-               self.pre_msg_check(msg)
-               BuiltIn().log(msg, constants.LOG_LEVEL_INFO)
-               if self._logger:
-                  self._logger.info(msg)
-               # with self._msgq_c_lock:
-               #    now = time.time()
-               #    for q in self._msgq_c_obj.values():
-               #       q.put((now, msg), False)
-
-               with self.__class__._traceq_lock:
-                  if self.__class__._traceq_obj:
-                     for (regex_filter, msg_queue, back_trace_queue, use_fetch_block, regex_end_block_pattern, regex_line_filter) in self.__class__._traceq_obj.values():
-                        is_hit = False
-                        result_obj = None
-                        if use_fetch_block is True:
-                           matchObj = regex_line_filter.search(msg)
-                           if matchObj is not None:
-                              back_trace_queue.append(msg)
-                              (is_hit, result_obj) = self._filter_msg(regex_end_block_pattern, msg)
-                        else:
-                           (is_hit, result_obj) = self._filter_msg(regex_filter, msg)
-                        if is_hit:
-                           now = time.time()
-                           if use_fetch_block is True:
-                              result_obj = regex_filter.search("\r\n".join(back_trace_queue))
-                              back_trace_queue.clear()
-                           msg_queue.put((now, result_obj), False)
-               self.post_msg_check(msg)
+               self._metrics.add_received(msg, timestamp_ns - read_start_ns, timestamp_ns)
+               self._trace_handoff.push(msg, timestamp_ns)
          except BrokenConnError as reason:
-            BuiltIn().log("%s: %s" % (_mident, reason), constants.LOG_LEVEL_DEBUG)
+            robot_log.log("%s: %s" % (_mident, reason), constants.LOG_LEVEL_DEBUG)
+            self._metrics.broken += 1
             self._broken_conn.set()
             break
          except Exception as reason:
-            BuiltIn().log("%s: %s" % (_mident, reason), constants.LOG_LEVEL_WARNING)
-         time.sleep(self.__class__.RECV_MSGS_POLLING_INTERVAL)
+            robot_log.log("%s: %s" % (_mident, reason), constants.LOG_LEVEL_WARNING)
+
+         # Drain all available messages without delay, only wait when the connection has nothing to deliver.
+         if msg is None:
+            self._wait_for_data()
 
+      self._trace_handoff.close()
       self._recv_thrd_term.clear()
-      BuiltIn().log("%s: receiver thread terminated." % _mident, constants.LOG_LEVEL_DEBUG)
+      robot_log.log("%s: receiver thread terminated." % _mident, constants.LOG_LEVEL_DEBUG)
+
+   def _thread_dispatch_traces(self):
+      """
+Thread to process the messages handed over by the receiver thread. All pending messages are taken in one batch,
+so a slow trace filter or log handler delays the processing but never the reading from connection.
+
+**Returns:**
+
+(*no returns*)
+      """
+      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+      robot_log.log("%s: dispatch thread started." % _mident, constants.LOG_LEVEL_DEBUG)
+      handoff = self._trace_handoff
+      while True:
+         batch = handoff.pop_batch()
+         if not batch:
+            if handoff.closed:
+               break
+            handoff.wait(self.RECV_IDLE_TIMEOUT)
+            continue
+
+         for timestamp_ns, msg in batch:
+            try:
+               self._process_msg(msg, timestamp_ns)
+            except Exception as reason:
+               robot_log.log("%s: %s" % (_mident, reason), constants.LOG_LEVEL_WARNING)
+         handoff.complete_batch(batch)
+      robot_log.log("%s: dispatch thread terminated." % _mident, constants.LOG_LEVEL_DEBUG)
+
+   def _process_msg(self, msg, timestamp_ns=None):
+      """
+Log a received message and dispatch it to the trace filters. The message is written into the trace log file and the
+trace archive and database if configured, and forwarded to the Robot Framework log according to the Robot log policy of the connection.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Received message.
+
+* ``timestamp_ns``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Monotonic time in nanoseconds when the message was read from the connection. None for the current time.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self.pre_msg_check(msg)
+      log_start_ns = time.perf_counter_ns()
+      if self._logger:
+         self._logger.info(msg)
+      if self._trace_archive is not None or self._trace_database is not None:
+         if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+         connection_name = getattr(self, 'connection_name', self._recv_thrd_obj.name)
+         if self._trace_archive is not None:
+            self._trace_archive.write(connection_name, msg, timestamp_ns)
+         if self._trace_database is not None:
+            self._trace_database.write(connection_name, msg, monotonic_ns_to_wall_time(timestamp_ns))
+      if timestamp_ns is not None:
+         self._metrics.dispatch_delay.record(time.monotonic_ns() - timestamp_ns)
+      dispatch_start_ns = time.perf_counter_ns()
+      matched = self._dispatch_trace(msg, timestamp_ns)
+      dispatch_end_ns = time.perf_counter_ns()
+      if self._trace_log_forwarder is not None:
+         self._trace_log_forwarder.forward(msg, matched)
+      else:
+         robot_log.info(msg)
+      metrics = self._metrics
+      metrics.dispatch_ns += dispatch_end_ns - dispatch_start_ns
+      metrics.log_ns += dispatch_start_ns - log_start_ns + time.perf_counter_ns() - dispatch_end_ns
+      if matched:
+         metrics.matches += 1
+      self.post_msg_check(msg)
+
+   def get_trace_history(self, n_lines=None):
+      """
+Get the recently received messages from the trace history of the connection.
+
+**Arguments:**
+
+* ``n_lines``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Number of the latest messages to get. None for all messages in the history.
+
+**Returns:**
+
+  / *Type*: list /
+
+  List of (receive timestamp, message) tuples, the oldest message first. The timestamp is the monotonic time in
+  nanoseconds when the message was read, refer to trace_dispatcher.monotonic_ns_to_wall_time() for conversion.
+      """
+      if self._trace_history is None:
+         return []
+      start_seq = None if n_lines is None else self._trace_history.next_seq - int(n_lines)
+      return [(timestamp, msg) for (_seq, timestamp, msg) in self._trace_history.get_entries(start_seq)]
+
+   def get_pipeline_statistics(self):
+      """
+Get the queue-depth and lag statistics of the receiver pipeline.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  Statistics of the handoff between receiver and dispatch thread, refer to TraceHandoffBuffer.get_statistics().
+
+  Empty dictionary if the receiver pipeline is not initialized.
+      """
+      if self._trace_handoff is None:
+         return {}
+      return self._trace_handoff.get_statistics()
+
+   def get_connection_statistics(self):
+      """
+Get the counters and gauges of the connection.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  Counters of ConnectionMetrics.get_snapshot() plus the number of 'active_filters', 'trace_counters' and
+  'trace_aggregations', the 'trace_queue_depth' (sum of pending matches), 'trace_queue_max_depth', 'trace_queue_dropped'
+  and the receiver 'pipeline' statistics.
+      """
+      statistics = self._metrics.get_snapshot()
+      queue_statistics = self.get_trace_queue_statistics().values()
+      statistics['active_filters'] = len(self._trace_registry)
+      statistics['trace_counters'] = len(self._trace_counters)
+      statistics['trace_aggregations'] = len(self._trace_aggregators)
+      statistics['trace_queue_depth'] = sum(item['size'] for item in queue_statistics)
+      statistics['trace_queue_max_depth'] = max([item['size'] for item in queue_statistics] or [0])
+      statistics['trace_queue_dropped'] = sum(item.get('dropped', 0) for item in queue_statistics)
+      statistics['pipeline'] = self.get_pipeline_statistics()
+      return statistics
+
+   def get_live_metrics(self):
+      """
+Get the metrics of the connection for monitoring by another thread, e.g. the metrics server. No lock is taken: the
+counters are only read and the active trace filters are taken from the lock-free snapshot of the registry.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  Counters of ConnectionMetrics.get_snapshot() plus 'active_filters', 'trace_queue_depth', 'trace_queue_dropped',
+  the receiver 'pipeline' statistics, the liveness of the receiver and dispatch 'threads' and the snapshots of the
+  latency histograms 'match_latency' and 'dispatch_delay'.
+      """
+      metrics = self._metrics
+      statistics = metrics.get_snapshot()
+      active_filters = self._trace_registry.get_filters()
+      trace_queues = [trace_filter.trace_queue for trace_filter in active_filters
+                      if getattr(trace_filter, 'trace_queue', None) is not None]
+      statistics['active_filters'] = len(active_filters)
+      statistics['trace_queue_depth'] = sum(len(getattr(trace_queue, 'queue', ())) for trace_queue in trace_queues)
+      statistics['trace_queue_dropped'] = sum(getattr(trace_queue, 'dropped', 0) for trace_queue in trace_queues)
+      statistics['pipeline'] = self.get_pipeline_statistics()
+      statistics['threads'] = {name: thread_obj is not None and thread_obj.is_alive()
+                               for name, thread_obj in (('receiver', self._recv_thrd_obj), ('dispatch', self._dispatch_thrd_obj))}
+      statistics['match_latency'] = metrics.match_latency.get_snapshot()
+      statistics['dispatch_delay'] = metrics.dispatch_delay.get_snapshot()
+      return statistics
+
+   def get_latency_histograms(self):
+      """
+Get copies of the latency histograms of the connection, refer to ConnectionMetrics.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  'match_latency': latency from sending (or registering the wait) until the first matching trace message was
+  received, counted by every wait for a trace message which has matched.
+
+  'dispatch_delay': delay from reading a trace message until it was dispatched to the trace filters.
+      """
+      return {'match_latency': self._metrics.match_latency.copy(), 'dispatch_delay': self._metrics.dispatch_delay.copy()}
+
+   def _notify_receiver(self):
+      """
+Wake up the receiver thread. Must be called by the connection when new data is available for _read() or when
+the connection state changes (connected, terminated).
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._recv_data_ready.set()
+
+   def _wait_for_data(self):
+      """
+Block the receiver thread until the connection signals new data.
+
+Connections which do not signal new data (_EVENT_DRIVEN_READ is False) are polled every RECV_MSGS_POLLING_INTERVAL.
+While a response timeout is checked, the wait is limited to RECV_MSGS_POLLING_INTERVAL as well.
+
+**Returns:**
+
+(*no returns*)
+      """
+      if self._EVENT_DRIVEN_READ and not self._should_check_timeout:
+         timeout = self.RECV_IDLE_TIMEOUT
+      else:
+         timeout = self.__class__.RECV_MSGS_POLLING_INTERVAL
+      self._recv_data_ready.wait(timeout)
+
+   def _dispatch_trace(self, msg, timestamp_ns=None):
+      """
+Dispatch a received message to the trace filters of this connection and to the global trace filters.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Received message.
+
+* ``timestamp_ns``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Monotonic time in nanoseconds when the message was read from the connection. None for the current time.
+
+**Returns:**
+
+  / *Type*: bool /
+
+  True if the message matched at least one trace filter.
+      """
+      if timestamp_ns is None:
+         timestamp_ns = time.monotonic_ns()
+      seq = None
+      if self._trace_history is not None:
+         seq = self._trace_history.append(msg, timestamp_ns)
+      matched = self._trace_registry.dispatch(msg, seq, timestamp_ns)
+      if ConnectionBase._global_trace_registry.dispatch(msg, None, timestamp_ns):
+         matched = True
+      return matched
 
 
    def send_obj(self, send_cmd, cr=True):
@@ -422,14 +752,15 @@ Wrapper method to send message to a tcp connection.
 
 (*no returns*)
       """
-      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
       msg = send_cmd
       if self._is_connected:
          # noinspection PyBroadException
          try:
-            BuiltIn().log("%s: sending: '%s'" % (_mident, msg), constants.LOG_LEVEL_DEBUG)
+            if robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+               _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+               robot_log.debug("%s: sending: '%s'", _mident, msg)
             self._send(msg, cr)
+            self._metrics.add_sent(msg)
          except:
             self._is_connected = False
 
@@ -445,25 +776,28 @@ Wrapper method to get the response from connection.
 
   Responded message.
       """
-      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
       msg = None
       if self._is_connected:
          try:
-            BuiltIn().log("%s: reading..." % _mident, constants.LOG_LEVEL_DEBUG)
             msg = self._read()
-            BuiltIn().log("%s: read: '%s'" % (_mident, msg), constants.LOG_LEVEL_DEBUG)
+            if msg is not None and robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+               _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+               robot_log.debug("%s: read: '%s'", _mident, msg)
          except BrokenConnError as reason:
-            BuiltIn().log("%s: %s" % (_mident, reason), constants.LOG_LEVEL_ERROR)
+            if robot_log.is_enabled(constants.LOG_LEVEL_ERROR):
+               _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+               robot_log.error("%s: %s", _mident, reason)
             self._is_connected = False
             raise reason
          except Exception as reason:
-            BuiltIn().log("%s: %s" % (_mident, reason), constants.LOG_LEVEL_WARNING)
+            if robot_log.is_enabled(constants.LOG_LEVEL_WARNING):
+               _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+               robot_log.warning("%s: %s", _mident, reason)
       return msg
    # endregion
 
    # region TRACE INFRASTRUCTURE METHODS
-   def wait_4_trace(self, search_obj, timeout=0, use_fetch_block=False, end_of_block_pattern=".*", filter_pattern=".*", **fct_args):
+   def wait_4_trace(self, search_obj, timeout=0, use_fetch_block=False, end_of_block_pattern=".*", filter_pattern=".*", scope=constants.TRACE_SCOPE_CONNECTION, since_mark=None, **fct_args):
       """
 Suspend the control flow until a Trace message is received which matches to a specified regular expression.
 
@@ -500,6 +834,19 @@ Suspend the control flow until a Trace message is received which matches to a sp
 
   Timeout parameter specified as a floating point number in the unit 'seconds'.
 
+* ``scope``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'connection' /
+
+  Scope of the trace filter. 'connection' only matches the traces of this connection, 'global' matches the traces of all connections.
+
+* ``since_mark``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Trace mark returned by set_trace_mark(). The traces of this connection received since the mark are searched
+  first, before waiting for new traces. None to only match new traces.
+
 * ``fct_args``
 
   / *Condition*: optional / *Type*: Tuple /  *Default*: None /
@@ -515,172 +862,196 @@ Suspend the control flow until a Trace message is received which matches to a sp
   If no trace message matched to the specified regular expression and a timeout occurred, return None.
 
   If a trace message has matched to the specified regular expression, a match object is returned as the result.The complete trace message can be accessed by the 'string' attribute of the match object. For access to groups within the regular expression, use the group() method. For more information, refer to Python documentation for module 're'.
+
+  The match object additionally provides the receive time of the matched trace message: 'timestamp_ns' (monotonic
+  nanoseconds), 'wall_time' (seconds since the epoch) and 'latency_ns' (nanoseconds since sending the command).
       """
-      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log('Execute %s' % _mident, constants.LOG_LEVEL_DEBUG)
-      search_regex = re.compile(search_obj, re.M | re.S | re.U)
-      regex_obj_filter = re.compile(filter_pattern)
-      trq_handle, trace_queue = self.create_and_activate_trace_queue(search_regex, use_fetch_block, end_of_block_pattern, regex_obj_filter)
+      is_debug = robot_log.is_enabled(constants.LOG_LEVEL_DEBUG)
+      if is_debug:
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         robot_log.debug('Execute %s', _mident)
+      handle = self.expect(search_obj, use_fetch_block, end_of_block_pattern, filter_pattern, scope, since_mark, **fct_args)
+      match = self.wait_for_expectation(handle, timeout)
+      if is_debug:
+         robot_log.debug('Completed %s', _mident)
+      return match
+
+   def expect(self, search_obj, use_fetch_block=False, end_of_block_pattern=".*", filter_pattern=".*", scope=constants.TRACE_SCOPE_CONNECTION, since_mark=None, **fct_args):
+      """
+Register a wait for a trace message before sending a command. The trace messages are matched in background until
+the result is collected by wait_for_expectation(), so other actions can be done in between without missing the response.
 
-      try:
-         self.send_obj(**fct_args)
-      except Exception as err_msg:  # pylint: disable=W0703
-         BuiltIn().log('%s: An Exception occurred executing function object: %s' % (_mident, repr(self.send_obj)), 'ERROR')
-         BuiltIn().log('Function Arguments: %s' % repr(fct_args), 'ERROR')
-         BuiltIn().log('Error Message: %s' % repr(err_msg), 'ERROR')
-      success = True
-      match = None
-      try:
-         (dummy, match) = trace_queue.get(True, timeout)
-      except queue.Empty:
-         success = False
-      finally:
-         self.deactivate_and_delete_trace_queue(trq_handle, trace_queue)
+**Arguments:**
 
-      BuiltIn().log('Completed %s' % _mident, constants.LOG_LEVEL_DEBUG)
-      if success:
-         return match
-      else:
-         return None
+* ``search_obj``
 
+  / *Condition*: required / *Type*: str /
 
-   def wait_4_trace_continuously(self, trace_queue, timeout=0, *fct_args):
-      """
-Getting trace log continuously without creating a new trace queue.
+  Regular expression all received trace messages are compare to.
+  Can be passed either as a string or a regular expression object. Refer to Python documentation for module 're'.
 
-**Arguments:**
+* ``use_fetch_block``
 
+  / *Condition*: optional / *Type*: bool / *Default*: False /
 
-* ``trace_queue``
+  Determine if 'fetch block' feature is used.
 
-  / *Condition*: required / *Type*: Queue /
+* ``end_of_block_pattern``
 
-  Queue to store the traces.
+  / *Condition*: optional / *Type*: str / *Default*: '.*' /
 
-* ``timeout``
+  The end of block pattern.
 
-  / *Condition*: optional / *Type*: int / *Default*: 0 /
+* ``filter_pattern``
 
-  Timeout for waiting a matched log.
+  / *Condition*: optional / *Type*: str / *Default*: '.*' /
 
-* ``fct_args``
+  Pattern to filter message line by line.
 
-  / *Condition*: optional / *Type*: Tuple / *Default*: None /
+* ``scope``
 
-  Arguments to be sent to connection.
+  / *Condition*: optional / *Type*: str / *Default*: 'connection' /
 
-**Returns:**
+  Scope of the trace filter. 'connection' only matches the traces of this connection, 'global' matches the traces of all connections.
 
-* ``None``
+* ``since_mark``
 
-  / *Type*: None /
+  / *Condition*: optional / *Type*: int / *Default*: None /
 
-  If no trace message matched to the specified regular expression and a timeout occurred.
+  Trace mark returned by set_trace_mark(). The traces of this connection received since the mark are searched
+  first, before waiting for new traces. None to only match new traces.
 
-* ``match``
+* ``fct_args``
 
-  / *Type*: re.Match /
+  / *Condition*: optional / *Type*: Tuple /  *Default*: None /
 
-  If a trace message has matched to the specified regular expression, a match object is returned as the result.The complete trace message can be accessed by the 'string' attribute of the match object. For access to groups within the regular expression, use the group() method. For more information, refer to Python documentation for module 're'.
-      """
-      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log('Execute %s' % _mident, constants.LOG_LEVEL_DEBUG)
-      try:
-         self.send_obj(*fct_args)
-      except Exception as err_msg:  # pylint: disable=W0703
-         BuiltIn().log('%s: An Exception occurred executing function object: %s' % (_mident, repr(self.send_obj)), 'ERROR')
-         BuiltIn().log('Function Arguments: %s' % repr(fct_args), 'ERROR')
-         BuiltIn().log('Error Message: %s' % repr(err_msg), 'ERROR')
+  List of function arguments passed to be sent. Nothing is sent if no arguments are given.
 
-      success = True
-      match = None
-      try:
-         if trace_queue is not None:
-            (dummy, match) = trace_queue.get(True, timeout)
-      except queue.Empty:
-         success = False
+**Returns:**
 
-      BuiltIn().log('Completed %s' % _mident, constants.LOG_LEVEL_DEBUG)
-      if success:
-         return match
-      else:
-         return None
+* ``handle``
 
-   @classmethod
-   def create_and_activate_trace_queue(cls, search_element, use_fetch_block=False, end_of_block_pattern='.*', regex_line_filter_pattern=None):
+  / *Type*: int /
+
+  Handle of the expectation for wait_for_expectation() or cancel_expectation().
       """
-Create Queue and assign it to _trace_queue object and activate the queue with the search element.
+      search_regex = compile_pattern(search_obj, constants.TRACE_PATTERN_FLAGS)
+      regex_obj_filter = compile_pattern(filter_pattern)
+      # Only the first result is taken, so the queue keeps it and discards the later ones.
+      trq_handle, trace_queue = self.create_and_activate_trace_queue(search_regex, use_fetch_block, end_of_block_pattern, regex_obj_filter, scope,
+                                                                     maxsize=1, policy=constants.TraceQueuePolicy.DROP_NEWEST)
+
+      # Traces appended to the history from now on are dispatched to the activated filter as well,
+      # so the history only needs to be searched up to here.
+      history_match = None
+      if since_mark is not None and self._trace_history is not None:
+         stop_seq = self._trace_history.next_seq
+         history_match = self._search_trace_history(int(since_mark), stop_seq, search_regex, use_fetch_block, end_of_block_pattern, regex_obj_filter)
+
+      request_timestamp_ns = time.monotonic_ns()
+      self._expectations[trq_handle] = (trace_queue, request_timestamp_ns, history_match)
+      if fct_args:
+         try:
+            self.send_obj(**fct_args)
+         except Exception as err_msg:  # pylint: disable=W0703
+            if robot_log.is_enabled(constants.LOG_LEVEL_ERROR):
+               _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+               robot_log.error('%s: An Exception occurred executing function object: %s', _mident, repr(self.send_obj))
+               robot_log.error('Function Arguments: %s', repr(fct_args))
+               robot_log.error('Error Message: %s', repr(err_msg))
+      return trq_handle
+
+   def wait_for_expectation(self, handle, timeout=0):
+      """
+Wait for the result of an expectation registered by expect(). The expectation is removed afterwards.
 
 **Arguments:**
 
-* ``search_element``
-
-  / *Condition*: required / *Type*: str /
+* ``handle``
 
-  Regular expression all received trace messages are compare to.
+  / *Condition*: required / *Type*: int /
 
-  Can be passed either as a string or a regular expression object. Refer to Python documentation for module 're'.#
+  Handle returned by expect().
 
-* ``use_fetch_block``
+* ``timeout``
 
-  / *Condition*: optional / *Type*: bool / *Default*: False /
+  / *Condition*: optional / *Type*: float / *Default*: 0 /
 
-  Determine if 'fetch block' feature is used.
+  Maximum time in seconds to wait if no trace message has matched yet.
 
-* ``end_of_block_pattern``
+**Returns:**
 
-  / *Condition*: optional / *Type*: str / *Default*: '.*' /
+* ``match``
 
-  The end of block pattern.
+  / *Type*: TraceMatch /
 
-* ``regex_line_filter_pattern``
+  Match object of the first matched trace message, refer to wait_4_trace().
 
-  / *Condition*: optional / *Type*: re.Pattern / *Default*: None /
+  None if no trace message has matched until the timeout.
+      """
+      return self._wait_for_expectation(handle, timeout)
 
-  Regular expression object to filter message line by line.
+   def _wait_for_expectation(self, handle, timeout=0, is_absence=False):
+      """
+Wait for the result of an expectation, refer to wait_for_expectation().
 
-**Returns:**
+An absence check (``is_absence``) succeeds by the timeout and fails by a match, so neither is counted in the
+'timeouts' or the 'match_latency' metrics.
+      """
+      try:
+         trace_queue, request_timestamp_ns, match = self._expectations.pop(handle)
+      except KeyError:
+         raise ValueError("No expectation with handle '%s' is registered for this connection." % handle)
 
-* ``trq_handle, trace_queue``
+      if match is not None:
+         # matched in the trace history, i.e. received before the request
+         self.deactivate_and_delete_trace_queue(handle, trace_queue)
+         return match
 
-  / *Type*: tuple /
+      try:
+         (dummy, match) = trace_queue.get(True, timeout)
+      except queue.Empty:
+         if not is_absence:
+            self._metrics.timeouts += 1
+      finally:
+         self.deactivate_and_delete_trace_queue(handle, trace_queue)
 
-  The handle and search object
-      """
-      trace_queue = queue.Queue()
-      trq_handle = cls.activate_trace_queue(search_element, trace_queue, use_fetch_block, end_of_block_pattern, regex_line_filter_pattern)
-      return trq_handle, trace_queue
+      if match is not None:
+         match.request_timestamp_ns = request_timestamp_ns
+         if not is_absence:
+            self._metrics.match_latency.record(match.timestamp_ns - request_timestamp_ns)
+      return match
 
-   @classmethod
-   def deactivate_and_delete_trace_queue(cls, trq_handle, trace_queue):
+   def cancel_expectation(self, handle):
       """
-Deactivate trace queue and delete.
+Remove an expectation registered by expect() without waiting for its result.
 
 **Arguments:**
 
-* ``trq_handle``
+* ``handle``
 
   / *Condition*: required / *Type*: int /
 
-  Trace queue handle.
-
-* ``trace_queue``
+  Handle returned by expect().
 
-  / *Condition*: required / *Type*: Queue /
+**Returns:**
 
-  Trace queue object.
+* ``is_success``
 
-**Returns:**
+  / *Type*: bool /
 
-(*no returns*)
+  False if no expectation is registered with the handle.
       """
-      cls.deactivate_trace_queue(trq_handle)
-      del trace_queue
+      expectation = self._expectations.pop(handle, None)
+      if expectation is None:
+         return False
+      self.deactivate_and_delete_trace_queue(handle, expectation[0])
+      return True
 
-   @classmethod
-   def activate_trace_queue(cls, search_obj, trace_queue, use_fetch_block=False, end_of_block_pattern='.*', line_filter_pattern=None):
+   def wait_4_trace_absent(self, search_obj, timeout=0, scope=constants.TRACE_SCOPE_CONNECTION, since_mark=None, **fct_args):
       """
-Activates a trace message filter specified as a regular expression. All matching trace messages are put in the specified queue object.
+Check that no trace message matches a regular expression within a time period. Returns as soon as a trace message
+matches, otherwise at the end of the time period.
 
 **Arguments:**
 
@@ -688,13 +1059,674 @@ Activates a trace message filter specified as a regular expression. All matching
 
   / *Condition*: required / *Type*: str /
 
-  Regular expression all received trace messages are compare to. \
+  Regular expression of the forbidden trace message.
 
-  Can be passed either as a string or a regular expression object. Refer to Python documentation for module 're'.
+* ``timeout``
 
-* ``trace_queue``
+  / *Condition*: optional / *Type*: float / *Default*: 0 /
 
-  / *Condition*: required / *Type*: Queue /
+  Time period in seconds.
+
+* ``scope``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'connection' /
+
+  Scope of the trace filter. 'connection' only matches the traces of this connection, 'global' matches the traces of all connections.
+
+* ``since_mark``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Trace mark returned by set_trace_mark(). The traces of this connection received since the mark are checked as well.
+
+* ``fct_args``
+
+  / *Condition*: optional / *Type*: Tuple /  *Default*: None /
+
+  List of function arguments passed to be sent. Nothing is sent if no arguments are given.
+
+**Returns:**
+
+* ``match``
+
+  / *Type*: TraceMatch /
+
+  None if no trace message has matched within the time period (success).
+
+  Match object of the forbidden trace message otherwise, refer to wait_4_trace().
+      """
+      handle = self.expect(search_obj, scope=scope, since_mark=since_mark, **fct_args)
+      return self._wait_for_expectation(handle, timeout, is_absence=True)
+
+   def start_trace_counter(self, search_obj, window=None, scope=constants.TRACE_SCOPE_CONNECTION):
+      """
+Start counting the trace messages which match a regular expression. The counter stays active until stop_trace_counter().
+
+**Arguments:**
+
+* ``search_obj``
+
+  / *Condition*: required / *Type*: str /
+
+  Regular expression all received trace messages are compare to.
+
+* ``window``
+
+  / *Condition*: optional / *Type*: float / *Default*: None /
+
+  Length of the sliding time window in seconds. None to count all matches since start.
+
+* ``scope``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'connection' /
+
+  Scope of the counter. 'connection' only counts the traces of this connection, 'global' counts the traces of all connections.
+
+**Returns:**
+
+* ``handle``
+
+  / *Type*: int /
+
+  Handle of the counter.
+      """
+      trace_counter = TraceCounter(compile_pattern(search_obj, constants.TRACE_PATTERN_FLAGS), window)
+      handle = self._get_trace_registry(scope).add(trace_counter)
+      self._trace_counters[handle] = trace_counter
+      return handle
+
+   def _get_trace_counter(self, handle):
+      """
+Get an active trace counter of this connection.
+      """
+      try:
+         return self._trace_counters[handle]
+      except KeyError:
+         raise ValueError("No trace counter with handle '%s' is active for this connection." % handle)
+
+   def wait_4_trace_count(self, handle, count, timeout=0):
+      """
+Suspend the control flow until a trace counter has reached a number of matches (within its sliding time window).
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by start_trace_counter().
+
+* ``count``
+
+  / *Condition*: required / *Type*: int /
+
+  Number of matches to wait for.
+
+* ``timeout``
+
+  / *Condition*: optional / *Type*: float / *Default*: 0 /
+
+  Maximum time to wait in seconds.
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  count, total, first_timestamp_ns, last_timestamp_ns of the counter, refer to TraceCounter.get_statistics(),
+  and 'reached' (bool) whether the number of matches has been reached.
+      """
+      return self._get_trace_counter(handle).wait(int(count), timeout)
+
+   def get_trace_count(self, handle):
+      """
+Get the current statistics of a trace counter.
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by start_trace_counter().
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  count, total, first_timestamp_ns, last_timestamp_ns of the counter, refer to TraceCounter.get_statistics().
+      """
+      return self._get_trace_counter(handle).get_statistics()
+
+   def stop_trace_counter(self, handle):
+      """
+Stop a trace counter.
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by start_trace_counter().
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  Final statistics of the counter, refer to get_trace_count().
+      """
+      trace_counter = self._get_trace_counter(handle)
+      self.deactivate_trace_queue(handle)
+      del self._trace_counters[handle]
+      return trace_counter.get_statistics()
+
+   def start_trace_aggregation(self, search_obj, percentiles=None, scope=constants.TRACE_SCOPE_CONNECTION):
+      """
+Start collecting running statistics of the numeric values of the named groups of a regular expression.
+The aggregation stays active until stop_trace_aggregation().
+
+**Arguments:**
+
+* ``search_obj``
+
+  / *Condition*: required / *Type*: str /
+
+  Regular expression with named groups, e.g. 'cpu load (?P<load>\\d+)%'.
+
+* ``percentiles``
+
+  / *Condition*: optional / *Type*: list / *Default*: None /
+
+  Percentiles to be estimated per group. None for 50, 90 and 99.
+
+* ``scope``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'connection' /
+
+  Scope of the aggregation. 'connection' only uses the traces of this connection, 'global' uses the traces of all connections.
+
+**Returns:**
+
+* ``handle``
+
+  / *Type*: int /
+
+  Handle of the aggregation.
+      """
+      if percentiles is None:
+         percentiles = constants.TRACE_AGGREGATION_DEFAULT_PERCENTILES
+      trace_aggregator = TraceAggregator(compile_pattern(search_obj, constants.TRACE_PATTERN_FLAGS), percentiles)
+      handle = self._get_trace_registry(scope).add(trace_aggregator)
+      self._trace_aggregators[handle] = trace_aggregator
+      return handle
+
+   def _get_trace_aggregator(self, handle):
+      """
+Get an active trace aggregation of this connection.
+      """
+      try:
+         return self._trace_aggregators[handle]
+      except KeyError:
+         raise ValueError("No trace aggregation with handle '%s' is active for this connection." % handle)
+
+   def get_trace_aggregation(self, handle, reset=False):
+      """
+Get a snapshot of the statistics of a trace aggregation.
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by start_trace_aggregation().
+
+* ``reset``
+
+  / *Condition*: optional / *Type*: bool / *Default*: False /
+
+  Discard the statistics after taking the snapshot.
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  Statistics per group name: count, min, max, mean, variance, stddev and percentiles.
+  'invalid': number of values which are no numbers.
+      """
+      return self._get_trace_aggregator(handle).get_snapshot(reset)
+
+   def reset_trace_aggregation(self, handle):
+      """
+Discard the statistics of a trace aggregation, the aggregation stays active.
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by start_trace_aggregation().
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._get_trace_aggregator(handle).reset()
+
+   def stop_trace_aggregation(self, handle):
+      """
+Stop a trace aggregation.
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by start_trace_aggregation().
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  Final statistics, refer to get_trace_aggregation().
+      """
+      trace_aggregator = self._get_trace_aggregator(handle)
+      self.deactivate_trace_queue(handle)
+      del self._trace_aggregators[handle]
+      return trace_aggregator.get_snapshot()
+
+   def wait_4_traces(self, search_objs, timeout=0, mode=constants.TraceMatchMode.ANY, scope=constants.TRACE_SCOPE_CONNECTION, **fct_args):
+      """
+Suspend the control flow until several regular expressions have matched. All patterns are active at the same time
+and every received trace message is dispatched once to all of them.
+
+**Arguments:**
+
+* ``search_objs``
+
+  / *Condition*: required / *Type*: list /
+
+  Regular expressions all received trace messages are compare to.
+
+* ``timeout``
+
+  / *Condition*: optional / *Type*: float / *Default*: 0 /
+
+  Timeout for all patterns together in seconds.
+
+* ``mode``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'any' /
+
+  'any': wait until one of the patterns has matched.
+
+  'all': wait until each pattern has matched, in any order.
+
+  'sequence': wait until the patterns have matched in the given order, each by a later trace message than the previous one.
+
+* ``scope``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'connection' /
+
+  Scope of the trace filters. 'connection' only matches the traces of this connection, 'global' matches the traces of all connections.
+
+* ``fct_args``
+
+  / *Condition*: optional / *Type*: Tuple /  *Default*: None /
+
+  List of function arguments passed to be sent. Nothing is sent if no arguments are given.
+
+**Returns:**
+
+* ``matches``
+
+  / *Type*: list /
+
+  One entry per pattern in the given order: the match object of the pattern, refer to wait_4_trace(), or None if
+  the pattern hasn't matched. With mode 'any' only the first matched pattern has an entry.
+      """
+      is_debug = robot_log.is_enabled(constants.LOG_LEVEL_DEBUG)
+      if is_debug:
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         robot_log.debug('Execute %s', _mident)
+      if mode not in (constants.TraceMatchMode.ANY, constants.TraceMatchMode.ALL, constants.TraceMatchMode.SEQUENCE):
+         raise ValueError("Unsupported match mode '%s'. Possible values: any, all, sequence" % mode)
+
+      search_regexes = [compile_pattern(search_obj, constants.TRACE_PATTERN_FLAGS) for search_obj in search_objs]
+      pattern_indexes = {}
+      for index, search_regex in enumerate(search_regexes):
+         pattern_indexes.setdefault(search_regex, []).append(index)
+
+      # One queue for all patterns keeps the results in receiving order, the pattern is identified by match.re.
+      # The earliest results decide, so later results are discarded if the queue is full.
+      trace_queue = TraceQueue(getattr(self.config, 'trace_queue_size', constants.TRACE_QUEUE_DEFAULT_SIZE),
+                               constants.TraceQueuePolicy.DROP_NEWEST)
+      handles = [self.activate_trace_queue(search_regex, trace_queue, scope=scope) for search_regex in pattern_indexes]
+
+      request_timestamp_ns = time.monotonic_ns()
+      if fct_args:
+         try:
+            self.send_obj(**fct_args)
+         except Exception as err_msg:  # pylint: disable=W0703
+            if robot_log.is_enabled(constants.LOG_LEVEL_ERROR):
+               _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+               robot_log.error('%s: An Exception occurred executing function object: %s', _mident, repr(self.send_obj))
+               robot_log.error('Function Arguments: %s', repr(fct_args))
+               robot_log.error('Error Message: %s', repr(err_msg))
+
+      matches = [None] * len(search_regexes)
+      n_matched = 0
+      n_required = 1 if mode == constants.TraceMatchMode.ANY else len(search_regexes)
+      previous_match = None
+      is_first_match = True
+      deadline = time.monotonic() + float(timeout)
+      try:
+         while n_matched < n_required:
+            try:
+               (dummy, match) = trace_queue.get(True, max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+               self._metrics.timeouts += 1
+               break
+            match.request_timestamp_ns = request_timestamp_ns
+            if is_first_match:
+               self._metrics.match_latency.record(match.timestamp_ns - request_timestamp_ns)
+               is_first_match = False
+            for index in pattern_indexes[match.re]:
+               if matches[index] is not None:
+                  continue
+               if mode == constants.TraceMatchMode.SEQUENCE:
+                  if index != n_matched:
+                     continue
+                  if previous_match is not None and previous_match.timestamp_ns == match.timestamp_ns and previous_match.string is match.string:
+                     # the same trace message can't satisfy two steps of a sequence
+                     continue
+                  previous_match = match
+               matches[index] = match
+               n_matched += 1
+               if n_matched >= n_required:
+                  break
+      finally:
+         for handle in handles:
+            self.deactivate_trace_queue(handle)
+
+      if is_debug:
+         robot_log.debug('Completed %s', _mident)
+      return matches
+
+   @staticmethod
+   def set_trace_mark():
+      """
+Mark the current point in time for matching the traces received since then, refer to wait_4_trace().
+
+**Returns:**
+
+* ``mark``
+
+  / *Type*: int /
+
+  The trace mark (monotonic time in nanoseconds).
+      """
+      return time.monotonic_ns()
+
+   def _search_trace_history(self, since_mark, stop_seq, search_regex, use_fetch_block, end_of_block_pattern, line_filter_regex):
+      """
+Search the traces in the history of this connection which have been received since a trace mark.
+
+**Arguments:**
+
+* ``since_mark``
+
+  / *Condition*: required / *Type*: int /
+
+  Trace mark returned by set_trace_mark().
+
+* ``stop_seq``
+
+  / *Condition*: required / *Type*: int /
+
+  Sequence number of the first trace which is not searched.
+
+* ``search_regex``
+
+  / *Condition*: required / *Type*: re.Pattern /
+
+  Regular expression the traces are compared to.
+
+* ``use_fetch_block``
+
+  / *Condition*: required / *Type*: bool /
+
+  Determine if 'fetch block' feature is used. Only blocks which are completed in the history are matched.
+
+* ``end_of_block_pattern``
+
+  / *Condition*: required / *Type*: str /
+
+  The end of block pattern.
+
+* ``line_filter_regex``
+
+  / *Condition*: required / *Type*: re.Pattern /
+
+  Regular expression to filter message line by line.
+
+**Returns:**
+
+* ``match``
+
+  / *Type*: TraceMatch /
+
+  Match object of the first matching trace. None if no trace in the history matches.
+      """
+      history = self._trace_history
+      start_seq = history.find_seq(since_mark)
+      if start_seq == history.first_seq and start_seq > 0 and robot_log.is_enabled(constants.LOG_LEVEL_WARNING):
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         robot_log.warning("%s: traces received since the mark may have been dropped from the trace history", _mident)
+
+      result_queue = queue.Queue()
+      trace_filter = TraceFilter(search_regex,
+                                 result_queue,
+                                 use_fetch_block,
+                                 compile_pattern(end_of_block_pattern, constants.TRACE_PATTERN_FLAGS),
+                                 line_filter_regex,
+                                 self.MAX_LEN_BACKTRACE)
+      for seq, timestamp_ns, msg in history.get_entries(start_seq, stop_seq):
+         trace_filter.process(msg, seq, timestamp_ns)
+         while not result_queue.empty():
+            (dummy, match) = result_queue.get_nowait()
+            if match is not None:
+               return match
+      return None
+
+   def wait_4_trace_continuously(self, trace_queue, timeout=0, *fct_args):
+      """
+Getting trace log continuously without creating a new trace queue.
+
+**Arguments:**
+
+
+* ``trace_queue``
+
+  / *Condition*: required / *Type*: Queue /
+
+  Queue to store the traces.
+
+* ``timeout``
+
+  / *Condition*: optional / *Type*: int / *Default*: 0 /
+
+  Timeout for waiting a matched log.
+
+* ``fct_args``
+
+  / *Condition*: optional / *Type*: Tuple / *Default*: None /
+
+  Arguments to be sent to connection.
+
+**Returns:**
+
+* ``None``
+
+  / *Type*: None /
+
+  If no trace message matched to the specified regular expression and a timeout occurred.
+
+* ``match``
+
+  / *Type*: re.Match /
+
+  If a trace message has matched to the specified regular expression, a match object is returned as the result.The complete trace message can be accessed by the 'string' attribute of the match object. For access to groups within the regular expression, use the group() method. For more information, refer to Python documentation for module 're'.
+      """
+      is_debug = robot_log.is_enabled(constants.LOG_LEVEL_DEBUG)
+      if is_debug:
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         robot_log.debug('Execute %s', _mident)
+      try:
+         self.send_obj(*fct_args)
+      except Exception as err_msg:  # pylint: disable=W0703
+         if robot_log.is_enabled(constants.LOG_LEVEL_ERROR):
+            _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+            robot_log.error('%s: An Exception occurred executing function object: %s', _mident, repr(self.send_obj))
+            robot_log.error('Function Arguments: %s', repr(fct_args))
+            robot_log.error('Error Message: %s', repr(err_msg))
+
+      success = True
+      match = None
+      try:
+         if trace_queue is not None:
+            (dummy, match) = trace_queue.get(True, timeout)
+      except queue.Empty:
+         success = False
+
+      if is_debug:
+         robot_log.debug('Completed %s', _mident)
+      if success:
+         return match
+      else:
+         return None
+
+   def create_and_activate_trace_queue(self, search_element, use_fetch_block=False, end_of_block_pattern='.*', regex_line_filter_pattern=None, scope=constants.TRACE_SCOPE_CONNECTION, maxsize=None, policy=None):
+      """
+Create Queue and assign it to _trace_queue object and activate the queue with the search element.
+
+**Arguments:**
+
+* ``search_element``
+
+  / *Condition*: required / *Type*: str /
+
+  Regular expression all received trace messages are compare to.
+
+  Can be passed either as a string or a regular expression object. Refer to Python documentation for module 're'.#
+
+* ``use_fetch_block``
+
+  / *Condition*: optional / *Type*: bool / *Default*: False /
+
+  Determine if 'fetch block' feature is used.
+
+* ``end_of_block_pattern``
+
+  / *Condition*: optional / *Type*: str / *Default*: '.*' /
+
+  The end of block pattern.
+
+* ``regex_line_filter_pattern``
+
+  / *Condition*: optional / *Type*: re.Pattern / *Default*: None /
+
+  Regular expression object to filter message line by line.
+
+* ``scope``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'connection' /
+
+  Scope of the trace filter: 'connection' or 'global'.
+
+* ``maxsize``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Maximum number of pending trace results. None to use the 'trace_queue_size' setting of the connection config.
+
+* ``policy``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Overflow policy of the trace queue: 'block', 'drop-oldest', 'drop-newest' or 'keep-latest'.
+  None to use the 'trace_queue_policy' setting of the connection config.
+
+**Returns:**
+
+* ``trq_handle, trace_queue``
+
+  / *Type*: tuple /
+
+  The handle and search object
+      """
+      if maxsize is None:
+         maxsize = getattr(self.config, 'trace_queue_size', constants.TRACE_QUEUE_DEFAULT_SIZE)
+      if policy is None:
+         policy = getattr(self.config, 'trace_queue_policy', constants.TraceQueuePolicy.DROP_OLDEST)
+      trace_queue = TraceQueue(int(maxsize), policy, getattr(self.config, 'trace_queue_block_timeout', constants.TRACE_QUEUE_BLOCK_TIMEOUT))
+      trq_handle = self.activate_trace_queue(search_element, trace_queue, use_fetch_block, end_of_block_pattern, regex_line_filter_pattern, scope)
+      return trq_handle, trace_queue
+
+   def deactivate_and_delete_trace_queue(self, trq_handle, trace_queue):
+      """
+Deactivate trace queue and delete.
+
+**Arguments:**
+
+* ``trq_handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Trace queue handle.
+
+* ``trace_queue``
+
+  / *Condition*: required / *Type*: Queue /
+
+  Trace queue object.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self.deactivate_trace_queue(trq_handle)
+      del trace_queue
+
+   def activate_trace_queue(self, search_obj, trace_queue, use_fetch_block=False, end_of_block_pattern='.*', line_filter_pattern=None, scope=constants.TRACE_SCOPE_CONNECTION):
+      """
+Activates a trace message filter specified as a regular expression. All matching trace messages are put in the specified queue object.
+
+**Arguments:**
+
+* ``search_obj``
+
+  / *Condition*: required / *Type*: str /
+
+  Regular expression all received trace messages are compare to. \
+
+  Can be passed either as a string or a regular expression object. Refer to Python documentation for module 're'.
+
+* ``trace_queue``
+
+  / *Condition*: required / *Type*: Queue /
 
   A queue object all trace message which matches the regular expression are put in. \
 
@@ -718,6 +1750,12 @@ Activates a trace message filter specified as a regular expression. All matching
 
   Regular expression object to filter message line by line.
 
+* ``scope``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'connection' /
+
+  Scope of the trace filter. 'connection' only matches the traces of this connection, 'global' matches the traces of all connections.
+
 **Returns:**
 
 * ``handle_id``
@@ -726,24 +1764,24 @@ Activates a trace message filter specified as a regular expression. All matching
 
   Handle to deactivate the message filter.
       """
-      _mident = '%s.%s()' % (cls.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log('Execute %s' % _mident, constants.LOG_LEVEL_DEBUG)
-      with cls._traceq_lock:
-         cls._traceq_handle += 1
-         back_trace_queue = deque(maxlen=cls.MAX_LEN_BACKTRACE)
-         search_regex_obj = re.compile(search_obj)
-         cls._traceq_obj[cls._traceq_handle] = (search_regex_obj,
-                                                trace_queue,
-                                                back_trace_queue,
-                                                use_fetch_block,
-                                                re.compile(end_of_block_pattern, re.M | re.S | re.U),
-                                                line_filter_pattern)
-         handle_id = cls._traceq_handle
-      BuiltIn().log('Completed %s' % _mident, constants.LOG_LEVEL_DEBUG)
+      is_debug = robot_log.is_enabled(constants.LOG_LEVEL_DEBUG)
+      if is_debug:
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         robot_log.debug('Execute %s', _mident)
+      registry = self._get_trace_registry(scope)
+      trace_filter = TraceFilter(compile_pattern(search_obj),
+                                 trace_queue,
+                                 use_fetch_block,
+                                 compile_pattern(end_of_block_pattern, constants.TRACE_PATTERN_FLAGS),
+                                 line_filter_pattern,
+                                 self.MAX_LEN_BACKTRACE,
+                                 self._trace_history if scope == constants.TRACE_SCOPE_CONNECTION else None)
+      handle_id = registry.add(trace_filter)
+      if is_debug:
+         robot_log.debug('Completed %s', _mident)
       return handle_id
 
-   @classmethod
-   def deactivate_trace_queue(cls, handle):
+   def deactivate_trace_queue(self, handle):
       """
 Deactivates a trace message filter previously activated by ActivateTraceQ() method.
 
@@ -765,17 +1803,62 @@ Deactivates a trace message filter previously activated by ActivateTraceQ() meth
 
   True :  Trace message filter successfully deleted.
       """
-      _mident = '%s.%s()' % (cls.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log('Execute %s' % _mident, constants.LOG_LEVEL_DEBUG)
-      with cls._traceq_lock:
-         if handle in cls._traceq_obj:
-            del cls._traceq_obj[handle]
-            is_success = True
-         else:
-            is_success = False
-      BuiltIn().log('Completed %s' % _mident, constants.LOG_LEVEL_DEBUG)
+      is_debug = robot_log.is_enabled(constants.LOG_LEVEL_DEBUG)
+      if is_debug:
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         robot_log.debug('Execute %s', _mident)
+      is_success = self._trace_registry.remove(handle) or ConnectionBase._global_trace_registry.remove(handle)
+      if is_debug:
+         robot_log.debug('Completed %s', _mident)
       return is_success
 
+   def get_trace_queue_statistics(self):
+      """
+Get the fill level and drop statistics of the active trace queues of this connection.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  Statistics per trace queue handle, refer to TraceQueue.get_statistics().
+  Trace queues which are not created by create_and_activate_trace_queue() are reported with their size only.
+  Trace counters are not contained.
+      """
+      statistics = {}
+      for handle, trace_filter in self._trace_registry.get_items():
+         trace_queue = getattr(trace_filter, 'trace_queue', None)
+         if trace_queue is None:
+            continue
+         if isinstance(trace_queue, TraceQueue):
+            statistics[handle] = trace_queue.get_statistics()
+         else:
+            statistics[handle] = {'size': trace_queue.qsize()}
+      return statistics
+
+   def _get_trace_registry(self, scope):
+      """
+Get the trace filter registry of a scope.
+
+**Arguments:**
+
+* ``scope``
+
+  / *Condition*: required / *Type*: str /
+
+  Scope of the trace filter: 'connection' or 'global'.
+
+**Returns:**
+
+  / *Type*: TraceFilterRegistry /
+
+  Trace filter registry of the scope.
+      """
+      if scope == constants.TRACE_SCOPE_GLOBAL:
+         return ConnectionBase._global_trace_registry
+      elif scope == constants.TRACE_SCOPE_CONNECTION:
+         return self._trace_registry
+      raise ValueError("Unsupported trace scope '%s'. Possible values: '%s', '%s'" % (scope, constants.TRACE_SCOPE_CONNECTION, constants.TRACE_SCOPE_GLOBAL))
+
    def check_timeout(self, timeout):
       """
 >> This method will be override in derived class <<
@@ -862,46 +1945,4 @@ Post-checking message when receiving it from connection.
 
       return output
 
-   def _filter_msg(self, regex_filter_obj, msg):
-      """
-Filter message by regular expression object.
-
-**Arguments:**
-
-* ``regex_filter_obj``
-
-  / *Condition*: required / *Type*: re.Pattern /
-
-  Regular expression object.
-
-* ``msg``
-
-  / *Condition*: required / *Type*: str /
-
-  Message string to be filtered.
-
-**Returns:**
-
-* ``is_hit, matched_obj``
-
-  / *Type*: tuple /
-
-  is_hit: Determine if there is any matched.
-
-  matched_obj: Matched object if exists.
-      """
-      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log(_mident, constants.LOG_LEVEL_DEBUG)
-      matched_obj = None
-      try:
-         BuiltIn().log("%s: regex_filter_obj '%s'" % (_mident, repr(regex_filter_obj)), constants.LOG_LEVEL_DEBUG)
-         BuiltIn().log("%s: msg '%s'" % (_mident, repr(msg)), constants.LOG_LEVEL_DEBUG)
-         matched_obj = regex_filter_obj.search(msg)
-      except Exception as reason:
-         BuiltIn().log("%s: %s" % (_mident, reason), constants.LOG_LEVEL_ERROR)
-
-      is_hit = False
-      if matched_obj:
-         is_hit = True
-      return is_hit, matched_obj
    # endregion
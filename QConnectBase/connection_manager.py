@@ -28,13 +28,22 @@
 # *******************************************************************************
 from QConnectBase.utils import *
 from QConnectBase.connection_base import ConnectionBase
+from QConnectBase.connection_metrics import LatencyHistogram
+from QConnectBase.metrics_server import MetricsServer
+from QConnectBase.trace_dispatcher import pattern_cache
+from QConnectBase.robot_log import robot_log
+from QConnectBase.trace_archive import TraceArchiveReader, TraceArchiveWriter, get_archive_path
+from QConnectBase.trace_database import TraceDatabaseReader, TraceDatabaseWriter
+import sqlite3
 from robot.libraries.BuiltIn import BuiltIn
 from os.path import dirname
 from QConnectBase.utils import DictToClass
+from robot.api import logger
 from robot.api.deco import keyword
 import os
 import importlib
 import pkgutil
+import re
 import QConnectBase.constants as constants
 import site
 
@@ -95,6 +104,7 @@ Class to manage all connections.
    """
    ROBOT_LIBRARY_SCOPE = 'GLOBAL'
    ROBOT_AUTO_KEYWORDS = False
+   ROBOT_LISTENER_API_VERSION = 2
    LIBRARY_EXTENSION_PREFIX = 'robotframework_qconnect'
    LIBRARY_EXTENSION_PREFIX2 = 'QConnect'
 
@@ -104,7 +114,16 @@ Class to manage all connections.
       """
 Constructor for ConnectionManager class.
       """
+      self.ROBOT_LIBRARY_LISTENER = self
       self.connection_manage_dict = {}
+      self._expectation_conn_dict = {}
+      self._trace_counter_conn_dict = {}
+      self._trace_aggregation_conn_dict = {}
+      self._closed_connection_statistics = []
+      self._reported_statistics = {}
+      self._in_test = False
+      self._summary_logged = False
+      self._metrics_server = None
       main_lib_path = dirname(os.path.realpath(__file__))
       site_package_dirs = site.getsitepackages()
       extension_lib_paths = []
@@ -147,9 +166,296 @@ Quit connection manager.
 
 (*no returns*)
       """
-      for connection in self.connection_manage_dict.values():
+      for conn_name, connection in self.connection_manage_dict.items():
          connection.quit()
+         self._keep_closed_connection_statistics(conn_name, connection)
       self.connection_manage_dict.clear()
+      if getattr(self, '_metrics_server', None) is not None:
+         self.stop_metrics_server()
+      robot_log.flush()
+
+   def start_keyword(self, _name, _attrs):
+      """
+Listener method: write the buffered log messages of background threads into the Robot Framework log before a
+keyword starts.
+
+**Arguments:**
+
+* ``_name``
+
+  / *Condition*: required / *Type*: str /
+
+  Unused.
+
+* ``_attrs``
+
+  / *Condition*: required / *Type*: dict /
+
+  Unused.
+
+**Returns:**
+
+(*no returns*)
+      """
+      robot_log.flush()
+
+   def start_test(self, _name, _attrs):
+      """
+Listener method: remember that a test is running, so its teardown is not taken for the suite teardown.
+
+**Arguments:**
+
+* ``_name``
+
+  / *Condition*: required / *Type*: str /
+
+  Unused.
+
+* ``_attrs``
+
+  / *Condition*: required / *Type*: dict /
+
+  Unused.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._in_test = True
+
+   def end_test(self, _name, _attrs):
+      """
+Listener method: remember that the test has ended.
+
+**Arguments:**
+
+* ``_name``
+
+  / *Condition*: required / *Type*: str /
+
+  Unused.
+
+* ``_attrs``
+
+  / *Condition*: required / *Type*: dict /
+
+  Unused.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._in_test = False
+
+   def end_keyword(self, _name, attrs):
+      """
+Listener method: write the buffered log messages of background threads into the Robot Framework log when a
+keyword ends. At the end of a suite teardown, the connection statistics of the suite are logged into the teardown.
+
+**Arguments:**
+
+* ``_name``
+
+  / *Condition*: required / *Type*: str /
+
+  Unused.
+
+* ``attrs``
+
+  / *Condition*: required / *Type*: dict /
+
+  Attributes of the keyword.
+
+**Returns:**
+
+(*no returns*)
+      """
+      robot_log.flush()
+      if attrs.get('type') == 'TEARDOWN' and not self._in_test:
+         summary = self._get_connection_statistics_summary()
+         if summary is not None:
+            BuiltIn().log(summary, constants.LOG_LEVEL_INFO)
+         self._summary_logged = True
+
+   def end_suite(self, _name, _attrs):
+      """
+Listener method: log the connection statistics of a suite without suite teardown when it ends.
+
+**Arguments:**
+
+* ``_name``
+
+  / *Condition*: required / *Type*: str /
+
+  Unused.
+
+* ``_attrs``
+
+  / *Condition*: required / *Type*: dict /
+
+  Unused.
+
+**Returns:**
+
+(*no returns*)
+      """
+      robot_log.flush()
+      if self._summary_logged:
+         self._summary_logged = False
+         return
+      summary = self._get_connection_statistics_summary()
+      if summary is not None:
+         # the suite is already finished, so the summary is written to the console and the syslog
+         logger.info(summary, also_console=True)
+
+   def _take_connection_statistics(self, connection):
+      """
+Get the statistics and latency histograms of a connection since they were taken the last time.
+
+**Arguments:**
+
+* ``connection``
+
+  / *Condition*: required / *Type*: ConnectionBase /
+
+  The connection.
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  Increase of the counters of CONNECTION_STATISTICS_COUNTERS plus the 'peak_lines_per_second' of the connection.
+
+* ``histograms``
+
+  / *Type*: dict /
+
+  'match_latency' and 'dispatch_delay' histograms of the latencies counted since.
+      """
+      current_statistics = connection.get_connection_statistics()
+      current_histograms = connection.get_latency_histograms()
+      (reported_statistics, reported_histograms) = self._reported_statistics.get(connection, ({}, {}))
+      self._reported_statistics[connection] = (current_statistics, current_histograms)
+      statistics = {name: current_statistics[name] - reported_statistics.get(name, 0) for name in constants.CONNECTION_STATISTICS_COUNTERS}
+      statistics['peak_lines_per_second'] = current_statistics['peak_lines_per_second']
+      histograms = {name: histogram.get_difference(reported_histograms.get(name)) for name, histogram in current_histograms.items()}
+      return statistics, histograms
+
+   def _keep_closed_connection_statistics(self, conn_name, connection):
+      """
+Keep the statistics and latency histograms of a connection which is closed for the next summary. Must be called after
+the connection has quit, so the traces which were still in the receiver pipeline are counted.
+
+**Arguments:**
+
+* ``conn_name``
+
+  / *Condition*: required / *Type*: str /
+
+  Name of the connection.
+
+* ``connection``
+
+  / *Condition*: required / *Type*: ConnectionBase /
+
+  The connection.
+
+**Returns:**
+
+(*no returns*)
+      """
+      (statistics, histograms) = self._take_connection_statistics(connection)
+      del self._reported_statistics[connection]
+      self._closed_connection_statistics.append((conn_name, statistics, histograms))
+
+   def _get_connection_statistics_summary(self):
+      """
+Get the statistics of the heaviest connections (most received lines) since the last summary. The statistics of the
+connections which were opened several times under the same name are added up.
+
+**Returns:**
+
+  / *Type*: str /
+
+  The summary, None if no connection was used since the last summary.
+      """
+      sessions = self._closed_connection_statistics
+      self._closed_connection_statistics = []
+      sessions.extend((conn_name, ) + self._take_connection_statistics(connection)
+                      for conn_name, connection in self.connection_manage_dict.items())
+      statistics = {}
+      histograms = {}
+      for (conn_name, session_statistics, session_histograms) in sessions:
+         if not any(session_statistics[name] for name in constants.CONNECTION_STATISTICS_COUNTERS) \
+               and not any(histogram.count for histogram in session_histograms.values()):
+            continue
+         if conn_name not in statistics:
+            statistics[conn_name] = session_statistics
+            histograms[conn_name] = session_histograms
+            continue
+         for name in constants.CONNECTION_STATISTICS_COUNTERS:
+            statistics[conn_name][name] += session_statistics[name]
+         statistics[conn_name]['peak_lines_per_second'] = max(statistics[conn_name]['peak_lines_per_second'],
+                                                              session_statistics['peak_lines_per_second'])
+         histograms[conn_name] = self._merge_latency_histograms([histograms[conn_name], session_histograms])
+      if not statistics:
+         return None
+      heaviest = sorted(statistics.items(), key=lambda item: item[1]['lines_received'], reverse=True)
+      summary = ["Connection statistics (heaviest %d of %d connections):" % (min(len(heaviest), constants.CONNECTION_STATISTICS_SUMMARY_SIZE), len(heaviest))]
+      for conn_name, item in heaviest[:constants.CONNECTION_STATISTICS_SUMMARY_SIZE]:
+         summary.append("%s: %d lines / %d bytes received (peak %d lines/s), %d lines sent, %d matches, %d timeouts, "
+                        "%d reconnects, read %.3f s, dispatch %.3f s, log %.3f s"
+                        % (conn_name, item['lines_received'], item['bytes_received'], item['peak_lines_per_second'], item['lines_sent'],
+                           item['matches'], item['timeouts'], item['reconnects'], item['read_time'], item['dispatch_time'], item['log_time']))
+      merged = self._merge_latency_histograms(histograms.values())
+      summary.append("Latencies (p50 / p90 / p99 / max):")
+      for conn_name in sorted(histograms):
+         summary.append(self._format_latencies(conn_name, histograms[conn_name]))
+      if len(histograms) > 1:
+         summary.append(self._format_latencies("all connections", merged))
+      return '\n'.join(summary)
+
+   @staticmethod
+   def _merge_latency_histograms(histograms_list):
+      """
+Merge the latency histograms of several connections.
+
+**Arguments:**
+
+* ``histograms_list``
+
+  / *Condition*: required / *Type*: list /
+
+  Dictionaries of latency histograms, refer to ConnectionBase.get_latency_histograms().
+
+**Returns:**
+
+  / *Type*: dict /
+
+  'match_latency' and 'dispatch_delay' histograms of all connections.
+      """
+      merged = {'match_latency': LatencyHistogram(), 'dispatch_delay': LatencyHistogram()}
+      for histograms in histograms_list:
+         for name, histogram in merged.items():
+            histogram.merge(histograms[name])
+      return merged
+
+   @staticmethod
+   def _format_latencies(conn_name, histograms):
+      """
+Format the percentiles of the latency histograms of a connection as one line of the summary.
+      """
+      parts = []
+      for (name, label) in (('match_latency', 'send to match'), ('dispatch_delay', 'read to dispatch')):
+         histogram = histograms[name]
+         if histogram.count:
+            parts.append("%s %s ms (%d)" % (label, ' / '.join('%.3f' % (histogram.get_percentile(percentile) / 1e6)
+                                                                for percentile in (50, 90, 99, 100)), histogram.count))
+         else:
+            parts.append("%s -" % label)
+      return "%s: %s" % (conn_name, ', '.join(parts))
 
    def add_connection(self, name, conn):
       """
@@ -239,7 +545,9 @@ Keyword for disconnecting a connection by name.
 (*no returns*)
       """
       if connection_name in self.connection_manage_dict.keys():
-         self.connection_manage_dict[connection_name].quit()
+         connection_obj = self.connection_manage_dict[connection_name]
+         connection_obj.quit()
+         self._keep_closed_connection_statistics(connection_name, connection_obj)
          del self.connection_manage_dict[connection_name]
 
 #    @keyword
@@ -362,6 +670,8 @@ Making a connection.
             setattr(connection_obj.real_obj, 'connection_name', conn_name)
          self.add_connection(conn_name, connection_obj)
 
+      # Take over the log level of the current Robot Framework run before the receiver threads are started.
+      robot_log.refresh()
       try:
          connection_obj.connect()
       except Exception as ex:
@@ -595,7 +905,7 @@ Transfer file from local to remote and vice versa.
 #          raise Exception("Input parameter are invalid.")
 
    @keyword
-   def verify(self, conn_name, search_pattern, timeout=5, match_try=1, fetch_block=False, eob_pattern='.*', filter_pattern='.*', send_cmd='', **kwargs):
+   def verify(self, conn_name, search_pattern, timeout=5, match_try=1, fetch_block=False, eob_pattern='.*', filter_pattern='.*', send_cmd='', scope=constants.TRACE_SCOPE_CONNECTION, since_mark=None, **kwargs):
       """
 Verify a pattern from connection response after sending a command.
 
@@ -650,6 +960,23 @@ Verify a pattern from connection response after sending a command.
 
   Command to be sent.
 
+* ``scope``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'connection' /
+
+  Scope of the traces to be matched.
+
+  'connection' - Only the traces of this connection are matched.
+
+  'global' - The traces of all connections are matched.
+
+* ``since_mark``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Trace mark returned by 'set trace mark'. The traces of the connection received since the mark are searched first,
+  so a response which arrived before 'verify' is matched as well. None to only match new traces.
+
 * ``kwargs``
 
   / *Condition*: optional / *Type*: Dict / *Default*: None /
@@ -679,7 +1006,7 @@ Verify a pattern from connection response after sending a command.
 
       for i in range(1, match_try+1):
          kwargs['send_cmd'] = send_cmd
-         res = connection_obj.wait_4_trace(search_pattern, int(timeout), fetch_block, eob_pattern, filter_pattern, **kwargs)
+         res = connection_obj.wait_4_trace(search_pattern, int(timeout), fetch_block, eob_pattern, filter_pattern, scope, since_mark, **kwargs)
          if res is None:
             # raise AssertionError("Unable to match the pattern after '%s' seconds." % timeout)
             BuiltIn().log("Match try %s/%s timed out" % (i, match_try), constants.LOG_LEVEL_WARNING)
@@ -691,6 +1018,925 @@ Verify a pattern from connection response after sending a command.
 
       return res
 
+   @keyword
+   def verify_absent(self, conn_name, search_pattern, timeout=5, send_cmd=None, scope=constants.TRACE_SCOPE_CONNECTION, since_mark=None, **kwargs):
+      """
+Verify that a pattern doesn't appear in the connection response for a time period.
+Fails as soon as the pattern is matched, passes at the end of the time period otherwise.
+
+**Arguments:**
+
+* ``conn_name``
+
+  / *Condition*: required / *Type*: str /
+
+  Name of connection.
+
+* ``search_pattern``
+
+  / *Condition*: required / *Type*: str /
+
+  Regular expression of the forbidden trace message.
+
+* ``timeout``
+
+  / *Condition*: optional / *Type*: float / *Default*: 5 /
+
+  Time period in seconds.
+
+* ``send_cmd``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Command to be sent before checking. Nothing is sent if None.
+
+* ``scope``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'connection' /
+
+  Scope of the traces to be checked, refer to 'verify'.
+
+* ``since_mark``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Trace mark returned by 'set trace mark'. The traces received since the mark are checked as well.
+
+* ``kwargs``
+
+  / *Condition*: optional / *Type*: Dict / *Default*: None /
+
+  The optional arguments for sending the command, refer to 'verify'.
+
+**Returns:**
+
+(*no returns*)
+      """
+      if conn_name not in self.connection_manage_dict.keys():
+         raise AssertionError("The '%s' connection  hasn't been established. Please connect first." % conn_name)
+
+      connection_obj = self.connection_manage_dict[conn_name]
+      fct_args = {}
+      if send_cmd is not None:
+         fct_args = dict(kwargs, send_cmd=send_cmd)
+      res = connection_obj.wait_4_trace_absent(search_pattern, float(timeout), scope, since_mark, **fct_args)
+      if res is not None:
+         raise AssertionError("The pattern has been matched by '%s'." % res.string)
+
+   @keyword
+   def verify_patterns(self, conn_name, patterns, mode=constants.TraceMatchMode.ANY, timeout=5, send_cmd='', scope=constants.TRACE_SCOPE_CONNECTION, **kwargs):
+      """
+Verify several patterns from connection response after sending a command. All patterns are matched at the same time,
+so e.g. an ordered boot sequence only takes as long as the sequence itself.
+
+**Arguments:**
+
+* ``conn_name``
+
+  / *Condition*: required / *Type*: str /
+
+  Name of connection.
+
+* ``patterns``
+
+  / *Condition*: required / *Type*: list /
+
+  Regular expressions all received trace messages are compare to.
+
+* ``mode``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'any' /
+
+  'any' - One of the patterns has to match.
+
+  'all' - Each pattern has to match, in any order.
+
+  'sequence' - The patterns have to match in the given order.
+
+* ``timeout``
+
+  / *Condition*: optional / *Type*: float / *Default*: 5 /
+
+  Timeout for all patterns together in seconds.
+
+* ``send_cmd``
+
+  / *Condition*: optional / *Type*: str / *Default*: '' /
+
+  Command to be sent.
+
+* ``scope``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'connection' /
+
+  Scope of the traces to be matched, refer to 'verify'.
+
+* ``kwargs``
+
+  / *Condition*: optional / *Type*: Dict / *Default*: None /
+
+  The optional arguments for sending the command, refer to 'verify'.
+
+**Returns:**
+
+* ``result``
+
+  / *Type*: dict or list /
+
+  Mode 'any': dictionary of the matched pattern. Mode 'all' and 'sequence': list of dictionaries in the order of the patterns.
+
+  Each dictionary contains 'index' and 'pattern' of the pattern, 'match' (the match object, refer to 'verify'),
+  'groups' (the captured strings), 'timestamp_ns' and 'wall_time' (the receive time of the matched trace).
+      """
+      if conn_name not in self.connection_manage_dict.keys():
+         raise AssertionError("The '%s' connection  hasn't been established. Please connect first." % conn_name)
+
+      if not isinstance(patterns, (list, tuple)):
+         patterns = [patterns]
+      connection_obj = self.connection_manage_dict[conn_name]
+      kwargs['send_cmd'] = send_cmd
+      try:
+         matches = connection_obj.wait_4_traces(patterns, float(timeout), mode, scope, **kwargs)
+      except ValueError as err_msg:
+         raise AssertionError(str(err_msg))
+
+      results = []
+      for index, match in enumerate(matches):
+         if match is not None:
+            results.append({'index': index,
+                            'pattern': patterns[index],
+                            'match': match,
+                            'groups': match.groups(),
+                            'timestamp_ns': match.timestamp_ns,
+                            'wall_time': match.wall_time})
+
+      if mode == constants.TraceMatchMode.ANY:
+         if not results:
+            raise AssertionError("Unable to match any of the patterns after '%s' time." % timeout)
+         return results[0]
+
+      if len(results) < len(patterns):
+         missing = [str(patterns[index]) for index, match in enumerate(matches) if match is None]
+         raise AssertionError("Unable to match the patterns %s after '%s' time." % (", ".join("'%s'" % p for p in missing), timeout))
+      return results
+
+   @keyword
+   def start_trace_counter(self, conn_name, search_pattern, window=None, scope=constants.TRACE_SCOPE_CONNECTION):
+      """
+Start counting the traces of a connection which match a pattern. The counter stays active until 'stop trace counter'.
+
+**Arguments:**
+
+* ``conn_name``
+
+  / *Condition*: required / *Type*: str /
+
+  Name of connection.
+
+* ``search_pattern``
+
+  / *Condition*: required / *Type*: str /
+
+  Regular expression all received trace messages are compare to.
+
+* ``window``
+
+  / *Condition*: optional / *Type*: float / *Default*: None /
+
+  Length of the sliding time window in seconds. None to count all matches since start.
+
+* ``scope``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'connection' /
+
+  Scope of the traces to be counted, refer to 'verify'.
+
+**Returns:**
+
+* ``handle``
+
+  / *Type*: int /
+
+  Handle of the counter.
+      """
+      if conn_name not in self.connection_manage_dict.keys():
+         raise AssertionError("The '%s' connection  hasn't been established. Please connect first." % conn_name)
+
+      connection_obj = self.connection_manage_dict[conn_name]
+      handle = connection_obj.start_trace_counter(search_pattern, None if window is None else float(window), scope)
+      self._trace_counter_conn_dict[handle] = connection_obj
+      return handle
+
+   def _get_trace_counter_connection(self, handle):
+      """
+Get the connection of an active trace counter.
+      """
+      connection_obj = self._trace_counter_conn_dict.get(int(handle))
+      if connection_obj is None:
+         raise AssertionError("No trace counter with handle '%s' is active." % handle)
+      return connection_obj
+
+   @keyword
+   def wait_for_trace_count(self, handle, count, timeout=5):
+      """
+Wait until a trace counter has reached a number of matches within its sliding time window.
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by 'start trace counter'.
+
+* ``count``
+
+  / *Condition*: required / *Type*: int /
+
+  Number of matches to wait for.
+
+* ``timeout``
+
+  / *Condition*: optional / *Type*: float / *Default*: 5 /
+
+  Maximum time to wait in seconds.
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  count, total, first_timestamp_ns and last_timestamp_ns of the counter.
+      """
+      connection_obj = self._get_trace_counter_connection(handle)
+      statistics = connection_obj.wait_4_trace_count(int(handle), int(count), float(timeout))
+      if not statistics.pop('reached'):
+         raise AssertionError("The pattern has been matched %s of %s times after '%s' time." % (statistics['count'], count, timeout))
+      return statistics
+
+   @keyword
+   def get_trace_count(self, handle):
+      """
+Get the current statistics of a trace counter.
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by 'start trace counter'.
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  count, total, first_timestamp_ns and last_timestamp_ns of the counter.
+      """
+      return self._get_trace_counter_connection(handle).get_trace_count(int(handle))
+
+   @keyword
+   def stop_trace_counter(self, handle):
+      """
+Stop a trace counter.
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by 'start trace counter'.
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  Final statistics of the counter, refer to 'get trace count'.
+      """
+      connection_obj = self._get_trace_counter_connection(handle)
+      del self._trace_counter_conn_dict[int(handle)]
+      return connection_obj.stop_trace_counter(int(handle))
+
+   @keyword
+   def start_trace_aggregation(self, conn_name, search_pattern, percentiles=None, scope=constants.TRACE_SCOPE_CONNECTION):
+      """
+Start collecting running statistics of numeric values in the traces of a connection. The values are taken from the
+named groups of the pattern, e.g. 'cpu load (?P<load>\\d+)%'.
+
+**Arguments:**
+
+* ``conn_name``
+
+  / *Condition*: required / *Type*: str /
+
+  Name of connection.
+
+* ``search_pattern``
+
+  / *Condition*: required / *Type*: str /
+
+  Regular expression with named groups.
+
+* ``percentiles``
+
+  / *Condition*: optional / *Type*: list / *Default*: None /
+
+  Percentiles to be estimated per group. None for 50, 90 and 99.
+
+* ``scope``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'connection' /
+
+  Scope of the traces to be used, refer to 'verify'.
+
+**Returns:**
+
+* ``handle``
+
+  / *Type*: int /
+
+  Handle of the aggregation.
+      """
+      if conn_name not in self.connection_manage_dict.keys():
+         raise AssertionError("The '%s' connection  hasn't been established. Please connect first." % conn_name)
+
+      connection_obj = self.connection_manage_dict[conn_name]
+      if percentiles is not None:
+         if not isinstance(percentiles, (list, tuple)):
+            percentiles = [percentiles]
+         percentiles = [float(percentile) for percentile in percentiles]
+      try:
+         handle = connection_obj.start_trace_aggregation(search_pattern, percentiles, scope)
+      except ValueError as err_msg:
+         raise AssertionError(str(err_msg))
+      self._trace_aggregation_conn_dict[handle] = connection_obj
+      return handle
+
+   def _get_trace_aggregation_connection(self, handle):
+      """
+Get the connection of an active trace aggregation.
+      """
+      connection_obj = self._trace_aggregation_conn_dict.get(int(handle))
+      if connection_obj is None:
+         raise AssertionError("No trace aggregation with handle '%s' is active." % handle)
+      return connection_obj
+
+   @keyword
+   def get_trace_aggregation(self, handle, reset=False):
+      """
+Get a snapshot of the statistics of a trace aggregation.
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by 'start trace aggregation'.
+
+* ``reset``
+
+  / *Condition*: optional / *Type*: bool / *Default*: False /
+
+  Discard the statistics after taking the snapshot.
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  Statistics per group name: count, min, max, mean, variance, stddev and percentiles (e.g. p50, p90, p99).
+  'invalid': number of values which are no numbers.
+      """
+      if isinstance(reset, str):
+         reset = reset.lower() in ('true', 'yes', '1')
+      return self._get_trace_aggregation_connection(handle).get_trace_aggregation(int(handle), reset)
+
+   @keyword
+   def reset_trace_aggregation(self, handle):
+      """
+Discard the statistics of a trace aggregation, the aggregation stays active.
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by 'start trace aggregation'.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._get_trace_aggregation_connection(handle).reset_trace_aggregation(int(handle))
+
+   @keyword
+   def stop_trace_aggregation(self, handle):
+      """
+Stop a trace aggregation.
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by 'start trace aggregation'.
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  Final statistics, refer to 'get trace aggregation'.
+      """
+      connection_obj = self._get_trace_aggregation_connection(handle)
+      del self._trace_aggregation_conn_dict[int(handle)]
+      return connection_obj.stop_trace_aggregation(int(handle))
+
+   @keyword
+   def read_trace_archive(self, archive_path, start_time=None, end_time=None, conn_name=None, pattern=None, max_lines=1000):
+      """
+Read the traces of a time range and/or a connection from a trace archive (refer to the 'trace_archive' config).
+The archive is memory-mapped and the time index is used, so only the requested part of the archive is read.
+
+**Arguments:**
+
+* ``archive_path``
+
+  / *Condition*: required / *Type*: str /
+
+  Path of the trace archive. Relative paths refer to the output directory.
+
+* ``start_time``
+
+  / *Condition*: optional / *Type*: float / str / *Default*: None /
+
+  Begin of the time range, seconds since the epoch or a date like '2026-10-17 08:15:00.250'. None for no limit.
+
+* ``end_time``
+
+  / *Condition*: optional / *Type*: float / str / *Default*: None /
+
+  End of the time range, seconds since the epoch or a date like '2026-10-17 08:15:00.250'. None for no limit.
+
+* ``conn_name``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Only read the traces of this connection. None for all connections.
+
+* ``pattern``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Only read the traces matching this regular expression.
+
+* ``max_lines``
+
+  / *Condition*: optional / *Type*: int / *Default*: 1000 /
+
+  Maximum number of traces.
+
+**Returns:**
+
+* ``traces``
+
+  / *Type*: list /
+
+  Dictionaries with 'time' (seconds since the epoch), 'connection' and 'trace'.
+      """
+      TraceArchiveWriter.flush_archive(archive_path)
+      try:
+         with TraceArchiveReader(get_archive_path(archive_path)) as reader:
+            return [{'time': timestamp, 'connection': connection_name, 'trace': msg}
+                    for (timestamp, connection_name, msg) in reader.read(start_time, end_time, conn_name, pattern, int(max_lines))]
+      except (OSError, ValueError, re.error) as ex:
+         raise AssertionError("Unable to read the trace archive '%s'. Reason: %s" % (archive_path, ex))
+
+   @keyword
+   def query_trace_archive(self, database_path, match=None, start_time=None, end_time=None, conn_name=None, max_lines=1000):
+      """
+Query the traces stored in a trace database (refer to the 'trace_database' config) by full-text search,
+time range and connection.
+
+**Arguments:**
+
+* ``database_path``
+
+  / *Condition*: required / *Type*: str /
+
+  Path of the trace database. Relative paths refer to the output directory.
+
+* ``match``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Full-text search expression, e.g. 'error AND timeout' or '"link down"'. None for all traces.
+
+* ``start_time``
+
+  / *Condition*: optional / *Type*: float / str / *Default*: None /
+
+  Begin of the time range, seconds since the epoch or a date like '2026-10-17 08:15:00.250'. None for no limit.
+
+* ``end_time``
+
+  / *Condition*: optional / *Type*: float / str / *Default*: None /
+
+  End of the time range, seconds since the epoch or a date like '2026-10-17 08:15:00.250'. None for no limit.
+
+* ``conn_name``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Only query the traces of this connection. None for all connections.
+
+* ``max_lines``
+
+  / *Condition*: optional / *Type*: int / *Default*: 1000 /
+
+  Maximum number of traces.
+
+**Returns:**
+
+* ``traces``
+
+  / *Type*: list /
+
+  Dictionaries with 'time' (seconds since the epoch), 'connection' and 'trace', ordered by time.
+      """
+      if not TraceDatabaseWriter.flush_database(database_path):
+         BuiltIn().log("The trace database '%s' may not contain all received traces, its writer failed or didn't commit them in time."
+                       % database_path, constants.LOG_LEVEL_WARNING)
+      try:
+         with TraceDatabaseReader(get_archive_path(database_path)) as reader:
+            return [{'time': timestamp, 'connection': connection_name, 'trace': msg}
+                    for (timestamp, connection_name, msg) in reader.query(match, start_time, end_time, conn_name, int(max_lines))]
+      except (ValueError, sqlite3.Error) as ex:
+         raise AssertionError("Unable to query the trace database '%s'. Reason: %s" % (database_path, ex))
+
+   @keyword
+   def get_connection_statistics(self, conn_name=None):
+      """
+Get the counters and gauges of a connection: received and sent lines and bytes, lines per second, active trace
+filters, trace queue depths, matches, timeouts, reconnects and the time spent in read, dispatch and log.
+
+**Arguments:**
+
+* ``conn_name``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Name of the connection. None for all connections.
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  Statistics of the connection, or dictionary of the statistics per connection name if no connection is given.
+      """
+      if conn_name is None:
+         return {name: connection_obj.get_connection_statistics() for name, connection_obj in self.connection_manage_dict.items()}
+      if conn_name not in self.connection_manage_dict:
+         raise AssertionError("The '%s' connection  hasn't been established. Please connect first." % conn_name)
+      return self.connection_manage_dict[conn_name].get_connection_statistics()
+
+   @keyword
+   def get_latency_statistics(self, conn_name=None, percentiles=None):
+      """
+Get the latency distributions of a connection, or of all connections merged: the latency from sending a command
+(or starting the wait) until the first matching trace message was received, counted by each successful **verify**
+and wait for traces, and the delay from reading a trace message until it was dispatched to the trace filters.
+
+**Arguments:**
+
+* ``conn_name``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Name of the connection. None for all connections.
+
+* ``percentiles``
+
+  / *Condition*: optional / *Type*: list / *Default*: None /
+
+  Percentiles to be taken, between 0 and 100. None for 50, 90 and 99.
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  'match_latency' and 'dispatch_delay', each with count, min, max, mean and 'percentiles' (e.g. 'p99') in seconds.
+      """
+      if conn_name is None:
+         histograms = self._merge_latency_histograms(connection_obj.get_latency_histograms()
+                                                     for connection_obj in self.connection_manage_dict.values())
+      elif conn_name not in self.connection_manage_dict:
+         raise AssertionError("The '%s' connection  hasn't been established. Please connect first." % conn_name)
+      else:
+         histograms = self.connection_manage_dict[conn_name].get_latency_histograms()
+      if percentiles is None:
+         percentiles = constants.LATENCY_PERCENTILES
+      elif isinstance(percentiles, str):
+         percentiles = percentiles.split(',')
+      try:
+         return {name: histogram.get_snapshot([float(percentile) for percentile in percentiles])
+                 for name, histogram in histograms.items()}
+      except ValueError as ex:
+         raise AssertionError("Invalid percentiles '%s'. Reason: %s" % (percentiles, ex))
+
+   @keyword
+   def start_metrics_server(self, port=0, host=constants.METRICS_SERVER_DEFAULT_HOST, unix_socket=None):
+      """
+Start a local HTTP endpoint exposing the live metrics of all connections, e.g. to watch the connections of a long
+running suite without touching the Robot Framework process. '/metrics' answers in Prometheus text format,
+'/metrics.json' as JSON. A running metrics server is stopped before.
+
+The metrics are read without locks by a background thread when a request arrives, refer to
+ConnectionBase.get_live_metrics().
+
+**Arguments:**
+
+* ``port``
+
+  / *Condition*: optional / *Type*: int / *Default*: 0 /
+
+  TCP port. 0 for a free port chosen by the system.
+
+* ``host``
+
+  / *Condition*: optional / *Type*: str / *Default*: '127.0.0.1' /
+
+  Address to listen on.
+
+* ``unix_socket``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Path of a Unix socket to listen on instead of the TCP port. Not supported on Windows.
+
+**Returns:**
+
+* ``url``
+
+  / *Type*: str /
+
+  URL of the Prometheus endpoint, or 'unix:<path>' for a Unix socket.
+      """
+      if self._metrics_server is not None:
+         self.stop_metrics_server()
+      try:
+         self._metrics_server = MetricsServer(self._get_live_metrics, host, int(port), unix_socket)
+      except (OSError, ValueError) as ex:
+         raise AssertionError("Unable to start the metrics server. Reason: %s" % ex)
+      BuiltIn().log("Metrics server is listening on %s" % self._metrics_server.url, constants.LOG_LEVEL_INFO)
+      return self._metrics_server.url
+
+   @keyword
+   def stop_metrics_server(self):
+      """
+Stop the metrics server started by 'start metrics server'. Does nothing if it isn't running.
+
+**Returns:**
+
+(*no returns*)
+      """
+      if self._metrics_server is not None:
+         metrics_server = self._metrics_server
+         self._metrics_server = None
+         try:
+            metrics_server.stop()
+         except ValueError as ex:
+            raise AssertionError("Unable to remove the socket of the metrics server. Reason: %s" % ex)
+
+   def _get_live_metrics(self):
+      """
+Get the live metrics of all connections for the metrics server.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  Metrics per connection name, refer to ConnectionBase.get_live_metrics().
+      """
+      # the connections may be changed by the Robot Framework thread in the meantime
+      return {conn_name: connection_obj.get_live_metrics() for conn_name, connection_obj in list(self.connection_manage_dict.items())}
+
+   @keyword
+   def set_trace_mark(self):
+      """
+Mark the current point in time. 'verify' and 'expect' with this mark also match the traces received since then.
+
+**Returns:**
+
+* ``mark``
+
+  / *Type*: int /
+
+  The trace mark.
+      """
+      return ConnectionBase.set_trace_mark()
+
+   @keyword
+   def expect(self, conn_name, search_pattern, fetch_block=False, eob_pattern='.*', filter_pattern='.*', send_cmd=None, scope=constants.TRACE_SCOPE_CONNECTION, since_mark=None, **kwargs):
+      """
+Register a wait for a pattern before the response arrives, e.g. before sending a command or doing other device actions.
+The received traces are matched in background, the result is collected by 'wait for expectation'.
+
+**Arguments:**
+
+* ``conn_name``
+
+  / *Condition*: required / *Type*: str /
+
+  Name of connection.
+
+* ``search_pattern``
+
+  / *Condition*: required / *Type*: str /
+
+  Regular expression all received trace messages are compare to.
+
+* ``fetch_block``
+
+  / *Condition*: optional / *Type*: bool / *Default*: False /
+
+  Determine if 'fetch block' feature is used.
+
+* ``eob_pattern``
+
+  / *Condition*: optional / *Type*: str / *Default*: '.*' /
+
+  The end of block pattern.
+
+* ``filter_pattern``
+
+  / *Condition*: optional / *Type*: str / *Default*: '.*' /
+
+  Pattern to filter message line by line.
+
+* ``send_cmd``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Command to be sent after registering the expectation. Nothing is sent if None.
+
+* ``scope``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'connection' /
+
+  Scope of the traces to be matched, refer to 'verify'.
+
+* ``since_mark``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Trace mark returned by 'set trace mark', refer to 'verify'.
+
+* ``kwargs``
+
+  / *Condition*: optional / *Type*: Dict / *Default*: None /
+
+  The optional arguments for sending the command, refer to 'verify'.
+
+**Returns:**
+
+* ``handle``
+
+  / *Type*: int /
+
+  Handle of the expectation for 'wait for expectation' or 'cancel expectation'.
+      """
+      if conn_name not in self.connection_manage_dict.keys():
+         raise AssertionError("The '%s' connection  hasn't been established. Please connect first." % conn_name)
+
+      connection_obj = self.connection_manage_dict[conn_name]
+      fct_args = {}
+      if send_cmd is not None:
+         fct_args = dict(kwargs, send_cmd=send_cmd)
+      handle = connection_obj.expect(search_pattern, fetch_block, eob_pattern, filter_pattern, scope, since_mark, **fct_args)
+      self._expectation_conn_dict[handle] = connection_obj
+      return handle
+
+   @keyword
+   def wait_for_expectation(self, handle, timeout=5):
+      """
+Wait for the result of an expectation registered by 'expect'.
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by 'expect'.
+
+* ``timeout``
+
+  / *Condition*: optional / *Type*: float / *Default*: 5 /
+
+  Maximum time in seconds to wait if the pattern hasn't been matched yet.
+
+**Returns:**
+
+* ``match_res``
+
+  / *Type*: str /
+
+  Matched string, refer to 'verify'.
+      """
+      connection_obj = self._expectation_conn_dict.pop(int(handle), None)
+      if connection_obj is None:
+         raise AssertionError("No expectation with handle '%s' is registered." % handle)
+
+      res = connection_obj.wait_for_expectation(int(handle), float(timeout))
+      if not res:
+         raise AssertionError("Unable to match the pattern after '%s' time." % timeout)
+
+      return res
+
+   @keyword
+   def cancel_expectation(self, handle):
+      """
+Remove an expectation registered by 'expect' without waiting for its result.
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by 'expect'.
+
+**Returns:**
+
+(*no returns*)
+      """
+      connection_obj = self._expectation_conn_dict.pop(int(handle), None)
+      if connection_obj is not None:
+         connection_obj.cancel_expectation(int(handle))
+
+   @keyword
+   def prewarm_pattern_cache(self, *patterns):
+      """
+Compile the given search patterns into the pattern cache shared by all connections, e.g. at suite setup,
+so that the first 'verify' with these patterns doesn't spend time for compiling.
+
+**Arguments:**
+
+* ``patterns``
+
+  / *Condition*: required / *Type*: str or list /
+
+  Search patterns as used in 'verify'. Can be passed as separated arguments or as lists.
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  Statistics of the pattern cache after pre-warming, refer to 'get pattern cache statistics'.
+      """
+      for pattern in patterns:
+         pattern_list = pattern if isinstance(pattern, (list, tuple)) else [pattern]
+         for search_pattern in pattern_list:
+            try:
+               pattern_cache.compile(search_pattern, constants.TRACE_PATTERN_FLAGS)
+            except re.error as err_msg:
+               raise AssertionError("Unable to compile the pattern '%s': %s" % (search_pattern, err_msg))
+
+      return pattern_cache.get_statistics()
+
+   @keyword
+   def get_pattern_cache_statistics(self):
+      """
+Get the statistics of the pattern cache shared by all connections.
+
+**Returns:**
+
+* ``statistics``
+
+  / *Type*: dict /
+
+  size: number of cached patterns, maxsize: capacity, hits, misses, evictions: counters of the cache.
+      """
+      return pattern_cache.get_statistics()
+
 
 # >>>> FOR UNIT TEST FUNCTIONALITY
 class TestOption:
@@ -0,0 +1,431 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: connection_metrics.py
+#
+# Description:
+#   Provide the per-connection counters, gauges and latency histograms of the traffic and of the receiver pipeline.
+#   Each counter is only updated by one thread, so no lock is needed.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+# - Add log-bucketed latency histograms.
+#
+# *******************************************************************************
+import QConnectBase.constants as constants
+import array
+import time
+
+
+def get_text_size(text):
+   """
+Get the size of a text in bytes when encoded as UTF-8.
+
+**Arguments:**
+
+* ``text``
+
+  / *Condition*: required / *Type*: str /
+
+  The text.
+
+**Returns:**
+
+  / *Type*: int /
+
+  Number of bytes.
+   """
+   if text.isascii():
+      return len(text)
+   return len(text.encode('utf-8', 'replace'))
+
+
+class LatencyHistogram(object):
+   """
+Histogram of latencies in nanoseconds with logarithmic buckets (HDR histogram layout) and fixed memory.
+
+Values below 2^sub_bucket_bits ns are counted exactly. Above, each power of two is divided into
+2^(sub_bucket_bits-1) buckets, so the relative error of a percentile is below 2^(1-sub_bucket_bits), i.e. 1.6% with
+the default of 7 bits. Values above 2^max_bits ns (about 19.5 hours by default) are counted in the last bucket.
+Histograms with the same layout can be merged, e.g. the histograms of several connections.
+   """
+   def __init__(self, sub_bucket_bits=constants.LATENCY_HISTOGRAM_SUB_BUCKET_BITS, max_bits=constants.LATENCY_HISTOGRAM_MAX_BITS):
+      """
+Constructor for LatencyHistogram class.
+
+**Arguments:**
+
+* ``sub_bucket_bits``
+
+  / *Condition*: optional / *Type*: int / *Default*: 7 /
+
+  Number of significant bits of a bucket.
+
+* ``max_bits``
+
+  / *Condition*: optional / *Type*: int / *Default*: 46 /
+
+  Bit length of the highest tracked value.
+      """
+      if not 1 < int(sub_bucket_bits) < int(max_bits):
+         raise ValueError("The sub bucket bits must be greater than 1 and less than the max bits.")
+      self.sub_bucket_bits = int(sub_bucket_bits)
+      self.max_bits = int(max_bits)
+      self._sub_bucket_count = 1 << self.sub_bucket_bits
+      self._half_count = self._sub_bucket_count >> 1
+      n_buckets = self._sub_bucket_count + (self.max_bits - self.sub_bucket_bits) * self._half_count
+      self._counts = array.array('Q', bytes(8 * n_buckets))
+      self.count = 0
+      self.minimum = None
+      self.maximum = None
+      self.total = 0
+
+   def _get_index(self, value):
+      """
+Get the bucket index of a value.
+      """
+      if value < self._sub_bucket_count:
+         return value
+      shift = value.bit_length() - self.sub_bucket_bits
+      return min(self._sub_bucket_count + (shift - 1) * self._half_count + (value >> shift) - self._half_count,
+                 len(self._counts) - 1)
+
+   def _get_highest_value(self, index):
+      """
+Get the highest value counted in a bucket.
+      """
+      if index < self._sub_bucket_count:
+         return index
+      (shift, sub_bucket) = divmod(index - self._sub_bucket_count, self._half_count)
+      return ((sub_bucket + self._half_count + 1) << (shift + 1)) - 1
+
+   def record(self, value):
+      """
+Count a latency.
+
+**Arguments:**
+
+* ``value``
+
+  / *Condition*: required / *Type*: int /
+
+  Latency in nanoseconds. Negative values are counted as 0.
+
+**Returns:**
+
+(*no returns*)
+      """
+      value = max(int(value), 0)
+      self._counts[self._get_index(value)] += 1
+      self.count += 1
+      self.total += value
+      if self.minimum is None or value < self.minimum:
+         self.minimum = value
+      if self.maximum is None or value > self.maximum:
+         self.maximum = value
+
+   def merge(self, other):
+      """
+Add the counts of another histogram with the same layout.
+
+**Arguments:**
+
+* ``other``
+
+  / *Condition*: required / *Type*: LatencyHistogram /
+
+  The histogram to be added.
+
+**Returns:**
+
+(*no returns*)
+      """
+      if (other.sub_bucket_bits, other.max_bits) != (self.sub_bucket_bits, self.max_bits):
+         raise ValueError("Only latency histograms with the same layout can be merged.")
+      if not other.count:
+         return
+      counts = self._counts
+      for index, count in enumerate(other._counts):
+         if count:
+            counts[index] += count
+      self.count += other.count
+      self.total += other.total
+      if self.minimum is None or other.minimum < self.minimum:
+         self.minimum = other.minimum
+      if self.maximum is None or other.maximum > self.maximum:
+         self.maximum = other.maximum
+
+   def copy(self):
+      """
+Get a copy of the histogram.
+
+**Returns:**
+
+  / *Type*: LatencyHistogram /
+
+  The copy.
+      """
+      histogram = LatencyHistogram(self.sub_bucket_bits, self.max_bits)
+      histogram.merge(self)
+      return histogram
+
+   def get_difference(self, older):
+      """
+Get a histogram of the latencies counted since an older copy of this histogram was taken.
+
+The minimum and the maximum of the difference are taken from its lowest and highest bucket, limited by the minimum
+and the maximum of this histogram.
+
+**Arguments:**
+
+* ``older``
+
+  / *Condition*: required / *Type*: LatencyHistogram /
+
+  Older copy of this histogram, refer to copy(). None for a histogram without latencies.
+
+**Returns:**
+
+  / *Type*: LatencyHistogram /
+
+  The latencies counted since the older copy.
+      """
+      histogram = self.copy()
+      if older is None or not older.count:
+         return histogram
+      if (older.sub_bucket_bits, older.max_bits) != (self.sub_bucket_bits, self.max_bits):
+         raise ValueError("Only latency histograms with the same layout can be subtracted.")
+      counts = histogram._counts
+      lowest_index = highest_index = None
+      for index, count in enumerate(older._counts):
+         if count:
+            counts[index] -= min(count, counts[index])
+      for index, count in enumerate(counts):
+         if count:
+            if lowest_index is None:
+               lowest_index = index
+            highest_index = index
+      histogram.count = max(self.count - older.count, 0)
+      histogram.total = max(self.total - older.total, 0)
+      if lowest_index is None:
+         histogram.count = histogram.total = 0
+         histogram.minimum = histogram.maximum = None
+      else:
+         lowest = self._get_highest_value(lowest_index - 1) + 1 if lowest_index else 0
+         histogram.minimum = max(lowest, self.minimum)
+         histogram.maximum = min(self._get_highest_value(highest_index), self.maximum)
+      return histogram
+
+   def get_percentile(self, percentile):
+      """
+Get the latency which is not exceeded by a percentage of the counted latencies.
+
+**Arguments:**
+
+* ``percentile``
+
+  / *Condition*: required / *Type*: float /
+
+  Percentile between 0 and 100.
+
+**Returns:**
+
+  / *Type*: int /
+
+  Highest latency in nanoseconds of the bucket which contains the percentile, not above the maximum.
+
+  None if no latency is counted.
+      """
+      if not self.count:
+         return None
+      rank = max(int(-(-float(percentile) * self.count // 100)), 1)
+      cumulated = 0
+      for index, count in enumerate(self._counts):
+         cumulated += count
+         if cumulated >= rank:
+            return min(self._get_highest_value(index), self.maximum)
+      return self.maximum
+
+   def get_snapshot(self, percentiles=constants.LATENCY_PERCENTILES):
+      """
+Get the statistics of the counted latencies.
+
+**Arguments:**
+
+* ``percentiles``
+
+  / *Condition*: optional / *Type*: list / *Default*: (50, 90, 99) /
+
+  Percentiles to be taken, between 0 and 100.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  count, min, max, mean and 'percentiles' (dictionary with keys like 'p50', 'p99.9') in seconds. None for no latency.
+      """
+      def to_seconds(value):
+         return None if value is None else value / 1e9
+
+      return {
+         'count': self.count,
+         'min': to_seconds(self.minimum),
+         'max': to_seconds(self.maximum),
+         'mean': self.total / self.count / 1e9 if self.count else None,
+         'percentiles': {'p%g' % float(percentile): to_seconds(self.get_percentile(percentile)) for percentile in percentiles}
+      }
+
+
+class ConnectionMetrics(object):
+   """
+Counters and gauges of a connection.
+
+* received lines and bytes, updated by the receiver thread.
+* sent lines and bytes, updated by the sending thread.
+* matches and the time spent in dispatch and log, updated by the dispatch thread.
+* timeouts of waits for traces, connects and broken connections.
+* latency histograms of send to first match ('match_latency', updated by the waiting thread) and of read to dispatch
+  ('dispatch_delay', updated by the dispatch thread).
+   """
+   def __init__(self):
+      """
+Constructor for ConnectionMetrics class.
+      """
+      self.started_ns = time.monotonic_ns()
+      self.lines_received = 0
+      self.bytes_received = 0
+      self.lines_sent = 0
+      self.bytes_sent = 0
+      self.matches = 0
+      self.timeouts = 0
+      self.connects = 0
+      self.broken = 0
+      self.read_ns = 0
+      self.dispatch_ns = 0
+      self.log_ns = 0
+      self.peak_lines_per_second = 0
+      self._rate_second = 0
+      self._rate_count = 0
+      self._last_rate = 0
+      self.match_latency = LatencyHistogram()
+      self.dispatch_delay = LatencyHistogram()
+
+   def add_received(self, msg, read_ns, timestamp_ns):
+      """
+Account a received message.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Received message.
+
+* ``read_ns``
+
+  / *Condition*: required / *Type*: int /
+
+  Time spent in reading the message in nanoseconds.
+
+* ``timestamp_ns``
+
+  / *Condition*: required / *Type*: int /
+
+  Monotonic receive time of the message in nanoseconds.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self.lines_received += 1
+      self.bytes_received += get_text_size(msg)
+      self.read_ns += read_ns
+      second = timestamp_ns // 1000000000
+      if second != self._rate_second:
+         self._last_rate = self._rate_count if second == self._rate_second + 1 else 0
+         self._rate_second = second
+         self._rate_count = 0
+      self._rate_count += 1
+      if self._rate_count > self.peak_lines_per_second:
+         self.peak_lines_per_second = self._rate_count
+
+   def add_sent(self, msg):
+      """
+Account a sent message.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Sent message.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self.lines_sent += 1
+      self.bytes_sent += get_text_size(str(msg))
+
+   def get_lines_per_second(self):
+      """
+Get the number of lines received within the last complete second.
+
+**Returns:**
+
+  / *Type*: int /
+
+  Lines per second.
+      """
+      second = time.monotonic_ns() // 1000000000
+      if second == self._rate_second + 1:
+         return self._rate_count
+      if second == self._rate_second:
+         return self._last_rate
+      return 0
+
+   def get_snapshot(self):
+      """
+Get the current values of the counters.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  Counters, rates and times in seconds. The latency histograms are not included.
+      """
+      uptime = (time.monotonic_ns() - self.started_ns) / 1e9
+      return {
+         'uptime': uptime,
+         'lines_received': self.lines_received,
+         'bytes_received': self.bytes_received,
+         'lines_sent': self.lines_sent,
+         'bytes_sent': self.bytes_sent,
+         'lines_per_second': self.get_lines_per_second(),
+         'peak_lines_per_second': self.peak_lines_per_second,
+         'average_lines_per_second': self.lines_received / uptime if uptime > 0 else 0.0,
+         'matches': self.matches,
+         'timeouts': self.timeouts,
+         'connects': self.connects,
+         'reconnects': max(self.connects - 1, 0),
+         'broken': self.broken,
+         'read_time': self.read_ns / 1e9,
+         'dispatch_time': self.dispatch_ns / 1e9,
+         'log_time': self.log_ns / 1e9
+      }
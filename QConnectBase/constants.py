@@ -27,6 +27,7 @@
 #
 # *******************************************************************************
 import platform
+import re
 
 OS_LINUX_STR = "linux"
 OS_WINDOWS_STR = "windows"
@@ -38,6 +39,48 @@ LOG_LEVEL_DEBUG = 'DEBUG'
 LOG_LEVEL_ERROR = 'ERROR'
 LOG_LEVEL_WARNING = 'WARN'
 
+TRACE_SCOPE_CONNECTION = 'connection'
+TRACE_SCOPE_GLOBAL = 'global'
+
+TRACE_QUEUE_DEFAULT_SIZE = 10000
+TRACE_QUEUE_BLOCK_TIMEOUT = 5.0
+TRACE_HISTORY_DEFAULT_SIZE = 10000
+
+TRACE_PATTERN_FLAGS = re.M | re.S | re.U
+PATTERN_CACHE_DEFAULT_SIZE = 1024
+TRACE_AGGREGATION_DEFAULT_PERCENTILES = (50, 90, 99)
+
+LOG_QUEUE_DEFAULT_SIZE = 10000
+LOG_FLUSH_DEFAULT_INTERVAL = 1.0
+LOG_WRITE_BATCH_SIZE = 512
+LOG_SEGMENT_INDEX_SUFFIX = '.index.jsonl'
+ROBOT_LOG_DEFAULT_SAMPLE_RATE = 100
+ROBOT_LOG_DEFAULT_RATE_LIMIT = 100
+ROBOT_LOG_DEFERRED_DEFAULT_SIZE = 100000
+ROBOT_LOG_FLUSH_MAX_LINES = 1000
+
+TRACE_ARCHIVE_INDEX_INTERVAL = 65536
+TRACE_ARCHIVE_INDEX_SUFFIX = '.idx'
+TRACE_ARCHIVE_BUFFER_SIZE = 1024 * 1024
+
+TRACE_DATABASE_QUEUE_SIZE = 100000
+TRACE_DATABASE_BATCH_SIZE = 1000
+TRACE_DATABASE_FLUSH_TIMEOUT = 10
+
+RECV_THREAD_STOP_TIMEOUT = 5
+
+CONNECTION_STATISTICS_SUMMARY_SIZE = 5
+CONNECTION_STATISTICS_COUNTERS = ('lines_received', 'bytes_received', 'lines_sent', 'bytes_sent', 'matches', 'timeouts',
+                                  'reconnects', 'broken', 'read_time', 'dispatch_time', 'log_time')
+
+LATENCY_HISTOGRAM_SUB_BUCKET_BITS = 7
+LATENCY_HISTOGRAM_MAX_BITS = 46
+LATENCY_PERCENTILES = (50, 90, 99)
+
+METRICS_SERVER_DEFAULT_HOST = '127.0.0.1'
+METRICS_SERVER_POLL_INTERVAL = 0.5
+METRICS_PROMETHEUS_PREFIX = 'qconnect'
+
 LOG_FORMATTER = "%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s"
 platform_ = platform.system().lower()
 if platform_.startswith(OS_WINDOWS_STR):
@@ -59,6 +102,45 @@ class SocketType:
       pass
 
 
+class TraceQueuePolicy:
+   BLOCK = "block"
+   DROP_OLDEST = "drop-oldest"
+   DROP_NEWEST = "drop-newest"
+   KEEP_LATEST = "keep-latest"
+
+   def __init__(self):
+      pass
+
+
+class TraceMatchMode:
+   ANY = "any"
+   ALL = "all"
+   SEQUENCE = "sequence"
+
+   def __init__(self):
+      pass
+
+
+class RobotLogPolicy:
+   FULL = "full"
+   SAMPLED = "sampled"
+   RATE_CAPPED = "rate-capped"
+   MATCHES_ONLY = "matches-only"
+   NONE = "none"
+
+   def __init__(self):
+      pass
+
+
+class LogCompression:
+   NONE = "none"
+   GZIP = "gzip"
+   LZMA = "lzma"
+
+   def __init__(self):
+      pass
+
+
 class String:
    CONNECTION_NAME_EXIST = "The connection name '%s' has already existed! Please use other name"
    CONNECTION_TYPE_UNSUPPORTED = "The %s connection type hasn't been supported"
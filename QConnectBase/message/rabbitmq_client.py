@@ -31,6 +31,7 @@ from robot.libraries.BuiltIn import BuiltIn
 from QConnectBase.connection_base import ConnectionBase, BrokenConnError
 from QConnectBase.utils import DictToClass
 from inspect import currentframe
+from QConnectBase.robot_log import robot_log
 import QConnectBase.constants as constants
 import time
 import threading
@@ -54,6 +55,7 @@ class RabbitmqClient(ConnectionBase):
 Rabbitmq client connection class.
    """
    _CONNECTION_TYPE = "RabbitmqClient"
+   _EVENT_DRIVEN_READ = True
 
    _rabbit_instance = 0
 
@@ -86,6 +88,7 @@ Constructor for RabbitmqClient class.
       self.resp_queue = queue.Queue()
       self._is_connected = False
       self.callback_queue = None
+      self._consumer_ready = threading.Event()
       # configure and initialize the low-level receiver thread
       RabbitmqClient._rabbit_instance += 1
       self._init_thread_receiver(RabbitmqClient._rabbit_instance)
@@ -103,9 +106,11 @@ Constructor for RabbitmqClient class.
    (*no returns*)
          """
          _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-         BuiltIn().log("%s: low-level receiver thread started." % _mident, constants.LOG_LEVEL_INFO)
-         while self.callback_queue is None and not self._llrecv_thrd_term.isSet():
-            time.sleep(ConnectionBase.RECV_MSGS_POLLING_INTERVAL)
+         robot_log.log("%s: low-level receiver thread started." % _mident, constants.LOG_LEVEL_INFO)
+         while not self._consumer_ready.is_set() and not self._llrecv_thrd_term.isSet():
+            self._consumer_ready.wait(self.RECV_IDLE_TIMEOUT)
+         if self.callback_queue is None:
+            return
          self.channel.basic_consume(queue=self.callback_queue, on_message_callback=self.on_response, auto_ack=True)
          self.channel.start_consuming()
 
@@ -115,6 +120,7 @@ Constructor for RabbitmqClient class.
       if isinstance(body, bytes):
             body = body.decode('utf-8')
       self.resp_queue.put(body)
+      self._notify_receiver()
 
    def connect(self):
       """
@@ -130,6 +136,7 @@ Implementation for creating a rabbitmq connection.
          self.channel = self.connection.channel()
          queue = self.channel.queue_declare(queue=self.queue_name, durable=False)
          self.callback_queue = queue.method.queue
+         self._consumer_ready.set()
 
          # self.channel.exchange_declare(exchange=exchange_name, exchange_type='topic')
 
@@ -138,6 +145,8 @@ Implementation for creating a rabbitmq connection.
 
          BuiltIn().log("%s: successfully established connection to Rabitmq Broker." % _mident, constants.LOG_LEVEL_INFO)
          self._is_connected = True
+         self._metrics.connects += 1
+         self._notify_receiver()
 
       except Exception as reason:
          BuiltIn().log("%s: %s" % (_mident, reason), constants.LOG_LEVEL_ERROR)
@@ -167,8 +176,9 @@ Send message to rabbitmq connection.
       """
       # noinspection PyBroadException
       try:
-         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-         BuiltIn().log("%s: sending: '%s'" % (_mident, msg), constants.LOG_LEVEL_DEBUG)
+         if robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+            _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+            BuiltIn().log("%s: sending: '%s'" % (_mident, msg), constants.LOG_LEVEL_DEBUG)
          connection = pika.BlockingConnection(pika.ConnectionParameters(host=self._host, port=self._port))
          channel = connection.channel()
          channel.basic_publish(
@@ -193,12 +203,15 @@ Read data from rabbitmq connection.
   / *Type*: str /
 
   Data from rabbitmq connection.
+
+  None if no response has been received.
       """
       response = None
       try:
          response = self.resp_queue.get(block=False)
       except queue.Empty:
-         time.sleep(ConnectionBase.RECV_MSGS_POLLING_INTERVAL)
+         # on_response() wakes up the receiver thread when the next response arrives.
+         pass
       return response
 
    def close(self):
@@ -232,6 +245,7 @@ Quit and stop receiver thread.
       # stop the low-level receiver thread
       if self._llrecv_thrd_obj and self._llrecv_thrd_obj.is_alive():
          self._llrecv_thrd_term.set()
+         self._consumer_ready.set()
 
       self._llrecv_thrd_obj = None
       self.close()
@@ -455,7 +469,7 @@ Consume the message from specific queue.
 (*no returns*)
       """
       def callback(ch, method, properties, body):
-         print(f"Received message from {queue_name}: {body}")
+         robot_log.log("Received message from %s: %s" % (queue_name, body), constants.LOG_LEVEL_INFO)
          # Set the event when a message is received
          # Process the received message
          data = json.loads(body.decode())
@@ -475,7 +489,7 @@ Consume the message from specific queue.
                      stop_event.set() 
                      ch.stop_consuming()
                except Exception as ex:
-                  print(ex)
+                  robot_log.log("%s" % ex, constants.LOG_LEVEL_WARNING)
 
       connection = pika.BlockingConnection(pika.ConnectionParameters(host=self.host, port=self._port))
       
@@ -0,0 +1,286 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: metrics_server.py
+#
+# Description:
+#   Provide the local HTTP endpoint exposing the live metrics of the connections in Prometheus text format
+#   ('/metrics') and as JSON ('/metrics.json'). The endpoint listens on a local TCP port or a Unix socket and is
+#   served by one background thread, which is idle between requests apart from a shutdown check twice a second.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+#
+# *******************************************************************************
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import QConnectBase.constants as constants
+import json
+import math
+import os
+import socketserver
+import stat
+import threading
+
+# (key of the connection metrics, metric name, type, help)
+_COUNTERS = (
+   ('lines_received', 'lines_received_total', 'counter', 'Received trace lines.'),
+   ('bytes_received', 'bytes_received_total', 'counter', 'Received bytes (UTF-8).'),
+   ('lines_sent', 'lines_sent_total', 'counter', 'Sent commands.'),
+   ('bytes_sent', 'bytes_sent_total', 'counter', 'Sent bytes (UTF-8).'),
+   ('matches', 'matches_total', 'counter', 'Trace lines matched by a trace filter.'),
+   ('timeouts', 'timeouts_total', 'counter', 'Waits for traces which timed out.'),
+   ('connects', 'connects_total', 'counter', 'Established connections.'),
+   ('broken', 'broken_total', 'counter', 'Broken connections.'),
+   ('read_time', 'read_seconds_total', 'counter', 'Time spent in reading trace lines.'),
+   ('dispatch_time', 'dispatch_seconds_total', 'counter', 'Time spent in dispatching trace lines to the trace filters.'),
+   ('log_time', 'log_seconds_total', 'counter', 'Time spent in logging trace lines.'),
+   ('trace_queue_dropped', 'trace_queue_dropped_total', 'counter', 'Trace results dropped by full trace queues.'),
+   ('lines_per_second', 'lines_per_second', 'gauge', 'Trace lines received within the last complete second.'),
+   ('peak_lines_per_second', 'peak_lines_per_second', 'gauge', 'Highest number of trace lines received within a second.'),
+   ('active_filters', 'active_filters', 'gauge', 'Active trace filters.'),
+   ('trace_queue_depth', 'trace_queue_depth', 'gauge', 'Pending trace results in the trace queues.'),
+   ('uptime', 'uptime_seconds', 'gauge', 'Time since the connection object was created.')
+)
+
+_PIPELINE_GAUGES = (
+   ('depth', 'pipeline_depth', 'Trace lines waiting for the dispatch thread.'),
+   ('max_depth', 'pipeline_max_depth', 'Highest number of trace lines waiting for the dispatch thread.'),
+   ('max_lag', 'pipeline_max_lag_seconds', 'Highest delay from reading a trace line until it was dispatched.')
+)
+
+_LATENCIES = (
+   ('match_latency', 'match_latency_seconds', 'Latency from sending a command until the first matching trace line.'),
+   ('dispatch_delay', 'dispatch_delay_seconds', 'Delay from reading a trace line until it was dispatched.')
+)
+
+
+def _escape_label(value):
+   """
+Escape a label value of the Prometheus text format.
+   """
+   return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+   """
+Format a sample value of the Prometheus text format, non-finite values as '+Inf', '-Inf' and 'NaN'.
+   """
+   value = float(value)
+   if math.isnan(value):
+      return 'NaN'
+   if math.isinf(value):
+      return '+Inf' if value > 0 else '-Inf'
+   return repr(value)
+
+
+def _remove_unix_socket(path):
+   """
+Remove a stale Unix socket. Other files are not removed.
+
+**Arguments:**
+
+* ``path``
+
+  / *Condition*: required / *Type*: str /
+
+  Path of the Unix socket.
+
+**Returns:**
+
+(*no returns*)
+   """
+   try:
+      mode = os.stat(path).st_mode
+   except FileNotFoundError:
+      return
+   if not stat.S_ISSOCK(mode):
+      raise ValueError("'%s' exists and is not a Unix socket." % path)
+   os.remove(path)
+
+
+def format_prometheus(metrics, prefix=constants.METRICS_PROMETHEUS_PREFIX):
+   """
+Format the metrics of the connections in the Prometheus text exposition format (version 0.0.4).
+
+**Arguments:**
+
+* ``metrics``
+
+  / *Condition*: required / *Type*: dict /
+
+  Metrics per connection name, refer to ConnectionBase.get_live_metrics().
+
+* ``prefix``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'qconnect' /
+
+  Prefix of the metric names.
+
+**Returns:**
+
+  / *Type*: str /
+
+  The metrics, one sample per line. The latency histograms are exposed as summaries.
+   """
+   lines = []
+   connections = [(_escape_label(conn_name), item) for conn_name, item in sorted(metrics.items())]
+
+   def add_family(name, metric_type, help_text, samples):
+      lines.append("# HELP %s_%s %s" % (prefix, name, help_text))
+      lines.append("# TYPE %s_%s %s" % (prefix, name, metric_type))
+      for (labels, value) in samples:
+         lines.append("%s_%s{%s} %s" % (prefix, name, labels, _format_value(value)))
+
+   for (key, name, metric_type, help_text) in _COUNTERS:
+      add_family(name, metric_type, help_text,
+                 [('connection="%s"' % conn_name, item[key]) for conn_name, item in connections if key in item])
+   for (key, name, help_text) in _PIPELINE_GAUGES:
+      add_family(name, 'gauge', help_text,
+                 [('connection="%s"' % conn_name, item['pipeline'][key]) for conn_name, item in connections if item.get('pipeline')])
+   add_family('thread_alive', 'gauge', 'Liveness of the receiver and dispatch thread (1 is alive).',
+              [('connection="%s",thread="%s"' % (conn_name, thread_name), is_alive)
+               for conn_name, item in connections for thread_name, is_alive in sorted(item.get('threads', {}).items())])
+   for (key, name, help_text) in _LATENCIES:
+      samples = []
+      totals = []
+      for conn_name, item in connections:
+         snapshot = item.get(key)
+         if snapshot is None:
+            continue
+         if snapshot['count']:
+            for percentile, value in snapshot['percentiles'].items():
+               samples.append(('connection="%s",quantile="%g"' % (conn_name, float(percentile[1:]) / 100), value))
+         totals.append("%s_%s_sum{connection=\"%s\"} %s" % (prefix, name, conn_name, _format_value((snapshot['mean'] or 0.0) * snapshot['count'])))
+         totals.append("%s_%s_count{connection=\"%s\"} %d" % (prefix, name, conn_name, snapshot['count']))
+      add_family(name, 'summary', help_text, samples)
+      lines.extend(totals)
+   return '\n'.join(lines) + '\n'
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+   """
+Request handler of the metrics endpoint.
+   """
+   def do_GET(self):
+      """
+Answer a GET request of '/metrics' (Prometheus text format) or '/metrics.json' (JSON).
+      """
+      path = self.path.split('?', 1)[0]
+      if path in ('/', '/metrics'):
+         content_type = 'text/plain; version=0.0.4; charset=utf-8'
+         body = format_prometheus(self.server.metrics_provider())
+      elif path == '/metrics.json':
+         content_type = 'application/json'
+         body = json.dumps(self.server.metrics_provider(), indent=1, sort_keys=True)
+      else:
+         self.send_error(404, "Use '/metrics' or '/metrics.json'.")
+         return
+      data = body.encode('utf-8')
+      self.send_response(200)
+      self.send_header('Content-Type', content_type)
+      self.send_header('Content-Length', str(len(data)))
+      self.end_headers()
+      self.wfile.write(data)
+
+   def log_message(self, *args):
+      """
+Don't log the requests.
+      """
+      pass
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+   class _UnixHTTPServer(socketserver.UnixStreamServer):
+      """
+HTTP server listening on a Unix socket.
+      """
+      def get_request(self):
+         (request, _client_address) = socketserver.UnixStreamServer.get_request(self)
+         # BaseHTTPRequestHandler expects a (host, port) client address
+         return request, ('local', 0)
+else:
+   _UnixHTTPServer = None
+
+
+class MetricsServer(object):
+   """
+Local HTTP endpoint for the live metrics of the connections.
+
+The metrics are collected when a request arrives, so the server doesn't use CPU time between requests. The
+provider function is called by the server thread and must not take locks used by the receiving threads.
+   """
+   def __init__(self, metrics_provider, host=constants.METRICS_SERVER_DEFAULT_HOST, port=0, unix_socket=None):
+      """
+Constructor for MetricsServer class.
+
+**Arguments:**
+
+* ``metrics_provider``
+
+  / *Condition*: required / *Type*: callable /
+
+  Function returning the metrics per connection name, refer to ConnectionBase.get_live_metrics().
+
+* ``host``
+
+  / *Condition*: optional / *Type*: str / *Default*: '127.0.0.1' /
+
+  Address to listen on.
+
+* ``port``
+
+  / *Condition*: optional / *Type*: int / *Default*: 0 /
+
+  Port to listen on. 0 for a free port chosen by the system.
+
+* ``unix_socket``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Path of a Unix socket to listen on instead of the TCP port. A stale socket is replaced, other files are not
+  removed (ValueError). Not supported on Windows.
+      """
+      self.unix_socket = unix_socket
+      if unix_socket:
+         if _UnixHTTPServer is None:
+            raise ValueError("Unix sockets are not supported on this platform.")
+         _remove_unix_socket(unix_socket)
+         self._server = _UnixHTTPServer(unix_socket, _MetricsRequestHandler)
+         self.url = 'unix:%s' % unix_socket
+      else:
+         self._server = HTTPServer((host, int(port)), _MetricsRequestHandler)
+         self.url = 'http://%s:%d/metrics' % (host, self._server.server_address[1])
+      self._server.metrics_provider = metrics_provider
+      self._server_thread = threading.Thread(target=self._server.serve_forever,
+                                             kwargs=dict(poll_interval=constants.METRICS_SERVER_POLL_INTERVAL),
+                                             name="QMetricsServer", daemon=True)
+      self._server_thread.start()
+
+   def stop(self):
+      """
+Stop the server and close its socket. The Unix socket is removed, ValueError is raised if its path was replaced by
+another file, which is kept.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._server.shutdown()
+      self._server.server_close()
+      self._server_thread.join()
+      if self.unix_socket:
+         _remove_unix_socket(self.unix_socket)
@@ -25,12 +25,27 @@
 # 30.09.2021 / V 0.1 / Cuong Nguyen
 # - Initialize
 #
+# 17.10.2026 / V 0.2
+# - Add asynchronous log output via a bounded queue and a writer thread.
+# - Add size/time based rotation of the log files with compression of the closed segments and a segment index.
+#
 # *******************************************************************************
 from robot.libraries.BuiltIn import BuiltIn
 from QConnectBase.utils import *
+from QConnectBase.robot_log import robot_log
 import QConnectBase.constants as constants
+import datetime
+import gzip
+import json
 import logging
+import logging.handlers
+import lzma
 import os
+import queue
+import re
+import shutil
+import threading
+import time
 
 
 class ColorFormatter(logging.Formatter):
@@ -75,7 +90,402 @@ Set the color format for the log.
       return formatter.format(record)
 
 
-class QFileHandler(logging.FileHandler):
+class LogSegmentArchiver(object):
+   """
+Background worker which compresses closed log segments and records them in the segment index.
+   """
+   COMPRESSORS = {
+      constants.LogCompression.GZIP: (gzip.open, '.gz'),
+      constants.LogCompression.LZMA: (lzma.open, '.xz')
+   }
+
+   def __init__(self, index_path, compression=constants.LogCompression.NONE):
+      """
+Constructor for LogSegmentArchiver class.
+
+**Arguments:**
+
+* ``index_path``
+
+  / *Condition*: required / *Type*: str /
+
+  Path of the segment index file.
+
+* ``compression``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'none' /
+
+  Compression of the segments: 'none', 'gzip' or 'lzma'.
+      """
+      if compression != constants.LogCompression.NONE and compression not in LogSegmentArchiver.COMPRESSORS:
+         raise ValueError("Unsupported log compression '%s'. Possible values: %s, %s, %s"
+                          % (compression, constants.LogCompression.NONE, constants.LogCompression.GZIP, constants.LogCompression.LZMA))
+      self.index_path = index_path
+      self.compression = compression
+      self._queue = queue.Queue()
+      self._thread = None
+
+   def submit(self, segment_path, entry):
+      """
+Archive a closed segment in background.
+
+**Arguments:**
+
+* ``segment_path``
+
+  / *Condition*: required / *Type*: str /
+
+  Path of the closed segment.
+
+* ``entry``
+
+  / *Condition*: required / *Type*: dict /
+
+  Index entry of the segment, 'segment' is set when the segment is archived.
+
+**Returns:**
+
+(*no returns*)
+      """
+      if self._thread is None:
+         self._thread = threading.Thread(target=self._archive_loop, name="QLogArchiver", daemon=True)
+         self._thread.start()
+      self._queue.put((segment_path, entry))
+
+   def close(self):
+      """
+Wait until all submitted segments are archived.
+
+**Returns:**
+
+(*no returns*)
+      """
+      if self._thread is not None:
+         self._queue.put(None)
+         self._thread.join()
+         self._thread = None
+
+   def _archive_loop(self):
+      """
+Archiver thread: compress the segments and append their entries to the index.
+      """
+      while True:
+         item = self._queue.get()
+         if item is None:
+            return
+         (segment_path, entry) = item
+         try:
+            archived_path = self._compress(segment_path)
+         except Exception as reason:
+            # the segment stays uncompressed, it's still recorded in the index
+            robot_log.warning("Unable to compress the log segment '%s', it's kept uncompressed. Reason: %s" % (segment_path, reason))
+            archived_path = segment_path
+         entry['segment'] = os.path.basename(archived_path)
+         try:
+            with open(self.index_path, 'a') as index_file:
+               index_file.write(json.dumps(entry) + '\n')
+         except OSError as reason:
+            robot_log.warning("Unable to record the log segment '%s' in the index '%s'. Reason: %s" % (archived_path, self.index_path, reason))
+
+   def _compress(self, segment_path):
+      """
+Compress a segment and remove the uncompressed file.
+      """
+      if self.compression not in LogSegmentArchiver.COMPRESSORS:
+         return segment_path
+      (open_fct, extension) = LogSegmentArchiver.COMPRESSORS[self.compression]
+      archived_path = segment_path + extension
+      try:
+         with open(segment_path, 'rb') as source, open_fct(archived_path, 'wb') as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+      except BaseException:
+         if os.path.isfile(archived_path):
+            os.remove(archived_path)
+         raise
+      os.remove(segment_path)
+      return archived_path
+
+
+class QBaseFileHandler(logging.handlers.BaseRotatingHandler):
+   """
+Base handler class for log files with optional rotation.
+
+The log is written into the configured file. If rotation is enabled by the size ('log_rotate_size') or the age
+('log_rotate_interval') of the current segment, the file is closed and renamed to ``<name>.<NNNN><ext>``, e.g.
+``conn_trace.0001.log``, optionally compressed ('log_compression') in background and recorded with the time range
+of its records in the index file ``<name><ext>.index.jsonl``. The last segment is closed with the handler.
+   """
+   def __init__(self, path, mode, config):
+      """
+Constructor for QBaseFileHandler class.
+
+**Arguments:**
+
+* ``path``
+
+  / *Condition*: required / *Type*: str /
+
+  Log file path.
+
+* ``mode``
+
+  / *Condition*: required / *Type*: str /
+
+  Mode for opening the log file.
+
+* ``config``
+
+  / *Condition*: required / *Type*: DictToClass /
+
+  Connection configurations.
+      """
+      super(QBaseFileHandler, self).__init__(path, mode)
+      self.rotate_size = max(int(getattr(config, 'log_rotate_size', 0) or 0), 0)
+      self.rotate_interval = max(float(getattr(config, 'log_rotate_interval', 0) or 0), 0.0)
+      self._archiver = None
+      if self.rotation_enabled:
+         self._archiver = LogSegmentArchiver(self.baseFilename + constants.LOG_SEGMENT_INDEX_SUFFIX,
+                                             getattr(config, 'log_compression', constants.LogCompression.NONE))
+      self._segment_number = self._get_last_segment_number()
+      self._reset_segment()
+
+   @property
+   def rotation_enabled(self):
+      """
+True if the log file is rotated by size or time.
+      """
+      return self.rotate_size > 0 or self.rotate_interval > 0
+
+   @staticmethod
+   def get_config_supported(_config):
+      """
+The base handler is never selected directly.
+
+**Returns:**
+
+  / *Type*: bool /
+
+  False.
+      """
+      return False
+
+   def get_segment_path(self, number):
+      """
+Get the path of a closed (uncompressed) segment.
+
+**Arguments:**
+
+* ``number``
+
+  / *Condition*: required / *Type*: int /
+
+  Segment number, starting at 1.
+
+**Returns:**
+
+  / *Type*: str /
+
+  Segment path.
+      """
+      (root, ext) = os.path.splitext(self.baseFilename)
+      return "%s.%04d%s" % (root, number, ext)
+
+   def _get_last_segment_number(self):
+      """
+Get the highest number of the segments in the log directory, so segments of former runs are not overwritten.
+      """
+      (root, ext) = os.path.splitext(os.path.basename(self.baseFilename))
+      segment_regex = re.compile(r"^%s\.(\d+)%s(\.gz|\.xz)?$" % (re.escape(root), re.escape(ext)))
+      last_number = 0
+      if self.rotation_enabled:
+         for file_name in os.listdir(os.path.dirname(self.baseFilename) or '.'):
+            res = segment_regex.match(file_name)
+            if res:
+               last_number = max(last_number, int(res.group(1)))
+      return last_number
+
+   def _reset_segment(self):
+      """
+Reset the counters of the current segment.
+      """
+      self._segment_size = 0
+      self._segment_records = 0
+      self._segment_first = None
+      self._segment_last = None
+
+   def format(self, record):
+      """
+Format a record and account it to the current segment.
+
+**Arguments:**
+
+* ``record``
+
+  / *Condition*: required / *Type*: logging.LogRecord /
+
+  Log record.
+
+**Returns:**
+
+  / *Type*: str /
+
+  Formatted record.
+      """
+      text = super(QBaseFileHandler, self).format(record)
+      if self._segment_first is None:
+         self._segment_first = record.created
+      self._segment_last = record.created
+      self._segment_records += 1
+      self._segment_size += len(text) + 1
+      return text
+
+   def shouldRollover(self, record):
+      """
+Check if the current segment has to be closed before the record is written.
+
+**Arguments:**
+
+* ``record``
+
+  / *Condition*: required / *Type*: logging.LogRecord /
+
+  Log record.
+
+**Returns:**
+
+  / *Type*: bool /
+
+  True if the segment reached the rotation size or interval.
+      """
+      if self._segment_records == 0:
+         return False
+      if self.rotate_size and self._segment_size >= self.rotate_size:
+         return True
+      return bool(self.rotate_interval and record.created - self._segment_first >= self.rotate_interval)
+
+   def doRollover(self):
+      """
+Close the current segment, hand it over to the archiver and open a new one.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._close_segment()
+      if not self.delay:
+         self.stream = self._open()
+
+   def _close_segment(self):
+      """
+Close the stream and rename the current segment.
+      """
+      if self.stream:
+         self.stream.close()
+         self.stream = None
+      if self._segment_records == 0 or not os.path.exists(self.baseFilename):
+         return
+      self._segment_number += 1
+      segment_path = self.get_segment_path(self._segment_number)
+      os.replace(self.baseFilename, segment_path)
+      self._archiver.submit(segment_path, {
+         'segment': os.path.basename(segment_path),
+         'number': self._segment_number,
+         'first_time': self._segment_first,
+         'last_time': self._segment_last,
+         'first_time_iso': datetime.datetime.fromtimestamp(self._segment_first).isoformat(),
+         'last_time_iso': datetime.datetime.fromtimestamp(self._segment_last).isoformat(),
+         'records': self._segment_records
+      })
+      self._reset_segment()
+
+   def emit(self, record):
+      """
+Write a record, rotate the log file before if necessary.
+
+**Arguments:**
+
+* ``record``
+
+  / *Condition*: required / *Type*: logging.LogRecord /
+
+  Log record.
+
+**Returns:**
+
+(*no returns*)
+      """
+      if self.rotation_enabled:
+         super(QBaseFileHandler, self).emit(record)
+      else:
+         logging.FileHandler.emit(self, record)
+
+   def close(self):
+      """
+Close the last segment and wait until all segments are archived.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self.acquire()
+      try:
+         if self.rotation_enabled:
+            self._close_segment()
+            self._archiver.close()
+      finally:
+         self.release()
+      super(QBaseFileHandler, self).close()
+
+   @staticmethod
+   def read_segment_index(log_path, start_time=None, end_time=None):
+      """
+Get the archived segments of a log file which overlap a time range.
+
+**Arguments:**
+
+* ``log_path``
+
+  / *Condition*: required / *Type*: str /
+
+  Path of the log file as configured.
+
+* ``start_time``
+
+  / *Condition*: optional / *Type*: float / *Default*: None /
+
+  Begin of the time range (seconds since the epoch). None for no limit.
+
+* ``end_time``
+
+  / *Condition*: optional / *Type*: float / *Default*: None /
+
+  End of the time range (seconds since the epoch). None for no limit.
+
+**Returns:**
+
+  / *Type*: list /
+
+  Index entries of the segments, 'path' is the full path of the segment.
+      """
+      index_path = os.path.abspath(log_path) + constants.LOG_SEGMENT_INDEX_SUFFIX
+      entries = []
+      if not os.path.exists(index_path):
+         return entries
+      with open(index_path) as index_file:
+         for line in index_file:
+            if not line.strip():
+               continue
+            entry = json.loads(line)
+            if start_time is not None and entry['last_time'] < start_time:
+               continue
+            if end_time is not None and entry['first_time'] > end_time:
+               continue
+            entry['path'] = os.path.join(os.path.dirname(index_path), entry['segment'])
+            entries.append(entry)
+      return sorted(entries, key=lambda item: item['number'])
+
+
+class QFileHandler(QBaseFileHandler):
    """
 Handler class for user defined file in config.
    """
@@ -104,7 +514,7 @@ Constructor for QFileHandler class.
   Log's formatter.
       """
       path = self.get_log_path(config)
-      super(QFileHandler, self).__init__(path)
+      super(QFileHandler, self).__init__(path, 'a', config)
       self.setFormatter(formatter)
 
    @staticmethod
@@ -158,21 +568,21 @@ Check if the connection config is supported by this handler.
       return config.logfile is not None and config.logfile != 'nonlog' and config.logfile != 'console'
 
 
-class QDefaultFileHandler(logging.FileHandler):
+class QDefaultFileHandler(QBaseFileHandler):
    """
 Handler class for default log file path.
    """
-   def __init__(self, _config, logger_name, formatter):
+   def __init__(self, config, logger_name, formatter):
       """
 Constructor for QDefaultFileHandler class.
 
 **Arguments:**
 
-* ``_config``
+* ``config``
 
-  / *Condition*: required / *Type*: None /
+  / *Condition*: required / *Type*: DictToClass /
 
-  Unused.
+  Connection configurations.
 
 * ``logger_name``
 
@@ -192,7 +602,7 @@ Constructor for QDefaultFileHandler class.
 (*no returns*)
       """
       path = self.get_log_path(logger_name)
-      super(QDefaultFileHandler, self).__init__(path, mode='w')
+      super(QDefaultFileHandler, self).__init__(path, 'w', config)
       self.setFormatter(formatter)
 
    @staticmethod
@@ -300,6 +710,200 @@ Check if the connection config is supported by this handler.
       return config.logfile == 'console'
 
 
+class QAsyncHandler(logging.Handler):
+   """
+Handler class for writing the log asynchronously.
+
+Records are put into a bounded queue and written by a writer thread in batches, so a slow disk doesn't stall the
+thread which produces the log. The stream of the wrapped handler is flushed at most once per flush interval. Records
+are dropped and counted if the queue is full.
+   """
+   _STOP = object()
+
+   def __init__(self, target, maxsize=constants.LOG_QUEUE_DEFAULT_SIZE, flush_interval=constants.LOG_FLUSH_DEFAULT_INTERVAL):
+      """
+Constructor for QAsyncHandler class.
+
+**Arguments:**
+
+* ``target``
+
+  / *Condition*: required / *Type*: logging.Handler /
+
+  Handler which actually writes the log.
+
+* ``maxsize``
+
+  / *Condition*: optional / *Type*: int / *Default*: 10000 /
+
+  Maximum number of pending records. 0 for unbounded.
+
+* ``flush_interval``
+
+  / *Condition*: optional / *Type*: float / *Default*: 1.0 /
+
+  Maximum time in seconds a written record stays in the stream buffer.
+      """
+      super(QAsyncHandler, self).__init__()
+      self.target = target
+      self.flush_interval = max(float(flush_interval), 0.01)
+      self._queue = queue.Queue(maxsize=max(int(maxsize), 0))
+      self._written = 0
+      self._dropped = 0
+      self._closed = False
+      self._writer_thread = threading.Thread(target=self._write_loop, name="QLogWriter", daemon=True)
+      self._writer_thread.start()
+
+   def emit(self, record):
+      """
+Put a record into the queue of the writer thread. The record is dropped if the queue is full.
+
+**Arguments:**
+
+* ``record``
+
+  / *Condition*: required / *Type*: logging.LogRecord /
+
+  Log record.
+
+**Returns:**
+
+(*no returns*)
+      """
+      if self._closed:
+         return
+      # Resolve the message now, the arguments may be changed before the writer thread formats the record.
+      record.msg = record.getMessage()
+      record.args = None
+      try:
+         self._queue.put_nowait(record)
+      except queue.Full:
+         self._dropped += 1
+
+   def _write_loop(self):
+      """
+Writer thread: write the queued records in batches and flush the stream periodically.
+      """
+      last_flush = time.monotonic()
+      pending_flush = False
+      while True:
+         try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+         except queue.Empty:
+            batch = []
+         while batch and len(batch) < constants.LOG_WRITE_BATCH_SIZE:
+            try:
+               batch.append(self._queue.get_nowait())
+            except queue.Empty:
+               break
+
+         stop = QAsyncHandler._STOP in batch
+         records = [record for record in batch if record is not QAsyncHandler._STOP]
+         if records:
+            self._write(records)
+            pending_flush = True
+         now = time.monotonic()
+         if pending_flush and (stop or now - last_flush >= self.flush_interval):
+            # noinspection PyBroadException
+            try:
+               self.target.flush()
+            except Exception:
+               pass
+            last_flush = now
+            pending_flush = False
+         if stop:
+            return
+
+   def _write(self, records):
+      """
+Write a batch of records with a single write call if the wrapped handler is a stream handler.
+      """
+      if not hasattr(self.target, 'stream'):
+         for record in records:
+            self.target.handle(record)
+         self._written += len(records)
+         return
+
+      rotating = getattr(self.target, 'rotation_enabled', False)
+      lines = []
+      for record in records:
+         if record.levelno < self.target.level:
+            continue
+         if rotating and self.target.shouldRollover(record):
+            self._write_lines(lines, record)
+            lines = []
+            self.target.acquire()
+            try:
+               self.target.doRollover()
+            finally:
+               self.target.release()
+         # noinspection PyBroadException
+         try:
+            lines.append(self.target.format(record) + self.target.terminator)
+         except Exception:
+            self.target.handleError(record)
+      self._write_lines(lines, records[-1])
+
+   def _write_lines(self, lines, record):
+      """
+Write formatted records into the stream of the wrapped handler.
+      """
+      if not lines:
+         return
+      self.target.acquire()
+      try:
+         if self.target.stream is None:
+            self.target.stream = self.target._open()
+         self.target.stream.write(''.join(lines))
+         self._written += len(lines)
+      except Exception:
+         self.target.handleError(record)
+      finally:
+         self.target.release()
+
+   def flush(self):
+      """
+Nothing to do, the writer thread flushes the stream periodically.
+
+**Returns:**
+
+(*no returns*)
+      """
+      pass
+
+   def close(self):
+      """
+Write all pending records, stop the writer thread and close the wrapped handler.
+
+**Returns:**
+
+(*no returns*)
+      """
+      if not self._closed:
+         self._closed = True
+         self._queue.put(QAsyncHandler._STOP)
+         self._writer_thread.join()
+         self.target.close()
+      super(QAsyncHandler, self).close()
+
+   def get_statistics(self):
+      """
+Get the statistics of the handler.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  Number of 'written', 'dropped' and 'pending' records and the 'maxsize' of the queue.
+      """
+      return {
+         'written': self._written,
+         'dropped': self._dropped,
+         'pending': self._queue.qsize(),
+         'maxsize': self._queue.maxsize
+      }
+
+
 class QLogger(Singleton):
    """
 Logger class for QConnect Libraries.
@@ -373,6 +977,9 @@ Set handler for logger.
             if handler.get_config_supported(config):
                handler_ins = handler(config, self.logger_name, self.formatter)
                handler_ins.setLevel(log_level)
+               if config.log_async:
+                  handler_ins = QAsyncHandler(handler_ins, config.log_queue_size, config.log_flush_interval)
+                  handler_ins.setLevel(log_level)
                self.logger.addHandler(handler_ins)
                return handler_ins
          except:
@@ -0,0 +1,400 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: robot_log.py
+#
+# Description:
+#   Provide the logging facade of the library for writing into the Robot Framework log.
+#   Messages of disabled levels are discarded before any formatting is done.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+# - Add forwarding policies of received trace lines.
+# - Add deferred logging of background threads, flushed by the Robot thread.
+#
+# *******************************************************************************
+from collections import deque
+from robot.api import logger
+from robot.libraries.BuiltIn import BuiltIn
+import QConnectBase.constants as constants
+import datetime
+import threading
+import time
+
+
+class RobotLog(object):
+   """
+Logging facade for the Robot Framework log.
+
+The log level of Robot Framework is resolved once and cached. If the running Robot Framework provides its log level
+object, the facade keeps a reference to it, so changes by 'Set Log Level' take effect without resolving the level
+again. Otherwise refresh() has to be called to take over a changed log level.
+
+Robot Framework only accepts log messages from its own thread. While Robot Framework is running, messages of
+background threads (receiver, dispatch and consumer threads of the connections) are therefore only appended to a
+bounded buffer and written into the Robot Framework log in bulk by flush(), which is called at keyword boundaries
+by the listener of the ConnectionManager library.
+   """
+   ROBOT_THREAD_NAMES = ('MainThread', 'RobotFrameworkTimeoutThread')
+
+   LEVEL_PRIORITIES = {
+      'TRACE': 0,
+      constants.LOG_LEVEL_DEBUG: 1,
+      constants.LOG_LEVEL_INFO: 2,
+      constants.LOG_LEVEL_WARNING: 3,
+      constants.LOG_LEVEL_ERROR: 4,
+      'NONE': 7
+   }
+
+   def __init__(self):
+      """
+Constructor for RobotLog class.
+      """
+      self._level_obj = None
+      self._priority = None
+      self._defer = False
+      self._deferred = deque()
+      self.max_deferred = constants.ROBOT_LOG_DEFERRED_DEFAULT_SIZE
+      self.dropped = 0
+
+   def refresh(self):
+      """
+Resolve the current log level of Robot Framework. INFO is assumed if Robot Framework is not running.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._level_obj = None
+      self._defer = False
+      level = constants.LOG_LEVEL_INFO
+      # noinspection PyBroadException
+      try:
+         output = BuiltIn()._context.output
+         self._defer = True
+         level_obj = getattr(output, 'log_level', None)
+         if hasattr(level_obj, 'priority'):
+            self._level_obj = level_obj
+         else:
+            level = str(output._settings.log_level).split(':')[0].upper()
+      except Exception:
+         pass
+      self._priority = RobotLog.LEVEL_PRIORITIES.get(level, RobotLog.LEVEL_PRIORITIES[constants.LOG_LEVEL_INFO])
+
+   def is_enabled(self, level):
+      """
+Check if messages of a log level are written into the Robot Framework log.
+
+**Arguments:**
+
+* ``level``
+
+  / *Condition*: required / *Type*: str /
+
+  Log level, e.g. 'DEBUG'.
+
+**Returns:**
+
+  / *Type*: bool /
+
+  True if messages of the level are logged.
+      """
+      if self._level_obj is not None:
+         return RobotLog.LEVEL_PRIORITIES.get(level, 2) >= self._level_obj.priority
+      if self._priority is None:
+         self.refresh()
+         return self.is_enabled(level)
+      return RobotLog.LEVEL_PRIORITIES.get(level, 2) >= self._priority
+
+   def log(self, msg, level=constants.LOG_LEVEL_INFO, *args):
+      """
+Write a message into the Robot Framework log if its level is enabled.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Message, or format string if ``args`` are given.
+
+* ``level``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'INFO' /
+
+  Log level.
+
+* ``args``
+
+  / *Condition*: optional / *Type*: tuple / *Default*: () /
+
+  Arguments of the format string. The message is only formatted if the level is enabled.
+
+**Returns:**
+
+(*no returns*)
+      """
+      if not self.is_enabled(level):
+         return
+      if args:
+         msg = msg % args
+      self._write(msg, level)
+
+   def debug(self, msg, *args):
+      """
+Write a DEBUG message, refer to log().
+      """
+      if self.is_enabled(constants.LOG_LEVEL_DEBUG):
+         self._write(msg % args if args else msg, constants.LOG_LEVEL_DEBUG)
+
+   def info(self, msg, *args):
+      """
+Write an INFO message, refer to log().
+      """
+      if self.is_enabled(constants.LOG_LEVEL_INFO):
+         self._write(msg % args if args else msg, constants.LOG_LEVEL_INFO)
+
+   def warning(self, msg, *args):
+      """
+Write a WARN message, refer to log().
+      """
+      if self.is_enabled(constants.LOG_LEVEL_WARNING):
+         self._write(msg % args if args else msg, constants.LOG_LEVEL_WARNING)
+
+   def error(self, msg, *args):
+      """
+Write an ERROR message, refer to log().
+      """
+      if self.is_enabled(constants.LOG_LEVEL_ERROR):
+         self._write(msg % args if args else msg, constants.LOG_LEVEL_ERROR)
+
+
+   def _write(self, msg, level):
+      """
+Write a message into the Robot Framework log, or into the buffer if called by a background thread.
+      """
+      if self._defer:
+         thread_name = threading.current_thread().name
+         if thread_name not in RobotLog.ROBOT_THREAD_NAMES:
+            if len(self._deferred) >= self.max_deferred:
+               self.dropped += 1
+            else:
+               self._deferred.append((time.time(), thread_name, level, msg))
+            return
+      BuiltIn().log(msg, level)
+
+   def get_pending_count(self):
+      """
+Get the number of buffered messages of background threads.
+
+**Returns:**
+
+  / *Type*: int /
+
+  Number of messages waiting for flush().
+      """
+      return len(self._deferred)
+
+   def flush(self):
+      """
+Write the buffered messages of background threads into the Robot Framework log. Consecutive messages of the same
+thread and level are written as one multi-line message, each line prefixed with the time it was logged.
+Does nothing if not called by the Robot Framework thread.
+
+**Returns:**
+
+(*no returns*)
+      """
+      if threading.current_thread().name not in RobotLog.ROBOT_THREAD_NAMES:
+         return
+      group_key = None
+      lines = []
+      while True:
+         try:
+            (timestamp, thread_name, level, msg) = self._deferred.popleft()
+         except IndexError:
+            break
+         if (thread_name, level) != group_key or len(lines) >= constants.ROBOT_LOG_FLUSH_MAX_LINES:
+            self._write_group(group_key, lines)
+            group_key = (thread_name, level)
+            lines = []
+         lines.append("%s %s" % (datetime.datetime.fromtimestamp(timestamp).strftime('%H:%M:%S.%f')[:-3], msg))
+      self._write_group(group_key, lines)
+      if self.dropped:
+         dropped = self.dropped
+         self.dropped = 0
+         logger.write("%d log messages of background threads were dropped because the buffer was full." % dropped, constants.LOG_LEVEL_WARNING)
+
+   @staticmethod
+   def _write_group(group_key, lines):
+      """
+Write a group of buffered messages as one message.
+      """
+      if lines:
+         logger.write("[%s]\n%s" % (group_key[0], '\n'.join(lines)), group_key[1])
+
+
+robot_log = RobotLog()
+
+
+class TraceLogForwarder(object):
+   """
+Forward the received trace lines of a connection to the Robot Framework log according to a policy:
+
+* **full**: every line.
+* **sampled**: every n-th line plus the lines matching a trace filter.
+* **rate-capped**: at most n lines per second plus the lines matching a trace filter. The number of suppressed lines
+  is logged when the next second starts.
+* **matches-only**: only the lines matching a trace filter, e.g. of a running **verify**.
+* **none**: no line.
+
+The trace log file of the connection always gets all lines.
+   """
+   POLICIES = (constants.RobotLogPolicy.FULL, constants.RobotLogPolicy.SAMPLED, constants.RobotLogPolicy.RATE_CAPPED,
+               constants.RobotLogPolicy.MATCHES_ONLY, constants.RobotLogPolicy.NONE)
+
+   def __init__(self, connection_name, policy=constants.RobotLogPolicy.FULL,
+                sample_rate=constants.ROBOT_LOG_DEFAULT_SAMPLE_RATE, rate_limit=constants.ROBOT_LOG_DEFAULT_RATE_LIMIT):
+      """
+Constructor for TraceLogForwarder class.
+
+**Arguments:**
+
+* ``connection_name``
+
+  / *Condition*: required / *Type*: str /
+
+  Name of the connection used in the summaries.
+
+* ``policy``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'full' /
+
+  Forwarding policy.
+
+* ``sample_rate``
+
+  / *Condition*: optional / *Type*: int / *Default*: 100 /
+
+  Every n-th line is forwarded by the 'sampled' policy.
+
+* ``rate_limit``
+
+  / *Condition*: optional / *Type*: int / *Default*: 100 /
+
+  Maximum number of lines per second forwarded by the 'rate-capped' policy.
+      """
+      if policy not in TraceLogForwarder.POLICIES:
+         raise ValueError("Unsupported Robot log policy '%s'. Possible values: %s" % (policy, ', '.join(TraceLogForwarder.POLICIES)))
+      if int(sample_rate) < 1 or int(rate_limit) < 1:
+         raise ValueError("The Robot log sample rate and rate limit must be greater than 0.")
+      self.connection_name = connection_name
+      self.policy = policy
+      self.sample_rate = int(sample_rate)
+      self.rate_limit = int(rate_limit)
+      self.forwarded = 0
+      self.suppressed = 0
+      self._n_lines = 0
+      self._window_start = 0.0
+      self._window_count = 0
+      self._window_suppressed = 0
+
+   def forward(self, msg, matched=False):
+      """
+Forward a received trace line to the Robot Framework log if the policy allows it.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Received trace line.
+
+* ``matched``
+
+  / *Condition*: optional / *Type*: bool / *Default*: False /
+
+  True if the line matched a trace filter of the connection.
+
+**Returns:**
+
+  / *Type*: bool /
+
+  True if the line was forwarded.
+      """
+      policy = self.policy
+      if policy == constants.RobotLogPolicy.FULL:
+         is_forwarded = True
+      elif policy == constants.RobotLogPolicy.MATCHES_ONLY:
+         is_forwarded = matched
+      elif policy == constants.RobotLogPolicy.SAMPLED:
+         is_forwarded = matched or self._n_lines % self.sample_rate == 0
+         self._n_lines += 1
+      elif policy == constants.RobotLogPolicy.RATE_CAPPED:
+         now = time.monotonic()
+         if now - self._window_start >= 1.0:
+            self._log_window_summary()
+            self._window_start = now
+            self._window_count = 0
+         is_forwarded = matched or self._window_count < self.rate_limit
+         if is_forwarded:
+            self._window_count += 1
+         else:
+            self._window_suppressed += 1
+      else:
+         is_forwarded = False
+
+      if is_forwarded:
+         self.forwarded += 1
+         robot_log.info(msg)
+      else:
+         self.suppressed += 1
+      return is_forwarded
+
+   def _log_window_summary(self):
+      """
+Log the number of lines suppressed by the rate limit in the current window.
+      """
+      if self._window_suppressed:
+         robot_log.info("[%s] %d trace lines suppressed (rate limit %d lines/s)" % (self.connection_name, self._window_suppressed, self.rate_limit))
+         self._window_suppressed = 0
+
+   def close(self):
+      """
+Log the pending summary and the total number of suppressed lines.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._log_window_summary()
+      if self.suppressed:
+         robot_log.info("[%s] %d of %d trace lines were forwarded to the Robot log (policy '%s'), the complete trace is in the trace log file."
+                        % (self.connection_name, self.forwarded, self.forwarded + self.suppressed, self.policy))
+
+   def get_statistics(self):
+      """
+Get the forwarding statistics.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  'policy', number of 'forwarded' and 'suppressed' lines.
+      """
+      return {'policy': self.policy, 'forwarded': self.forwarded, 'suppressed': self.suppressed}
@@ -31,12 +31,13 @@ from __future__ import with_statement
 from QConnectBase.connection_base import ConnectionBase, BrokenConnError
 from QConnectBase.utils import DictToClass
 from robot.libraries.BuiltIn import BuiltIn
+from QConnectBase.robot_log import robot_log
 import QConnectBase.constants as constants
 import threading
 from inspect import currentframe
-import time
+import codecs
 import serial
-import queue
+from collections import deque
 
 
 class SerialConfig(DictToClass):
@@ -58,6 +59,7 @@ Class for handling serial connection.
    """
    _CONNECTION_TYPE = "SERLL-"
    _socket_instance = 0
+   _EVENT_DRIVEN_READ = True
 
    def __init__(self, _mode, config):
       """
@@ -94,6 +96,10 @@ Constructor for SerialSocket class.
 
       SerialSocket._socket_instance += 1
       self._is_connected = False
+      self._connected_event = threading.Event()
+
+      # create the queue of received lines for this connection
+      self.serial_queue = deque()
 
       # initialize receiver thread
       self._init_thread_receiver(SerialSocket._socket_instance, mode="SER-")
@@ -103,8 +109,6 @@ Constructor for SerialSocket class.
       self._llrecv_thrd_obj = None
       self._llrecv_thrd_term = threading.Event()  # initialize the lowlevel receiver thread
       self._init_thrd_llrecv(SerialSocket._socket_instance)
-      # create the queue for this connection
-      self.serial_queue = queue.Queue()
 
    def _thrd_llrecv_from_connection_interface(self):
       """
@@ -115,35 +119,37 @@ Receive and process data from serial connection in low-level.
 (*no returns*)
       """
       _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log("%s: lowlevel receiver thread started." % _mident, constants.LOG_LEVEL_INFO)
-      while self._is_connected is False and not self._llrecv_thrd_term.isSet():
-         time.sleep(ConnectionBase.RECV_MSGS_POLLING_INTERVAL)
+      robot_log.log("%s: lowlevel receiver thread started." % _mident, constants.LOG_LEVEL_INFO)
+      while not self._connected_event.is_set() and not self._llrecv_thrd_term.isSet():
+         self._connected_event.wait(self.RECV_IDLE_TIMEOUT)
 
+      decoder = codecs.getincrementaldecoder(self.config.encoding)('ignore')
+      data = ''
       while not self._llrecv_thrd_term.isSet():
          # noinspection PyBroadException
          # implementation from here:
          # http://sourceforge.net/p/pyserial/code/HEAD/tree/trunk/pyserial/examples/rfc2217_server.py
          try:
-            data = self.socket.read(1).decode(self.config.encoding, 'ignore')  # read one, blocking
+            read_data = self.socket.read(1)  # read one, blocking
             n = self.socket.in_waiting  # look if there is more
             if n:
-               read_data = self.socket.read(n)
-               data = data + read_data.decode(self.config.encoding, 'ignore')  # and get as much as possible
-            if data:
-               for character in data:
-                  self.serial_queue.put(character)
+               read_data = read_data + self.socket.read(n)  # and get as much as possible
          except Exception as _reason:
-            # ignore all errors.
-            pass
-
-         time.sleep(ConnectionBase.RECV_MSGS_POLLING_INTERVAL)
-
-      # _read must have chance to terminate, too,therefore
-      # wait here 5 times polling interval
-      time.sleep(ConnectionBase.RECV_MSGS_POLLING_INTERVAL * 5)
+            # ignore all errors, but do not spin on a broken port.
+            self._llrecv_thrd_term.wait(ConnectionBase.RECV_MSGS_POLLING_INTERVAL)
+            continue
+
+         #  usually \r\n or \n is sent to terminate a line,
+         #  but U-Boot sends \n\r, therefore frame at \n and let _read remove the remaining \r.
+         lines = (data + decoder.decode(read_data)).split('\n')
+         data = lines.pop()
+         if lines:
+            for line in lines:
+               self.serial_queue.append(line)
+            self._notify_receiver()
 
       self._llrecv_thrd_term.clear()
-      BuiltIn().log("%s: lowlevel receiver thread terminated." % _mident, constants.LOG_LEVEL_INFO)
+      robot_log.log("%s: lowlevel receiver thread terminated." % _mident, constants.LOG_LEVEL_INFO)
 
    def connect(self):
       """
@@ -198,12 +204,13 @@ Send data to serial port.
 (*no returns*)
       """
       try:
-         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-         BuiltIn().log("%s: sending: '%s'" % (_mident, msg), constants.LOG_LEVEL_DEBUG)
+         if robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+            BuiltIn().log("%s.%s(): sending: '%s'" % (self.__class__.__name__, currentframe().f_code.co_name, msg), constants.LOG_LEVEL_DEBUG)
          with self._send_lock:
             send_byte = (self._rm_q_dollar(str(msg)) + "\n").encode('utf-8')
             self.socket.write(send_byte)
       except Exception as reason:
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
          BuiltIn().log("%s: could not send: '%s'. Reason: '%s'" % (_mident, msg, str(reason)), constants.LOG_LEVEL_WARNING)
          self._is_connected = False
 
@@ -217,26 +224,15 @@ Receive data from serial connection.
   / *Type*: str /
 
   Data received from connection.
-      """
-      data = ''
-      #  usually \r\n or \n is sent to terminate a line,
-      #  but U-Boot sends \n\r, therefore try to fit to all
-      #  possible line endings and return the identified line.
-
-      # We read the data here from the queue filled by the
-      # low-level receiver thread.
-      while (data[-1:] != '\n') and not self._llrecv_thrd_term.isSet():
-         try:
-            d = self.serial_queue.get(block=False)
-            data = data + d
-         except queue.Empty:
-            # non blocking get from serq causes that
-            # Queue.Empty exception. In this case wait some milliseconds before
-            # retry
-            time.sleep(ConnectionBase.RECV_MSGS_POLLING_INTERVAL)
 
-      # remove the \n
-      data = data[:-1]
+  None if no complete line has been received.
+      """
+      # We read the line here from the queue filled by the
+      # low-level receiver thread, which wakes up the receiver thread for every new chunk of lines.
+      try:
+         data = self.serial_queue.popleft()
+      except IndexError:
+         return None
 
       # if we filter for \n, then
       # if a \r\n was sent, we need to remove the remaining \r
@@ -267,14 +263,14 @@ Quit serial connection.
       self.disconnect(None)
       if self._llrecv_thrd_obj and self._llrecv_thrd_obj.is_alive():
          self._llrecv_thrd_term.set()
-         while self._llrecv_thrd_obj.is_alive():
-            time.sleep(ConnectionBase.RECV_MSGS_POLLING_INTERVAL)
+         self._connected_event.set()
+         self._llrecv_thrd_obj.join()
          self._llrecv_thrd_obj = None
 
       if self._recv_thrd_obj and self._recv_thrd_obj.is_alive():
          self._recv_thrd_term.set()
-         while self._recv_thrd_obj.is_alive():
-            time.sleep(ConnectionBase.RECV_MSGS_POLLING_INTERVAL)
+         self._notify_receiver()
+         self._recv_thrd_obj.join()
          self._recv_thrd_obj = None
       super(SerialSocket, self).quit()
 
@@ -327,6 +323,9 @@ Connect to the Serial port.
                                      xonxoff=self._xonxoff,
                                      timeout=self._timeout)
          self._is_connected = True
+         self._metrics.connects += 1
+         self._connected_event.set()
+         self._notify_receiver()
       except Exception as reason:
          # BuiltIn().log("%s: %s" % (_mident, reason), constants.LOG_LEVEL_ERROR)
          raise BrokenConnError("Not possible to connect. Reason: '%s'" % (str(reason)))
@@ -35,27 +35,37 @@ class RawTCPBase(TCPBase):
    """
 Base class for a raw tcp connection.
    """
+   _EVENT_DRIVEN_READ = True
+   RECV_BUFFER_SIZE = 4096
+
    def _read(self):
       """
 Actual method to read message from a tcp connection.
 
+The socket is read in chunks, all complete lines of a chunk are framed at once and returned by the following calls
+without accessing the socket again. The call blocks until a complete line is available.
+
 **Returns:**
-         Empty string.
-      """
-      data = ''
-      while 1:
-         data = data + self.conn.recv(1).decode(self.config.encoding, 'ignore')
 
-         # Simple socket expects \r\n for terminating a message
-         if data[(eol:=-2):] == "\r\n" or data[(eol:=-1):] == "\n":
-            break
+  / *Type*: str /
 
-         if data == '':
+  Received line without the line ending.
+      """
+      while not self._recv_lines:
+         data = self.conn.recv(self.RECV_BUFFER_SIZE)
+         if not data:
             raise BrokenConnError("socket connection broken")
 
-      # remove \r\n or \n
-      data = data[:eol]
-      return data
+         # Simple socket expects \r\n or \n for terminating a message
+         lines = (self._recv_buffer + data).split(b'\n')
+         self._recv_buffer = lines.pop()
+         self._recv_lines.extend(lines)
+
+      data = self._recv_lines.popleft()
+      # remove \r of \r\n
+      if data[-1:] == b'\r':
+         data = data[:-1]
+      return data.decode(self.config.encoding, 'ignore')
 
    def _send(self, msg, cr):
       """
@@ -79,12 +89,11 @@ Actual method to send message to a tcp connection.
 
 (*no returns*)
       """
-      sent = 0
+      if cr and msg != "":
+         msg = msg + "\r\n"
+      # send command and line ending at once, a separate small send is delayed by Nagle's algorithm
       with self._send_lock:
-         while sent < len(msg):
-            sent += self.conn.send(msg[sent:].encode(self.config.encoding))
-         if cr and msg != "":
-            self.conn.send("\r\n".encode(self.config.encoding))
+         self.conn.sendall(msg.encode(self.config.encoding))
 
 
 class RawTCPServer(TCPBaseServer, RawTCPBase):
@@ -31,9 +31,12 @@ from __future__ import with_statement
 from robot.libraries.BuiltIn import BuiltIn
 import threading
 from inspect import currentframe
+from QConnectBase.robot_log import robot_log
 import QConnectBase.constants as constants
 import time
-import queue
+from collections import deque
+import codecs
+import socket
 import paramiko
 from QConnectBase.tcp.tcp_base import BrokenConnError, TCPBaseClient, TCPBase, TCPConfig
 
@@ -61,6 +64,8 @@ class SSHClient(TCPBase, TCPBaseClient):
 SSH client connection class.
    """
    _CONNECTION_TYPE = "SSHClient"
+   _EVENT_DRIVEN_READ = True
+   RECV_BUFFER_SIZE = 4096
 
    def __init__(self, _mode, config):
       """
@@ -96,10 +101,11 @@ Constructor for SSHClient class.
       self._key_filename = self.config.key_filename
       self._authentication = self.config.authentication
 
-      # create the queue for this connection
-      self.SSHq = queue.Queue()
+      # create the queue of received lines for this connection
+      self.SSHq = deque()
 
       # configure and initialize the low-level receiver thread
+      self._chan_ready = threading.Event()
       self._llrecv_thrd_obj = None
       self._llrecv_thrd_term = threading.Event()
       super(SSHClient, self).__init__(_mode, config_tcp)
@@ -115,31 +121,34 @@ Implementation the thread for getting data from ssh connection.
 (*no returns*)
       """
       _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log("%s: low-level receiver thread started." % _mident, constants.LOG_LEVEL_INFO)
-      while self.chan is None and not self._llrecv_thrd_term.isSet():
-         time.sleep(TCPBase.RECV_MSGS_POLLING_INTERVAL)
+      robot_log.log("%s: low-level receiver thread started." % _mident, constants.LOG_LEVEL_INFO)
+      while not self._chan_ready.is_set() and not self._llrecv_thrd_term.isSet():
+         self._chan_ready.wait(self.RECV_IDLE_TIMEOUT)
 
+      if self.chan is not None:
+         # recv() blocks until data is available, the timeout only allows to check for termination.
+         self.chan.settimeout(self.RECV_IDLE_TIMEOUT)
+      decoder = codecs.getincrementaldecoder(self.config.encoding)('ignore')
+      data = ''
       while self.chan is not None and not self._llrecv_thrd_term.isSet():
-         data = ''
-         while len(data) == 0:
-            while self.chan.recv_ready() and not self.chan.closed:
-               # data = data + self.chan.recv(1)
-               recv = self.chan.recv(1)
-               data = data + recv.decode(self.config.encoding, 'ignore')
-
-            for character in data:
-               self.SSHq.put(character)
-
-            if self.chan.closed is True:
-               break
-
-            time.sleep(TCPBase.RECV_MSGS_POLLING_INTERVAL)
+         try:
+            recv = self.chan.recv(self.RECV_BUFFER_SIZE)
+         except socket.timeout:
+            continue
+         if not recv:
+            # channel is closed
+            break
+
+         # frame all complete lines of the received chunk at once
+         lines = (data + decoder.decode(recv)).split('\r\n')
+         data = lines.pop()
+         if lines:
+            for line in lines:
+               self.SSHq.append(line)
+            self._notify_receiver()
 
-      # _read must have chance to terminate, too,therefore
-      # wait here 5 times polling interval
-      time.sleep(TCPBase.RECV_MSGS_POLLING_INTERVAL * 5)
       self._llrecv_thrd_term.clear()
-      BuiltIn().log("%s: lowlevel receiver thread terminated." % _mident, constants.LOG_LEVEL_INFO)
+      robot_log.log("%s: lowlevel receiver thread terminated." % _mident, constants.LOG_LEVEL_INFO)
 
 
    def connect(self):
@@ -204,6 +213,7 @@ Implementation for creating a SSH connection.
 
          BuiltIn().log("%s: successfully established SSH connection on existing TCPIP socket." % _mident, constants.LOG_LEVEL_INFO)
          self._is_connected = True
+         self._metrics.connects += 1
 
       except Exception as reason:
          BuiltIn().log("%s: %s" % (_mident, reason), constants.LOG_LEVEL_ERROR)
@@ -216,6 +226,8 @@ Implementation for creating a SSH connection.
       # and then the next command will start in /to/somewhere.
       # Therefore we need to open a shell.
       self.chan = self.client.invoke_shell()
+      self._chan_ready.set()
+      self._notify_receiver()
       BuiltIn().log("%s: successfully invoked SSH shell for secure communication." % _mident, constants.LOG_LEVEL_INFO)
 
       # switch echo off for this terminal
@@ -305,8 +317,9 @@ Send message to SSH connection.
       """
       # noinspection PyBroadException
       try:
-         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-         BuiltIn().log("%s: sending: '%s'" % (_mident, msg), constants.LOG_LEVEL_DEBUG)
+         if robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+            _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+            BuiltIn().log("%s: sending: '%s'" % (_mident, msg), constants.LOG_LEVEL_DEBUG)
          with self._send_lock:
             self.chan.send(self._rm_q_dollar(str(msg)) + "\n")
       except Exception as _reason:
@@ -321,24 +334,15 @@ Read data from SSH connection.
   / *Type*: str /
 
   Data from SSH connection.
-      """
-      data = ''
-
-      # We read the data here from the queue filled by the
-      # low-level receiver thread.
-      while data[-2:] != '\r\n' and not self._llrecv_thrd_term.isSet():
-         try:
-            d = self.SSHq.get(block=False)
 
-            if data[-2:] != '\r\n':
-               data = data + d
-         except queue.Empty:
-            # non blocking get from SSHq causes that
-            # Queue.Empty exception. In this case wait some milliseconds before
-            # retry
-            time.sleep(TCPBase.RECV_MSGS_POLLING_INTERVAL)
-
-      data = data[:-2]
+  None if no complete line has been received.
+      """
+      # We read the line here from the queue filled by the
+      # low-level receiver thread, which wakes up the receiver thread for every new chunk of lines.
+      try:
+         data = self.SSHq.popleft()
+      except IndexError:
+         return None
 
       return self._q_dollar(data)
 
@@ -373,6 +377,7 @@ Quit and stop receiver thread.
       # stop the low-level receiver thread
       if self._llrecv_thrd_obj and self._llrecv_thrd_obj.is_alive():
          self._llrecv_thrd_term.set()
+         self._chan_ready.set()
 
       self._llrecv_thrd_obj = None
       self.close()
@@ -30,7 +30,9 @@
 from robot.libraries.BuiltIn import BuiltIn
 from QConnectBase.connection_base import ConnectionBase, BrokenConnError
 from QConnectBase.utils import DictToClass
+from QConnectBase.robot_log import robot_log
 from inspect import currentframe
+from collections import deque
 import QConnectBase.constants as constants
 import socket
 import threading
@@ -90,6 +92,9 @@ Constructor for TCPBase class.
       self._is_connected = False
       self._send_lock = threading.RLock()
       self._read_lock = threading.RLock()
+      # received bytes of an incomplete line and the already framed lines
+      self._recv_buffer = b''
+      self._recv_lines = deque()
       TCPBase._socket_instance += 1
 
       # initialize receiver thread
@@ -194,8 +199,9 @@ Get connection timeout value.
 **Returns:**
          Value of connection timeout.
       """
-      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
+      if robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
       return self._timeout
 
    def _set_timeout(self, timeout):
@@ -214,8 +220,9 @@ Set the connection timeout.
 
 (*no returns*)
       """
-      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log("%s: set timeout to '%d'" % (_mident, timeout), constants.LOG_LEVEL_DEBUG)
+      if robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         BuiltIn().log("%s: set timeout to '%d'" % (_mident, timeout), constants.LOG_LEVEL_DEBUG)
       self._timeout = timeout
       self.socket.settimeout(timeout)
 
@@ -247,8 +254,9 @@ Set connection timeout.
 
 (*no returns*)
       """
-      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log("%s: set timeout to '%d'" % (_mident, timeout), constants.LOG_LEVEL_DEBUG)
+      if robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         BuiltIn().log("%s: set timeout to '%d'" % (_mident, timeout), constants.LOG_LEVEL_DEBUG)
 
       self._conn_timeout = timeout
       if self.conn is not None:
@@ -264,8 +272,9 @@ Get connection address.
 
   Connection address.
       """
-      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
+      if robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
       return self._address
 
    def _set_address(self, address):
@@ -284,8 +293,9 @@ Set connection address.
 
 (*no returns*)
       """
-      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
+      if robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
       self.address = address
 
    def _get_port(self):
@@ -298,8 +308,9 @@ Get connection port.
 
   Connection port.
       """
-      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
+      if robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
       return self._port
 
    def _set_port(self, port):
@@ -318,8 +329,9 @@ Set connection port.
 
 (*no returns*)
       """
-      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
+      if robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
       self.port = port
 
    def _is_connected(self):
@@ -330,8 +342,9 @@ Get connected state.
          True if connection is connected.
          False if connection is not connected.
       """
-      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
+      if robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
       return self._is_connected
 
    def _get_socket_instance(self):
@@ -341,8 +354,9 @@ Get connected state.
 **Returns:**
          Value of _socket_instance.
       """
-      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
-      BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
+      if robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
       return TCPBase._socket_instance
 
    ##############################################################
@@ -462,6 +476,8 @@ Wrapper method for handling accept action of TCP Server.
       self.conn, addr = self._accept()
       self.conn_timeout = self._conn_timeout
       self._is_connected = True
+      self._metrics.connects += 1
+      self._notify_receiver()
       BuiltIn().log("%s: connected to '%s':'%d' " % (_mident, addr[0], addr[1]))
 
    def connect(self):
@@ -484,6 +500,8 @@ Base class for TCP client.
          self.socket.connect((self.address, self.port))
          self.conn = self.socket
          self._is_connected = True
+         self._metrics.connects += 1
+         self._notify_receiver()
       except Exception as reason:
          BuiltIn().log("%s: %s" % (_mident, reason), constants.LOG_LEVEL_ERROR)
          raise BrokenConnError("Not possible to connect.")
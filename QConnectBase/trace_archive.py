@@ -0,0 +1,502 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: trace_archive.py
+#
+# Description:
+#   Provide the binary trace archive: all received trace messages of one or more connections are written as
+#   length-prefixed records with a sparse time index, so a time range or a connection can be read after the run
+#   without scanning the whole archive.
+#
+#   Archive file layout (little endian):
+#     header : magic 'QTA1', version (uint16), wall-clock minus monotonic time in ns (int64)
+#     record : kind (uint8), connection id (uint16), monotonic timestamp in ns (int64), length (uint32), payload
+#              kind 0 is a trace message (payload: UTF-8 line), kind 1 defines the name of a connection id.
+#
+#   Index file '<archive>.idx': pairs of timestamp in ns (int64) and byte offset (int64) of a trace record, one pair
+#   about every 'index interval' bytes. The timestamp is the running maximum of the timestamps of all records before the
+#   offset, so the index stays sorted although the dispatch threads of several connections write their records slightly
+#   out of time order. Pairs with a negative timestamp (-1 - connection id) refer to the record defining the name of a
+#   connection. The records of one connection are always in time order.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+# - Version 2 of the archive: index by running maximum timestamp.
+#
+# *******************************************************************************
+from bisect import bisect_left
+from robot.libraries.BuiltIn import BuiltIn
+import QConnectBase.constants as constants
+import datetime
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+_HEADER = struct.Struct('<4sHq')
+_RECORD = struct.Struct('<BHqI')
+_INDEX_ENTRY = struct.Struct('<qq')
+_MAGIC = b'QTA1'
+_VERSION = 2
+_KIND_TRACE = 0
+_KIND_CONNECTION = 1
+
+
+def to_wall_time(value):
+   """
+Convert a time argument into wall-clock time.
+
+**Arguments:**
+
+* ``value``
+
+  / *Condition*: required / *Type*: float / str /
+
+  Seconds since the epoch, or a date string like '2026-10-17 08:15:00.250'. None is kept.
+
+**Returns:**
+
+  / *Type*: float /
+
+  Seconds since the epoch.
+   """
+   if value is None or value == '':
+      return None
+   try:
+      return float(value)
+   except (TypeError, ValueError):
+      pass
+   try:
+      return datetime.datetime.fromisoformat(str(value).strip()).timestamp()
+   except ValueError:
+      raise ValueError("Invalid time '%s'. Use seconds since the epoch or a date like '2026-10-17 08:15:00.250'." % value)
+
+
+def get_archive_path(path):
+   """
+Get the absolute path of a trace archive. Relative paths refer to the output directory of Robot Framework.
+
+**Arguments:**
+
+* ``path``
+
+  / *Condition*: required / *Type*: str /
+
+  Configured archive path.
+
+**Returns:**
+
+  / *Type*: str /
+
+  Absolute archive path.
+   """
+   if not os.path.isabs(path):
+      # noinspection PyBroadException
+      try:
+         path = os.path.join(BuiltIn()._context.output._settings.output_directory, path)
+      except Exception:
+         pass
+   return os.path.abspath(path)
+
+
+class TraceArchiveWriter(object):
+   """
+Writer of a trace archive. Connections configured with the same archive path share one writer.
+   """
+   _writers = {}
+   _writers_lock = threading.Lock()
+
+   def __init__(self, path, index_interval=constants.TRACE_ARCHIVE_INDEX_INTERVAL):
+      """
+Constructor for TraceArchiveWriter class, use open() to get the shared writer of an archive.
+
+**Arguments:**
+
+* ``path``
+
+  / *Condition*: required / *Type*: str /
+
+  Path of the archive file. An existing archive is overwritten.
+
+* ``index_interval``
+
+  / *Condition*: optional / *Type*: int / *Default*: 65536 /
+
+  Approximate number of bytes between two index entries.
+      """
+      self.path = path
+      self.index_interval = max(int(index_interval), 1)
+      self.n_records = 0
+      self._lock = threading.Lock()
+      self._ref_count = 0
+      self._connection_ids = {}
+      self._file = open(path, 'wb', buffering=constants.TRACE_ARCHIVE_BUFFER_SIZE)
+      self._index_file = open(path + constants.TRACE_ARCHIVE_INDEX_SUFFIX, 'wb')
+      self._file.write(_HEADER.pack(_MAGIC, _VERSION, time.time_ns() - time.monotonic_ns()))
+      self._offset = _HEADER.size
+      self._next_index_offset = self._offset
+      self._max_timestamp_ns = 0
+
+   @staticmethod
+   def open(path, index_interval=constants.TRACE_ARCHIVE_INDEX_INTERVAL):
+      """
+Get the writer of an archive and register a user of it.
+
+**Arguments:**
+
+* ``path``
+
+  / *Condition*: required / *Type*: str /
+
+  Path of the archive file.
+
+* ``index_interval``
+
+  / *Condition*: optional / *Type*: int / *Default*: 65536 /
+
+  Approximate number of bytes between two index entries, used if the archive is created.
+
+**Returns:**
+
+  / *Type*: TraceArchiveWriter /
+
+  The writer, to be released by close().
+      """
+      path = get_archive_path(path)
+      with TraceArchiveWriter._writers_lock:
+         writer = TraceArchiveWriter._writers.get(path)
+         if writer is None:
+            dir_archive = os.path.dirname(path)
+            if not os.path.exists(dir_archive):
+               os.makedirs(dir_archive)
+            writer = TraceArchiveWriter(path, index_interval)
+            TraceArchiveWriter._writers[path] = writer
+         writer._ref_count += 1
+         return writer
+
+   @staticmethod
+   def flush_archive(path):
+      """
+Write the buffered records of an archive which is currently written, e.g. before reading it.
+
+**Arguments:**
+
+* ``path``
+
+  / *Condition*: required / *Type*: str /
+
+  Path of the archive file.
+
+**Returns:**
+
+(*no returns*)
+      """
+      with TraceArchiveWriter._writers_lock:
+         writer = TraceArchiveWriter._writers.get(get_archive_path(path))
+      if writer is not None:
+         writer.flush()
+
+   def write(self, connection_name, msg, timestamp_ns):
+      """
+Append a trace message to the archive.
+
+**Arguments:**
+
+* ``connection_name``
+
+  / *Condition*: required / *Type*: str /
+
+  Name of the connection which received the message.
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Received trace message.
+
+* ``timestamp_ns``
+
+  / *Condition*: required / *Type*: int /
+
+  Monotonic receive time of the message in nanoseconds.
+
+**Returns:**
+
+(*no returns*)
+      """
+      payload = msg.encode('utf-8', 'replace')
+      with self._lock:
+         if self._file is None:
+            return
+         connection_id = self._connection_ids.get(connection_name)
+         if connection_id is None:
+            connection_id = len(self._connection_ids)
+            self._connection_ids[connection_name] = connection_id
+            name = connection_name.encode('utf-8')
+            self._index_file.write(_INDEX_ENTRY.pack(-1 - connection_id, self._offset))
+            self._file.write(_RECORD.pack(_KIND_CONNECTION, connection_id, timestamp_ns, len(name)))
+            self._file.write(name)
+            self._offset += _RECORD.size + len(name)
+         if self._offset >= self._next_index_offset:
+            # all records before the offset are not later than the indexed timestamp
+            self._index_file.write(_INDEX_ENTRY.pack(self._max_timestamp_ns, self._offset))
+            self._next_index_offset = self._offset + self.index_interval
+         if timestamp_ns > self._max_timestamp_ns:
+            self._max_timestamp_ns = timestamp_ns
+         self._file.write(_RECORD.pack(_KIND_TRACE, connection_id, timestamp_ns, len(payload)))
+         self._file.write(payload)
+         self._offset += _RECORD.size + len(payload)
+         self.n_records += 1
+
+   def flush(self):
+      """
+Write the buffered records into the archive file.
+
+**Returns:**
+
+(*no returns*)
+      """
+      with self._lock:
+         if self._file is not None:
+            self._file.flush()
+            self._index_file.flush()
+
+   def close(self):
+      """
+Release the writer. The archive is closed when the last user released it.
+
+**Returns:**
+
+(*no returns*)
+      """
+      with TraceArchiveWriter._writers_lock:
+         self._ref_count -= 1
+         if self._ref_count > 0:
+            return
+         TraceArchiveWriter._writers.pop(self.path, None)
+      with self._lock:
+         if self._file is not None:
+            self._file.close()
+            self._index_file.close()
+            self._file = None
+            self._index_file = None
+
+
+class TraceArchiveReader(object):
+   """
+Reader of a trace archive. The archive is memory-mapped and the time index is used to start reading at the first
+record of the requested time range.
+   """
+   def __init__(self, path):
+      """
+Constructor for TraceArchiveReader class.
+
+**Arguments:**
+
+* ``path``
+
+  / *Condition*: required / *Type*: str /
+
+  Path of the archive file.
+      """
+      self.path = path
+      self._file = open(path, 'rb')
+      size = os.fstat(self._file.fileno()).st_size
+      if size < _HEADER.size:
+         self._file.close()
+         raise ValueError("'%s' is not a trace archive." % path)
+      self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+      (magic, version, self.wall_clock_offset_ns) = _HEADER.unpack_from(self._map, 0)
+      if magic != _MAGIC or version != _VERSION:
+         self.close()
+         raise ValueError("'%s' is not a trace archive." % path)
+      self._index_timestamps = []
+      self._index_offsets = []
+      self._connection_names = {}
+      if not self._load_index():
+         self._connection_names = self._scan_connection_names()
+
+   def _load_index(self):
+      """
+Load the sparse time index and the connection names referred by it. Without index file the archive is read from
+the beginning and the connection names are collected by a full scan.
+      """
+      index_path = self.path + constants.TRACE_ARCHIVE_INDEX_SUFFIX
+      if not os.path.exists(index_path):
+         return False
+      with open(index_path, 'rb') as index_file:
+         data = index_file.read()
+      for (timestamp_ns, offset) in _INDEX_ENTRY.iter_unpack(data[:len(data) - len(data) % _INDEX_ENTRY.size]):
+         if timestamp_ns < 0:
+            for (kind, connection_id, _timestamp_ns, start, end) in self._iter_records(offset):
+               if kind == _KIND_CONNECTION:
+                  self._connection_names[connection_id] = self._map[start:end].decode('utf-8')
+               break
+         else:
+            self._index_timestamps.append(timestamp_ns)
+            self._index_offsets.append(offset)
+      return True
+
+   def _scan_connection_names(self):
+      """
+Collect the connection names of the archive.
+      """
+      names = {}
+      for (kind, connection_id, _timestamp_ns, start, end) in self._iter_records(_HEADER.size):
+         if kind == _KIND_CONNECTION:
+            names[connection_id] = self._map[start:end].decode('utf-8')
+      return names
+
+   def _iter_records(self, offset):
+      """
+Iterate over the raw records starting at an offset. An incomplete last record is ignored.
+      """
+      data = self._map
+      size = len(data)
+      record_size = _RECORD.size
+      while offset + record_size <= size:
+         (kind, connection_id, timestamp_ns, length) = _RECORD.unpack_from(data, offset)
+         start = offset + record_size
+         end = start + length
+         if end > size:
+            return
+         yield kind, connection_id, timestamp_ns, start, end
+         offset = end
+
+   def get_connection_names(self):
+      """
+Get the names of the connections in the archive.
+
+**Returns:**
+
+  / *Type*: list /
+
+  Connection names.
+      """
+      return sorted(self._connection_names.values())
+
+   def _get_start_offset(self, start_ns):
+      """
+Get the offset to start reading from for a monotonic start time: the last indexed offset before which all records
+are earlier than the start time.
+      """
+      if start_ns is None or not self._index_timestamps:
+         return _HEADER.size
+      position = bisect_left(self._index_timestamps, start_ns) - 1
+      if position < 0:
+         return _HEADER.size
+      return self._index_offsets[position]
+
+   def read(self, start_time=None, end_time=None, connection_name=None, pattern=None, max_records=None):
+      """
+Read the trace messages of a time range.
+
+**Arguments:**
+
+* ``start_time``
+
+  / *Condition*: optional / *Type*: float / str / *Default*: None /
+
+  Begin of the time range, seconds since the epoch or a date string. None for the beginning of the archive.
+
+* ``end_time``
+
+  / *Condition*: optional / *Type*: float / str / *Default*: None /
+
+  End of the time range, seconds since the epoch or a date string. None for the end of the archive.
+
+* ``connection_name``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Only read the messages of this connection. None for all connections.
+
+* ``pattern``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Only read the messages matching this regular expression.
+
+* ``max_records``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Maximum number of messages. None for no limit.
+
+**Returns:**
+
+  / *Type*: generator /
+
+  Tuples of receive time (seconds since the epoch), connection name and message.
+      """
+      start_time = to_wall_time(start_time)
+      end_time = to_wall_time(end_time)
+      start_ns = None if start_time is None else int(start_time * 1e9) - self.wall_clock_offset_ns
+      end_ns = None if end_time is None else int(end_time * 1e9) - self.wall_clock_offset_ns
+      connection_id = None
+      if connection_name is not None:
+         ids = [key for key, name in self._connection_names.items() if name == connection_name]
+         if not ids:
+            return
+         connection_id = ids[0]
+      search_regex = None if pattern is None else re.compile(pattern, constants.TRACE_PATTERN_FLAGS)
+      # The records of different connections may be out of time order, but the records of one connection are not.
+      # So reading can stop when a record after the end time has been read from each connection of interest.
+      pending_ids = set(self._connection_names) if connection_id is None else {connection_id}
+
+      n_records = 0
+      data = self._map
+      for (kind, record_connection_id, timestamp_ns, start, end) in self._iter_records(self._get_start_offset(start_ns)):
+         if kind != _KIND_TRACE:
+            continue
+         if end_ns is not None and timestamp_ns > end_ns:
+            pending_ids.discard(record_connection_id)
+            if not pending_ids:
+               return
+            continue
+         if connection_id is not None and record_connection_id != connection_id:
+            continue
+         if start_ns is not None and timestamp_ns < start_ns:
+            continue
+         msg = data[start:end].decode('utf-8', 'replace')
+         if search_regex is not None and search_regex.search(msg) is None:
+            continue
+         yield (timestamp_ns + self.wall_clock_offset_ns) / 1e9, self._connection_names.get(record_connection_id), msg
+         n_records += 1
+         if max_records is not None and n_records >= max_records:
+            return
+
+   def close(self):
+      """
+Unmap and close the archive.
+
+**Returns:**
+
+(*no returns*)
+      """
+      if self._map is not None:
+         self._map.close()
+         self._map = None
+      self._file.close()
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self, *args):
+      self.close()
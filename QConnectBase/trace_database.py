@@ -0,0 +1,436 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: trace_database.py
+#
+# Description:
+#   Provide the SQLite trace database: all received trace messages of one or more connections are inserted by a
+#   background writer in batched transactions and indexed for full-text search (FTS5, FTS4 as fallback).
+#   The full-text index is filled by an insert trigger, so several writers may share one database.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+# - Fill the full-text index by an insert trigger, report write errors.
+#
+# *******************************************************************************
+from QConnectBase.robot_log import robot_log
+from QConnectBase.trace_archive import get_archive_path, to_wall_time
+import QConnectBase.constants as constants
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS traces (
+   id INTEGER PRIMARY KEY,
+   time REAL NOT NULL,
+   connection TEXT NOT NULL,
+   trace TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS traces_time ON traces (time);
+CREATE INDEX IF NOT EXISTS traces_connection_time ON traces (connection, time);
+"""
+
+_FTS_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS traces_fts_insert AFTER INSERT ON traces BEGIN
+   INSERT INTO traces_fts (rowid, trace) VALUES (new.id, new.trace);
+END;
+"""
+
+
+def _create_fts_table(db_connection):
+   """
+Create the full-text index of the traces, FTS5 if available, otherwise FTS4, and the trigger which indexes each
+inserted trace.
+
+**Arguments:**
+
+* ``db_connection``
+
+  / *Condition*: required / *Type*: sqlite3.Connection /
+
+  Database connection.
+
+**Returns:**
+
+(*no returns*)
+   """
+   try:
+      db_connection.execute("CREATE VIRTUAL TABLE IF NOT EXISTS traces_fts USING fts5(trace, content='traces', content_rowid='id')")
+   except sqlite3.OperationalError:
+      db_connection.execute("CREATE VIRTUAL TABLE IF NOT EXISTS traces_fts USING fts4(trace, content='traces')")
+   db_connection.executescript(_FTS_TRIGGER)
+
+
+class TraceDatabaseWriter(object):
+   """
+Background writer of a trace database. Connections configured with the same database path share one writer.
+
+Traces are handed over by a bounded queue, so the receiving thread never waits for the disk. They are dropped and
+counted if the queue is full. A batch which can't be inserted is logged and counted as failed, the last error is
+kept in ``error`` and reported by flush() and close().
+   """
+   _writers = {}
+   _writers_lock = threading.Lock()
+
+   def __init__(self, path, maxsize=constants.TRACE_DATABASE_QUEUE_SIZE):
+      """
+Constructor for TraceDatabaseWriter class, use open() to get the shared writer of a database.
+
+**Arguments:**
+
+* ``path``
+
+  / *Condition*: required / *Type*: str /
+
+  Path of the database file. Traces are appended to an existing database.
+
+* ``maxsize``
+
+  / *Condition*: optional / *Type*: int / *Default*: 100000 /
+
+  Maximum number of traces waiting to be inserted.
+      """
+      self.path = path
+      self.inserted = 0
+      self.dropped = 0
+      self.failed = 0
+      self.error = None
+      self._ref_count = 0
+      self._queue = queue.Queue(maxsize=max(int(maxsize), 1))
+      db_connection = sqlite3.connect(path)
+      try:
+         db_connection.executescript(_SCHEMA)
+         _create_fts_table(db_connection)
+         db_connection.commit()
+      finally:
+         db_connection.close()
+      self._writer_thread = threading.Thread(target=self._write_loop, name="QTraceDatabase", daemon=True)
+      self._writer_thread.start()
+
+   @staticmethod
+   def open(path):
+      """
+Get the writer of a database and register a user of it.
+
+**Arguments:**
+
+* ``path``
+
+  / *Condition*: required / *Type*: str /
+
+  Path of the database file. Relative paths refer to the output directory.
+
+**Returns:**
+
+  / *Type*: TraceDatabaseWriter /
+
+  The writer, to be released by close().
+      """
+      path = get_archive_path(path)
+      with TraceDatabaseWriter._writers_lock:
+         writer = TraceDatabaseWriter._writers.get(path)
+         if writer is None:
+            dir_database = os.path.dirname(path)
+            if not os.path.exists(dir_database):
+               os.makedirs(dir_database)
+            writer = TraceDatabaseWriter(path)
+            TraceDatabaseWriter._writers[path] = writer
+         writer._ref_count += 1
+         return writer
+
+   @staticmethod
+   def flush_database(path, timeout=constants.TRACE_DATABASE_FLUSH_TIMEOUT):
+      """
+Wait until the queued traces of a database which is currently written are committed, e.g. before querying it.
+
+**Arguments:**
+
+* ``path``
+
+  / *Condition*: required / *Type*: str /
+
+  Path of the database file.
+
+* ``timeout``
+
+  / *Condition*: optional / *Type*: float / *Default*: 10 /
+
+  Maximum time to wait in seconds.
+
+**Returns:**
+
+  / *Type*: bool /
+
+  False if the traces are not committed within the timeout or the writer failed to insert traces, refer to flush().
+      """
+      with TraceDatabaseWriter._writers_lock:
+         writer = TraceDatabaseWriter._writers.get(get_archive_path(path))
+      if writer is None:
+         return True
+      return writer.flush(timeout)
+
+   def write(self, connection_name, msg, wall_time):
+      """
+Queue a trace message for insertion.
+
+**Arguments:**
+
+* ``connection_name``
+
+  / *Condition*: required / *Type*: str /
+
+  Name of the connection which received the message.
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Received trace message.
+
+* ``wall_time``
+
+  / *Condition*: required / *Type*: float /
+
+  Receive time of the message in seconds since the epoch.
+
+**Returns:**
+
+(*no returns*)
+      """
+      try:
+         self._queue.put_nowait((wall_time, connection_name, msg))
+      except queue.Full:
+         self.dropped += 1
+
+   def flush(self, timeout=constants.TRACE_DATABASE_FLUSH_TIMEOUT):
+      """
+Wait until the traces queued so far are committed.
+
+**Arguments:**
+
+* ``timeout``
+
+  / *Condition*: optional / *Type*: float / *Default*: 10 /
+
+  Maximum time to wait in seconds.
+
+**Returns:**
+
+  / *Type*: bool /
+
+  True if the traces are committed within the timeout and no trace failed to be inserted so far.
+      """
+      if not self._writer_thread.is_alive():
+         return self._queue.empty() and self.error is None
+      deadline = time.monotonic() + timeout
+      committed = threading.Event()
+      try:
+         self._queue.put(committed, timeout=timeout)
+      except queue.Full:
+         return False
+      return committed.wait(max(deadline - time.monotonic(), 0)) and self.error is None
+
+   def _write_loop(self):
+      """
+Writer thread: insert the queued traces in batches, one transaction per batch.
+      """
+      db_connection = None
+      try:
+         db_connection = sqlite3.connect(self.path)
+         db_connection.execute("PRAGMA journal_mode=WAL")
+         db_connection.execute("PRAGMA synchronous=NORMAL")
+      except sqlite3.Error as reason:
+         self._set_error("Unable to open the trace database '%s'. Reason: %s" % (self.path, reason))
+      try:
+         stop = False
+         while not stop:
+            batch = [self._queue.get()]
+            while len(batch) < constants.TRACE_DATABASE_BATCH_SIZE:
+               try:
+                  batch.append(self._queue.get_nowait())
+               except queue.Empty:
+                  break
+            rows = [item for item in batch if isinstance(item, tuple)]
+            if rows and db_connection is None:
+               self.failed += len(rows)
+            elif rows:
+               try:
+                  with db_connection:
+                     db_connection.executemany("INSERT INTO traces (time, connection, trace) VALUES (?, ?, ?)", rows)
+                  self.inserted += len(rows)
+               except sqlite3.Error as reason:
+                  self.failed += len(rows)
+                  self._set_error("Unable to insert %d traces into the trace database '%s'. Reason: %s" % (len(rows), self.path, reason))
+            for item in batch:
+               if item is None:
+                  stop = True
+               elif isinstance(item, threading.Event):
+                  item.set()
+      finally:
+         if db_connection is not None:
+            db_connection.close()
+
+   def _set_error(self, error):
+      """
+Keep and log an error of the writer thread.
+      """
+      self.error = error
+      robot_log.warning(error)
+
+   def close(self, timeout=constants.TRACE_DATABASE_FLUSH_TIMEOUT):
+      """
+Release the writer. The queued traces are committed and the writer thread is stopped when the last user released it.
+
+**Arguments:**
+
+* ``timeout``
+
+  / *Condition*: optional / *Type*: float / *Default*: 10 /
+
+  Maximum time to wait for the writer thread in seconds.
+
+**Returns:**
+
+  / *Type*: bool /
+
+  True if the writer is still used or its thread stopped within the timeout and no trace failed to be inserted.
+      """
+      with TraceDatabaseWriter._writers_lock:
+         self._ref_count -= 1
+         if self._ref_count > 0:
+            return True
+         TraceDatabaseWriter._writers.pop(self.path, None)
+      deadline = time.monotonic() + timeout
+      try:
+         self._queue.put(None, timeout=timeout)
+      except queue.Full:
+         self.error = "The writer of the trace database '%s' didn't stop within %s seconds." % (self.path, timeout)
+         return False
+      self._writer_thread.join(max(deadline - time.monotonic(), 0))
+      if self._writer_thread.is_alive():
+         self.error = "The writer of the trace database '%s' didn't stop within %s seconds." % (self.path, timeout)
+         return False
+      return self.error is None
+
+
+class TraceDatabaseReader(object):
+   """
+Reader of a trace database.
+   """
+   def __init__(self, path):
+      """
+Constructor for TraceDatabaseReader class.
+
+**Arguments:**
+
+* ``path``
+
+  / *Condition*: required / *Type*: str /
+
+  Path of the database file.
+      """
+      if not os.path.exists(path):
+         raise ValueError("The trace database '%s' doesn't exist." % path)
+      self.path = path
+      self._db_connection = sqlite3.connect(pathlib.Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+
+   def query(self, match=None, start_time=None, end_time=None, connection_name=None, max_records=None):
+      """
+Query the traces of the database.
+
+**Arguments:**
+
+* ``match``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Full-text search expression, e.g. 'error AND timeout' or '"link down"'. None for all traces.
+
+* ``start_time``
+
+  / *Condition*: optional / *Type*: float / str / *Default*: None /
+
+  Begin of the time range, seconds since the epoch or a date string. None for no limit.
+
+* ``end_time``
+
+  / *Condition*: optional / *Type*: float / str / *Default*: None /
+
+  End of the time range, seconds since the epoch or a date string. None for no limit.
+
+* ``connection_name``
+
+  / *Condition*: optional / *Type*: str / *Default*: None /
+
+  Only query the traces of this connection. None for all connections.
+
+* ``max_records``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Maximum number of traces. None for no limit.
+
+**Returns:**
+
+  / *Type*: list /
+
+  Tuples of receive time (seconds since the epoch), connection name and message, ordered by time.
+      """
+      conditions = []
+      params = []
+      if match:
+         conditions.append("traces.id IN (SELECT rowid FROM traces_fts WHERE traces_fts MATCH ?)")
+         params.append(match)
+      start_time = to_wall_time(start_time)
+      if start_time is not None:
+         conditions.append("traces.time >= ?")
+         params.append(start_time)
+      end_time = to_wall_time(end_time)
+      if end_time is not None:
+         conditions.append("traces.time <= ?")
+         params.append(end_time)
+      if connection_name is not None:
+         conditions.append("traces.connection = ?")
+         params.append(connection_name)
+      statement = "SELECT time, connection, trace FROM traces"
+      if conditions:
+         statement += " WHERE " + " AND ".join(conditions)
+      statement += " ORDER BY time, id"
+      if max_records is not None:
+         statement += " LIMIT ?"
+         params.append(int(max_records))
+      return self._db_connection.execute(statement, params).fetchall()
+
+   def close(self):
+      """
+Close the database.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._db_connection.close()
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self, *args):
+      self.close()
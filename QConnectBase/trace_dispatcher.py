@@ -0,0 +1,1781 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: trace_dispatcher.py
+#
+# Description:
+#   Provide the registries of trace filters which are fed by the receiver thread of connections
+#   and the indexed dispatch engine which selects the filters a trace message has to be matched with.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize with per-connection and global trace filter registries.
+# - Add literal-substring prefilter index for dispatching trace messages.
+# - Add handoff buffer between the reader and the dispatch stage of the receiver pipeline.
+# - Add bounded trace queue with overflow policies.
+# - Add shared LRU cache of compiled patterns.
+# - Add block buffer for the 'fetch block' feature which skips blocks without the required literal of the pattern.
+# - Add per-connection trace history ring buffer, fetch blocks of connection filters refer into it.
+# - Add monotonic receive timestamps of trace messages and match results carrying them.
+# - Add timestamp lookup in the trace history for matching traces received since a mark.
+# - Add trace counter for occurrence-count waits within a sliding time window.
+# - Add trace aggregator for streaming statistics of numeric capture groups.
+# - Report whether a trace message matched any trace filter, used by the Robot log forwarding policies.
+#
+# *******************************************************************************
+from array import array
+from collections import deque, OrderedDict
+from QConnectBase.trace_statistics import RunningStatistics
+import QConnectBase.constants as constants
+import itertools
+import math
+import threading
+import queue
+import time
+import re
+
+try:
+   import re._parser as sre_parse
+except ImportError:
+   import sre_parse
+
+_REPEAT_OPS = tuple(getattr(sre_parse, op) for op in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT') if hasattr(sre_parse, op))
+_ATOMIC_GROUP = getattr(sre_parse, 'ATOMIC_GROUP', None)
+
+
+# Offset between wall clock and monotonic clock, taken once so all receive timestamps share one anchor.
+_WALL_CLOCK_OFFSET_NS = time.time_ns() - time.monotonic_ns()
+
+
+def monotonic_ns_to_wall_time(timestamp_ns):
+   """
+Convert a monotonic receive timestamp into wall-clock time.
+
+**Arguments:**
+
+* ``timestamp_ns``
+
+  / *Condition*: required / *Type*: int /
+
+  Value of time.monotonic_ns().
+
+**Returns:**
+
+  / *Type*: float /
+
+  Seconds since the epoch as returned by time.time().
+   """
+   return (timestamp_ns + _WALL_CLOCK_OFFSET_NS) / 1e9
+
+
+def _collect_required_literals(parsed, literals):
+   """
+Collect the literal strings which must be contained in every match of a parsed regular expression.
+
+**Arguments:**
+
+* ``parsed``
+
+  / *Condition*: required / *Type*: sre_parse.SubPattern /
+
+  Parsed regular expression.
+
+* ``literals``
+
+  / *Condition*: required / *Type*: list /
+
+  List the found literal strings are appended to.
+
+**Returns:**
+
+(*no returns*)
+   """
+   run = []
+   for op, av in parsed:
+      if op is sre_parse.LITERAL:
+         run.append(chr(av))
+         continue
+
+      if run:
+         literals.append(''.join(run))
+         run = []
+
+      if op is sre_parse.SUBPATTERN:
+         add_flags = av[1]
+         if not add_flags & re.IGNORECASE:
+            _collect_required_literals(av[3], literals)
+      elif op in _REPEAT_OPS:
+         if av[0] >= 1:
+            _collect_required_literals(av[2], literals)
+      elif op is _ATOMIC_GROUP:
+         _collect_required_literals(av, literals)
+
+   if run:
+      literals.append(''.join(run))
+
+
+def extract_required_literal(regex):
+   """
+Extract the longest literal substring which must be contained in every string matched by a regular expression.
+
+**Arguments:**
+
+* ``regex``
+
+  / *Condition*: required / *Type*: re.Pattern /
+
+  Compiled regular expression.
+
+**Returns:**
+
+  / *Type*: str /
+
+  The required literal substring.
+
+  None if the regular expression does not require any literal (e.g. '.*', alternations or case-insensitive patterns).
+   """
+   if regex is None or not isinstance(regex.pattern, str) or regex.flags & re.IGNORECASE:
+      return None
+
+   literals = []
+   # noinspection PyBroadException
+   try:
+      _collect_required_literals(sre_parse.parse(regex.pattern, regex.flags), literals)
+   except Exception:
+      return None
+   if not literals:
+      return None
+   return max(literals, key=len)
+
+
+class PatternCache(object):
+   """
+Thread-safe LRU cache of compiled regular expressions keyed by pattern and flags.
+   """
+   def __init__(self, maxsize=constants.PATTERN_CACHE_DEFAULT_SIZE):
+      """
+Constructor for PatternCache class.
+
+**Arguments:**
+
+* ``maxsize``
+
+  / *Condition*: optional / *Type*: int / *Default*: 1024 /
+
+  Maximum number of cached patterns. The least recently used pattern is evicted when the cache is full.
+      """
+      self.maxsize = int(maxsize)
+      self._lock = threading.Lock()
+      self._patterns = OrderedDict()
+      self.hits = 0
+      self.misses = 0
+      self.evictions = 0
+
+   def compile(self, pattern, flags=0):
+      """
+Get the compiled regular expression of a pattern from the cache, compile it on a cache miss.
+
+**Arguments:**
+
+* ``pattern``
+
+  / *Condition*: required / *Type*: str or re.Pattern /
+
+  Regular expression. A compiled regular expression is returned unchanged.
+
+* ``flags``
+
+  / *Condition*: optional / *Type*: int / *Default*: 0 /
+
+  Flags of module 're' used for compiling the pattern.
+
+**Returns:**
+
+  / *Type*: re.Pattern /
+
+  Compiled regular expression.
+      """
+      if isinstance(pattern, re.Pattern):
+         return pattern
+      key = (pattern, flags)
+      with self._lock:
+         regex = self._patterns.get(key)
+         if regex is not None:
+            self._patterns.move_to_end(key)
+            self.hits += 1
+            return regex
+         self.misses += 1
+
+      regex = re.compile(pattern, flags)
+      with self._lock:
+         self._patterns[key] = regex
+         self._patterns.move_to_end(key)
+         while len(self._patterns) > self.maxsize:
+            self._patterns.popitem(last=False)
+            self.evictions += 1
+      return regex
+
+   def clear(self):
+      """
+Remove all cached patterns and reset the statistics.
+
+**Returns:**
+
+(*no returns*)
+      """
+      with self._lock:
+         self._patterns.clear()
+         self.hits = 0
+         self.misses = 0
+         self.evictions = 0
+
+   def get_statistics(self):
+      """
+Get the usage statistics of the cache.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  size: number of cached patterns, maxsize: capacity, hits, misses, evictions: counters since creation or last clear.
+      """
+      with self._lock:
+         return {
+            'size': len(self._patterns),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+         }
+
+
+pattern_cache = PatternCache()
+
+
+def compile_pattern(pattern, flags=0):
+   """
+Compile a regular expression via the pattern cache shared by all connections.
+
+**Arguments:**
+
+* ``pattern``
+
+  / *Condition*: required / *Type*: str or re.Pattern /
+
+  Regular expression.
+
+* ``flags``
+
+  / *Condition*: optional / *Type*: int / *Default*: 0 /
+
+  Flags of module 're' used for compiling the pattern.
+
+**Returns:**
+
+  / *Type*: re.Pattern /
+
+  Compiled regular expression.
+   """
+   return pattern_cache.compile(pattern, flags)
+
+
+class TraceMatch(object):
+   """
+Match result of a trace filter. Behaves like the underlying re.Match object and additionally provides the
+receive time of the matched trace message.
+   """
+   __slots__ = ('match', 'timestamp_ns', 'request_timestamp_ns')
+
+   def __init__(self, match, timestamp_ns, request_timestamp_ns=None):
+      """
+Constructor for TraceMatch class.
+
+**Arguments:**
+
+* ``match``
+
+  / *Condition*: required / *Type*: re.Match /
+
+  Match object of the trace filter.
+
+* ``timestamp_ns``
+
+  / *Condition*: required / *Type*: int /
+
+  Monotonic time in nanoseconds when the (last) matched trace message was read from the connection.
+
+* ``request_timestamp_ns``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Monotonic time in nanoseconds when the command expecting this match was sent.
+      """
+      self.match = match
+      self.timestamp_ns = timestamp_ns
+      self.request_timestamp_ns = request_timestamp_ns
+
+   @property
+   def wall_time(self):
+      """
+Receive time of the matched trace message in seconds since the epoch.
+      """
+      return monotonic_ns_to_wall_time(self.timestamp_ns)
+
+   @property
+   def latency_ns(self):
+      """
+Time in nanoseconds from sending the command until receiving the matched trace message. None if no command was sent.
+      """
+      if self.request_timestamp_ns is None:
+         return None
+      return self.timestamp_ns - self.request_timestamp_ns
+
+   def __getattr__(self, name):
+      return getattr(self.match, name)
+
+   def __getitem__(self, group):
+      return self.match[group]
+
+   def __bool__(self):
+      return True
+
+   def __repr__(self):
+      return "<TraceMatch timestamp_ns=%d, match=%r>" % (self.timestamp_ns, self.match.group(0))
+
+
+class TraceQueue(queue.Queue):
+   """
+Bounded queue for trace results with a selectable overflow policy.
+
+The policy is applied when a trace result is put into a full queue:
+
+* ``block``: wait until the consumer takes a result, at most ``block_timeout`` seconds. The new result is discarded
+  if the queue is still full, if the queue is closed while waiting or if put() is called with ``block`` False.
+* ``drop-oldest``: discard the oldest pending result.
+* ``drop-newest``: discard the new result.
+* ``keep-latest``: discard all pending results, only the new result is kept.
+
+Every discarded result is counted in the ``dropped`` attribute.
+   """
+   _SUPPORTED_POLICIES = (constants.TraceQueuePolicy.BLOCK,
+                          constants.TraceQueuePolicy.DROP_OLDEST,
+                          constants.TraceQueuePolicy.DROP_NEWEST,
+                          constants.TraceQueuePolicy.KEEP_LATEST)
+
+   def __init__(self, maxsize=constants.TRACE_QUEUE_DEFAULT_SIZE, policy=constants.TraceQueuePolicy.DROP_OLDEST, block_timeout=constants.TRACE_QUEUE_BLOCK_TIMEOUT):
+      """
+Constructor for TraceQueue class.
+
+**Arguments:**
+
+* ``maxsize``
+
+  / *Condition*: optional / *Type*: int / *Default*: 10000 /
+
+  Maximum number of pending trace results. 0 for an unbounded queue.
+
+* ``policy``
+
+  / *Condition*: optional / *Type*: str / *Default*: 'drop-oldest' /
+
+  Overflow policy: 'block', 'drop-oldest', 'drop-newest' or 'keep-latest'.
+
+* ``block_timeout``
+
+  / *Condition*: optional / *Type*: float / *Default*: 5.0 /
+
+  Maximum time in seconds the producer waits for free space with the 'block' policy.
+      """
+      if policy not in TraceQueue._SUPPORTED_POLICIES:
+         raise ValueError("Unsupported trace queue policy '%s'. Possible values: %s" % (policy, ", ".join(TraceQueue._SUPPORTED_POLICIES)))
+      queue.Queue.__init__(self, int(maxsize))
+      self.policy = policy
+      self.block_timeout = float(block_timeout)
+      self.dropped = 0
+      self.closed = False
+
+   def put(self, item, block=True, timeout=None):
+      """
+Put a trace result into the queue and apply the overflow policy if the queue is full.
+``block`` and ``timeout`` only apply to the 'block' policy, the other policies never wait.
+
+**Arguments:**
+
+* ``item``
+
+  / *Condition*: required / *Type*: tuple /
+
+  Trace result.
+
+* ``block``
+
+  / *Condition*: optional / *Type*: bool / *Default*: True /
+
+  Wait for free space with the 'block' policy. The result is discarded at once if the queue is full and
+  ``block`` is False.
+
+* ``timeout``
+
+  / *Condition*: optional / *Type*: float / *Default*: None /
+
+  Maximum time in seconds to wait for free space. None to use ``block_timeout``.
+
+**Returns:**
+
+(*no returns*)
+      """
+      with self.not_full:
+         if 0 < self.maxsize <= self._qsize():
+            if self.policy == constants.TraceQueuePolicy.BLOCK:
+               if block:
+                  deadline = time.monotonic() + (self.block_timeout if timeout is None else max(float(timeout), 0.0))
+                  while self._qsize() >= self.maxsize and not self.closed:
+                     remaining = deadline - time.monotonic()
+                     if remaining <= 0:
+                        break
+                     self.not_full.wait(remaining)
+               if self._qsize() >= self.maxsize:
+                  self.dropped += 1
+                  return
+            elif self.policy == constants.TraceQueuePolicy.DROP_NEWEST:
+               self.dropped += 1
+               return
+            else:
+               n_drop = 1 if self.policy == constants.TraceQueuePolicy.DROP_OLDEST else self._qsize()
+               for _ in range(n_drop):
+                  self._get()
+               self.dropped += n_drop
+               self.unfinished_tasks -= n_drop
+               if self.unfinished_tasks <= 0:
+                  self.all_tasks_done.notify_all()
+         self._put(item)
+         self.unfinished_tasks += 1
+         self.not_empty.notify()
+
+   def close(self):
+      """
+Release a producer waiting with the 'block' policy. Later results are dropped if the queue is full.
+
+**Returns:**
+
+(*no returns*)
+      """
+      with self.mutex:
+         self.closed = True
+         self.not_full.notify_all()
+
+   def get_statistics(self):
+      """
+Get the fill level and drop statistics of the queue.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  size: pending trace results, maxsize: capacity (0 is unbounded), policy: overflow policy,
+  dropped: number of discarded trace results.
+      """
+      return {
+         'size': self.qsize(),
+         'maxsize': self.maxsize,
+         'policy': self.policy,
+         'dropped': self.dropped
+      }
+
+
+class FetchBlockBuffer(object):
+   """
+Buffer of the lines of a block for the 'fetch block' feature.
+
+Each line is checked for the required literal of the search pattern when it is appended, so a completed block
+which can't be matched is discarded without assembling and searching it. Any other completed block is joined and
+searched as a whole, a block consisting of one line is searched directly.
+   """
+   def __init__(self, search_regex, maxlen=500):
+      """
+Constructor for FetchBlockBuffer class.
+
+**Arguments:**
+
+* ``search_regex``
+
+  / *Condition*: required / *Type*: re.Pattern /
+
+  Regular expression the completed blocks are compared to.
+
+* ``maxlen``
+
+  / *Condition*: optional / *Type*: int / *Default*: 500 /
+
+  Maximum number of lines of a block. The oldest lines are discarded when a block exceeds this length.
+      """
+      self.search_regex = search_regex
+      self.lines = deque(maxlen=maxlen)
+      self._literal = extract_required_literal(search_regex)
+      if self._literal is not None and ('\r' in self._literal or '\n' in self._literal):
+         # literal may span the line separator of the assembled block
+         self._literal = None
+      self._n_appended = 0
+      self._last_literal_line = 0
+
+   def append(self, msg, seq=None):
+      """
+Append a line to the current block.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Trace message.
+
+* ``seq``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Sequence number of the message in the trace history (unused, the line is stored in the buffer).
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._n_appended += 1
+      if self._literal is not None and self._literal in msg:
+         self._last_literal_line = self._n_appended
+      self.lines.append(msg)
+
+   def complete(self):
+      """
+Complete the current block, search it and start a new block.
+
+**Returns:**
+
+  / *Type*: re.Match /
+
+  Match object of the search pattern within the block joined by '\\r\\n'. None if the block doesn't match.
+      """
+      lines = self.lines
+      if self._literal is not None and self._last_literal_line <= self._n_appended - len(lines):
+         # the required literal isn't contained in the lines kept in the block
+         result_obj = None
+      elif len(lines) == 1:
+         result_obj = self.search_regex.search(lines[0])
+      else:
+         result_obj = self.search_regex.search("\r\n".join(lines))
+      lines.clear()
+      self._n_appended = 0
+      self._last_literal_line = 0
+      return result_obj
+
+   def clear(self):
+      """
+Discard the current block.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self.lines.clear()
+      self._n_appended = 0
+      self._last_literal_line = 0
+
+   def __len__(self):
+      return len(self.lines)
+
+
+class TraceHistory(object):
+   """
+Ring buffer of the recently received trace messages of a connection with their monotonic receive timestamps.
+
+Every message gets a sequence number which increases by one per message. Trace filters refer to
+messages by their sequence number instead of keeping own copies.
+   """
+   def __init__(self, capacity=constants.TRACE_HISTORY_DEFAULT_SIZE):
+      """
+Constructor for TraceHistory class.
+
+**Arguments:**
+
+* ``capacity``
+
+  / *Condition*: optional / *Type*: int / *Default*: 10000 /
+
+  Number of messages kept in the history.
+      """
+      self.capacity = int(capacity)
+      if self.capacity < 1:
+         raise ValueError("The capacity of the trace history must be at least 1.")
+      self._lines = [None] * self.capacity
+      self._timestamps = array('q', bytes(8 * self.capacity))
+      self._lock = threading.Lock()
+      self.next_seq = 0
+
+   @property
+   def first_seq(self):
+      """
+Sequence number of the oldest message in the history.
+      """
+      return max(0, self.next_seq - self.capacity)
+
+   def append(self, msg, timestamp_ns):
+      """
+Append a received message to the history, the oldest message is overwritten if the history is full.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Received message.
+
+* ``timestamp_ns``
+
+  / *Condition*: required / *Type*: int /
+
+  Monotonic receive time of the message in nanoseconds.
+
+**Returns:**
+
+  / *Type*: int /
+
+  Sequence number of the message.
+      """
+      with self._lock:
+         seq = self.next_seq
+         pos = seq % self.capacity
+         self._lines[pos] = msg
+         self._timestamps[pos] = timestamp_ns
+         self.next_seq = seq + 1
+      return seq
+
+   def get_line(self, seq):
+      """
+Get a message by its sequence number.
+
+**Arguments:**
+
+* ``seq``
+
+  / *Condition*: required / *Type*: int /
+
+  Sequence number of the message.
+
+**Returns:**
+
+  / *Type*: str /
+
+  The message. None if the message is not (or no more) in the history.
+      """
+      with self._lock:
+         if self.first_seq <= seq < self.next_seq:
+            return self._lines[seq % self.capacity]
+      return None
+
+   def get_lines(self, seqs):
+      """
+Get the messages of the given sequence numbers which are still in the history.
+
+**Arguments:**
+
+* ``seqs``
+
+  / *Condition*: required / *Type*: iterable /
+
+  Ascending sequence numbers.
+
+**Returns:**
+
+  / *Type*: list /
+
+  List of messages.
+      """
+      with self._lock:
+         first_seq = self.first_seq
+         return [self._lines[seq % self.capacity] for seq in seqs if seq >= first_seq]
+
+   def get_entries(self, start_seq=None, stop_seq=None):
+      """
+Get the messages of a range of sequence numbers with their timestamps.
+
+**Arguments:**
+
+* ``start_seq``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  First sequence number. None for the oldest message in the history.
+
+* ``stop_seq``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Sequence number after the last requested message. None for the latest message.
+
+**Returns:**
+
+  / *Type*: list /
+
+  List of (sequence number, receive timestamp in nanoseconds, message) tuples.
+      """
+      with self._lock:
+         first_seq = self.first_seq
+         start_seq = first_seq if start_seq is None else max(start_seq, first_seq)
+         stop_seq = self.next_seq if stop_seq is None else min(stop_seq, self.next_seq)
+         return [(seq, self._timestamps[seq % self.capacity], self._lines[seq % self.capacity]) for seq in range(start_seq, stop_seq)]
+
+   def find_seq(self, timestamp_ns):
+      """
+Find the first message in the history which has been received at or after a point in time.
+The receive timestamps are ascending, so the message is found by binary search.
+
+**Arguments:**
+
+* ``timestamp_ns``
+
+  / *Condition*: required / *Type*: int /
+
+  Monotonic time in nanoseconds.
+
+**Returns:**
+
+  / *Type*: int /
+
+  Sequence number of the message. The sequence number of the next received message if no message in the history
+  has been received at or after the given time.
+      """
+      with self._lock:
+         low = self.first_seq
+         high = self.next_seq
+         while low < high:
+            mid = (low + high) // 2
+            if self._timestamps[mid % self.capacity] < timestamp_ns:
+               low = mid + 1
+            else:
+               high = mid
+         return low
+
+   def __len__(self):
+      return self.next_seq - self.first_seq
+
+
+class FetchBlockCursor(FetchBlockBuffer):
+   """
+Block of the 'fetch block' feature which refers to the lines in the trace history of the connection.
+
+Only the sequence number where the block started is kept if every line belongs to the block. With a
+line filter the sequence numbers of the filtered lines are kept. A completed block is searched like in
+FetchBlockBuffer, its lines are taken from the history.
+   """
+   def __init__(self, search_regex, history, maxlen=500, select_all=True):
+      """
+Constructor for FetchBlockCursor class.
+
+**Arguments:**
+
+* ``search_regex``
+
+  / *Condition*: required / *Type*: re.Pattern /
+
+  Regular expression the completed blocks are compared to.
+
+* ``history``
+
+  / *Condition*: required / *Type*: TraceHistory /
+
+  Trace history of the connection.
+
+* ``maxlen``
+
+  / *Condition*: optional / *Type*: int / *Default*: 500 /
+
+  Maximum number of lines of a block.
+
+* ``select_all``
+
+  / *Condition*: optional / *Type*: bool / *Default*: True /
+
+  True if every line of the history belongs to the block (no line filter).
+      """
+      FetchBlockBuffer.__init__(self, search_regex, 0)
+      self.history = history
+      self.maxlen = maxlen
+      self.select_all = select_all
+      self._start_seq = None
+      self._last_seq = None
+      self._seqs = array('q')
+
+   def append(self, msg, seq=None):
+      """
+Append a line to the current block.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Trace message.
+
+* ``seq``
+
+  / *Condition*: required / *Type*: int /
+
+  Sequence number of the message in the trace history.
+
+**Returns:**
+
+(*no returns*)
+      """
+      if self._literal is not None and self._literal in msg:
+         self._last_literal_line = seq + 1
+      if self.select_all:
+         if self._start_seq is None:
+            self._start_seq = seq
+      else:
+         self._seqs.append(seq)
+         if len(self._seqs) > 2 * self.maxlen:
+            del self._seqs[:-self.maxlen]
+      self._last_seq = seq
+
+   def complete(self):
+      """
+Complete the current block, search it and start a new block.
+
+**Returns:**
+
+  / *Type*: re.Match /
+
+  Match object of the search pattern within the block joined by '\\r\\n'. None if the block doesn't match.
+      """
+      if self._last_seq is None:
+         return None
+      if self.select_all:
+         seqs = range(max(self._start_seq, self._last_seq - self.maxlen + 1), self._last_seq + 1)
+      else:
+         seqs = self._seqs[-self.maxlen:]
+      if self._literal is not None and self._last_literal_line <= seqs[0]:
+         # the required literal isn't contained in the lines kept in the block
+         result_obj = None
+      else:
+         lines = self.history.get_lines(seqs)
+         if len(lines) == 1:
+            result_obj = self.search_regex.search(lines[0])
+         else:
+            result_obj = self.search_regex.search("\r\n".join(lines))
+      self.clear()
+      return result_obj
+
+   def clear(self):
+      """
+Discard the current block.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._start_seq = None
+      self._last_seq = None
+      self._last_literal_line = 0
+      if self._seqs:
+         self._seqs = array('q')
+
+   def __len__(self):
+      if self._last_seq is None:
+         return 0
+      if self.select_all:
+         return min(self._last_seq - self._start_seq + 1, self.maxlen)
+      return min(len(self._seqs), self.maxlen)
+
+
+class TraceFilter(object):
+   """
+Trace filter which puts the trace messages matching its search pattern into a queue.
+   """
+   def __init__(self, search_regex, trace_queue, use_fetch_block=False, end_of_block_regex=None, line_filter_regex=None, max_len_backtrace=500, history=None):
+      """
+Constructor for TraceFilter class.
+
+**Arguments:**
+
+* ``search_regex``
+
+  / *Condition*: required / *Type*: re.Pattern /
+
+  Regular expression all received trace messages are compare to.
+
+* ``trace_queue``
+
+  / *Condition*: required / *Type*: Queue /
+
+  Queue which the matched results are put in.
+
+* ``use_fetch_block``
+
+  / *Condition*: optional / *Type*: bool / *Default*: False /
+
+  Determine if 'fetch block' feature is used.
+
+* ``end_of_block_regex``
+
+  / *Condition*: optional / *Type*: re.Pattern / *Default*: None /
+
+  The end of block regular expression.
+
+* ``line_filter_regex``
+
+  / *Condition*: optional / *Type*: re.Pattern / *Default*: None /
+
+  Regular expression to filter message line by line.
+
+* ``max_len_backtrace``
+
+  / *Condition*: optional / *Type*: int / *Default*: 500 /
+
+  Maximum number of lines kept for the 'fetch block' feature.
+
+* ``history``
+
+  / *Condition*: optional / *Type*: TraceHistory / *Default*: None /
+
+  Trace history of the connection the filter is fed by. The 'fetch block' feature refers to the lines in the
+  history instead of keeping own copies. None if the filter is fed by several connections.
+      """
+      self.search_regex = search_regex
+      self.trace_queue = trace_queue
+      self.use_fetch_block = use_fetch_block
+      self.end_of_block_regex = end_of_block_regex
+      self.line_filter_regex = line_filter_regex
+      self.block_buffer = None
+      if use_fetch_block:
+         if history is not None:
+            select_all = line_filter_regex is None or line_filter_regex.pattern in ('', '.*')
+            self.block_buffer = FetchBlockCursor(search_regex, history, max_len_backtrace, select_all)
+         else:
+            self.block_buffer = FetchBlockBuffer(search_regex, max_len_backtrace)
+
+   def close(self):
+      """
+Close the trace queue of a deactivated filter, if it supports closing.
+
+**Returns:**
+
+(*no returns*)
+      """
+      close = getattr(self.trace_queue, 'close', None)
+      if close is not None:
+         close()
+
+   def get_prefilter_literal(self):
+      """
+Get the literal substring a trace message must contain to be possibly matched by this filter.
+
+**Returns:**
+
+  / *Type*: str /
+
+  The literal substring.
+
+  None if every trace message has to be processed by this filter.
+      """
+      if self.use_fetch_block:
+         return extract_required_literal(self.line_filter_regex)
+      return extract_required_literal(self.search_regex)
+
+   def process(self, msg, seq=None, timestamp_ns=None):
+      """
+Match a trace message and put the result into the trace queue if it matched. The result is a TraceMatch
+carrying the receive timestamp of the message.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Received trace message.
+
+* ``seq``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Sequence number of the message in the trace history of the connection.
+
+* ``timestamp_ns``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Monotonic receive time of the message in nanoseconds. None for the current time.
+
+**Returns:**
+
+  / *Type*: bool /
+
+  True if a match result was put into the trace queue.
+      """
+      if self.use_fetch_block:
+         if self.line_filter_regex is not None and self.line_filter_regex.search(msg) is None:
+            return False
+         self.block_buffer.append(msg, seq)
+         if self.end_of_block_regex.search(msg) is None:
+            return False
+         result_obj = self.block_buffer.complete()
+         # a completed block which doesn't match is reported by None
+         if result_obj is not None:
+            result_obj = TraceMatch(result_obj, time.monotonic_ns() if timestamp_ns is None else timestamp_ns)
+      else:
+         result_obj = self.search_regex.search(msg)
+         if result_obj is None:
+            return False
+         result_obj = TraceMatch(result_obj, time.monotonic_ns() if timestamp_ns is None else timestamp_ns)
+      if isinstance(self.trace_queue, TraceQueue):
+         # the overflow policy of the trace queue decides whether the dispatch thread waits for the consumer
+         self.trace_queue.put((time.time(), result_obj))
+      else:
+         self.trace_queue.put((time.time(), result_obj), False)
+      return True
+
+
+class TraceCounter(object):
+   """
+Trace subscriber which counts the trace messages matching its search pattern. Only the receive timestamps within
+the sliding time window are kept, no match objects.
+   """
+   def __init__(self, search_regex, window=None):
+      """
+Constructor for TraceCounter class.
+
+**Arguments:**
+
+* ``search_regex``
+
+  / *Condition*: required / *Type*: re.Pattern /
+
+  Regular expression all received trace messages are compare to.
+
+* ``window``
+
+  / *Condition*: optional / *Type*: float / *Default*: None /
+
+  Length of the sliding time window in seconds. Only the matches within the window are counted.
+  None to count all matches since the counter has been started.
+      """
+      self.search_regex = search_regex
+      self.window_ns = None if window is None else int(float(window) * 1e9)
+      self.total = 0
+      self.first_timestamp_ns = None
+      self.last_timestamp_ns = None
+      self._window_timestamps = deque()
+      self._changed = threading.Condition()
+
+   def get_prefilter_literal(self):
+      """
+Get the literal substring a trace message must contain to be possibly matched by this counter.
+
+**Returns:**
+
+  / *Type*: str /
+
+  The literal substring. None if every trace message has to be processed by this counter.
+      """
+      return extract_required_literal(self.search_regex)
+
+   def process(self, msg, seq=None, timestamp_ns=None):
+      """
+Count a trace message if it matches the search pattern.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Received trace message.
+
+* ``seq``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Sequence number of the message in the trace history of the connection (unused).
+
+* ``timestamp_ns``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Monotonic receive time of the message in nanoseconds. None for the current time.
+
+**Returns:**
+
+  / *Type*: bool /
+
+  True if the message matched the counter.
+      """
+      if self.search_regex.search(msg) is None:
+         return False
+      if timestamp_ns is None:
+         timestamp_ns = time.monotonic_ns()
+      with self._changed:
+         self.total += 1
+         if self.first_timestamp_ns is None:
+            self.first_timestamp_ns = timestamp_ns
+         self.last_timestamp_ns = timestamp_ns
+         if self.window_ns is not None:
+            self._window_timestamps.append(timestamp_ns)
+            self._expire(timestamp_ns)
+         self._changed.notify_all()
+      return True
+
+   def _expire(self, now_ns):
+      """
+Remove the timestamps which are out of the sliding time window. Must be called with the lock held.
+      """
+      window_start = now_ns - self.window_ns
+      timestamps = self._window_timestamps
+      while timestamps and timestamps[0] <= window_start:
+         timestamps.popleft()
+
+   def _get_count(self, now_ns=None):
+      """
+Get the number of counted matches. Must be called with the lock held.
+      """
+      if self.window_ns is None:
+         return self.total
+      if now_ns is not None:
+         self._expire(now_ns)
+      return len(self._window_timestamps)
+
+   def _snapshot(self, now_ns=None):
+      """
+Get the statistics of the counter. Must be called with the lock held.
+      """
+      count = self._get_count(now_ns)
+      if self.window_ns is None:
+         first_timestamp_ns = self.first_timestamp_ns
+      else:
+         first_timestamp_ns = self._window_timestamps[0] if self._window_timestamps else None
+      return {
+         'count': count,
+         'total': self.total,
+         'first_timestamp_ns': first_timestamp_ns,
+         'last_timestamp_ns': self.last_timestamp_ns if count else None
+      }
+
+   def wait(self, count, timeout=0):
+      """
+Wait until the number of matches (within the sliding time window) has reached a value.
+
+**Arguments:**
+
+* ``count``
+
+  / *Condition*: required / *Type*: int /
+
+  Number of matches to wait for.
+
+* ``timeout``
+
+  / *Condition*: optional / *Type*: float / *Default*: 0 /
+
+  Maximum time to wait in seconds.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  Statistics of the counter, refer to get_statistics(), with the additional key 'reached' (bool).
+      """
+      deadline = time.monotonic() + float(timeout)
+      with self._changed:
+         while True:
+            if self._get_count(time.monotonic_ns()) >= count:
+               reached = True
+               break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+               reached = False
+               break
+            self._changed.wait(remaining)
+         statistics = self._snapshot()
+      statistics['reached'] = reached
+      return statistics
+
+   def get_statistics(self):
+      """
+Get the statistics of the counter.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  count: number of matches (within the sliding time window), total: number of matches since start,
+  first_timestamp_ns / last_timestamp_ns: monotonic receive time of the first and last counted match.
+      """
+      with self._changed:
+         return self._snapshot(time.monotonic_ns())
+
+   def close(self):
+      """
+Release the waiting threads of a stopped counter.
+
+**Returns:**
+
+(*no returns*)
+      """
+      with self._changed:
+         self._changed.notify_all()
+
+
+class TraceAggregator(object):
+   """
+Trace subscriber which extracts the numeric values of the named groups of its search pattern and keeps running
+statistics per group. The memory consumption doesn't depend on the number of trace messages.
+   """
+   def __init__(self, search_regex, percentiles=constants.TRACE_AGGREGATION_DEFAULT_PERCENTILES):
+      """
+Constructor for TraceAggregator class.
+
+**Arguments:**
+
+* ``search_regex``
+
+  / *Condition*: required / *Type*: re.Pattern /
+
+  Regular expression with named groups, e.g. 'cpu load (?P<load>\\d+)%'.
+
+* ``percentiles``
+
+  / *Condition*: optional / *Type*: list / *Default*: (50, 90, 99) /
+
+  Percentiles to be estimated per group.
+      """
+      if not search_regex.groupindex:
+         raise ValueError("The pattern '%s' doesn't contain any named group." % search_regex.pattern)
+      self.search_regex = search_regex
+      self.group_names = tuple(search_regex.groupindex)
+      self.percentiles = tuple(percentiles)
+      self.invalid = 0
+      self._lock = threading.Lock()
+      self._statistics = {name: RunningStatistics(self.percentiles) for name in self.group_names}
+
+   def get_prefilter_literal(self):
+      """
+Get the literal substring a trace message must contain to be possibly matched by this aggregator.
+
+**Returns:**
+
+  / *Type*: str /
+
+  The literal substring. None if every trace message has to be processed by this aggregator.
+      """
+      return extract_required_literal(self.search_regex)
+
+   def process(self, msg, seq=None, timestamp_ns=None):
+      """
+Add the values of the named groups to the statistics if a trace message matches the search pattern.
+Values which are no finite numbers (including "nan" and "inf") are counted as invalid.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Received trace message.
+
+* ``seq``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Sequence number of the message in the trace history of the connection (unused).
+
+* ``timestamp_ns``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Monotonic receive time of the message in nanoseconds (unused).
+
+**Returns:**
+
+  / *Type*: bool /
+
+  True if the message matched the aggregation pattern.
+      """
+      match = self.search_regex.search(msg)
+      if match is None:
+         return False
+      with self._lock:
+         for name, value in match.groupdict().items():
+            if value is None:
+               continue
+            try:
+               value = float(value)
+            except ValueError:
+               value = math.nan
+            if math.isfinite(value):
+               self._statistics[name].add(value)
+            else:
+               # 'nan' and 'inf' are accepted by float() but would spoil the running statistics
+               self.invalid += 1
+      return True
+
+   def get_snapshot(self, reset=False):
+      """
+Get the current statistics of all named groups.
+
+**Arguments:**
+
+* ``reset``
+
+  / *Condition*: optional / *Type*: bool / *Default*: False /
+
+  Discard the statistics after taking the snapshot.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  Statistics per group name, refer to RunningStatistics.get_snapshot(), and 'invalid': number of values which are no finite numbers.
+      """
+      with self._lock:
+         snapshot = {name: statistics.get_snapshot() for name, statistics in self._statistics.items()}
+         snapshot['invalid'] = self.invalid
+         if reset:
+            self._reset()
+      return snapshot
+
+   def reset(self):
+      """
+Discard the statistics of all named groups.
+
+**Returns:**
+
+(*no returns*)
+      """
+      with self._lock:
+         self._reset()
+
+   def _reset(self):
+      for statistics in self._statistics.values():
+         statistics.reset()
+      self.invalid = 0
+
+   def close(self):
+      """
+Nothing to release for a stopped aggregator.
+
+**Returns:**
+
+(*no returns*)
+      """
+      pass
+
+
+class TraceDispatchIndex(object):
+   """
+Index over a set of trace filters.
+
+Every filter with a required literal substring is only processed if the trace message contains that literal.
+Filters sharing the same literal are grouped, so each literal is checked once per trace message.
+Plain substring checks are used instead of a combined alternation since they are faster for the usual number of waiters.
+   """
+   def __init__(self, trace_filters):
+      """
+Constructor for TraceDispatchIndex class.
+
+**Arguments:**
+
+* ``trace_filters``
+
+  / *Condition*: required / *Type*: iterable /
+
+  Trace filters to be indexed.
+      """
+      unconditional = []
+      by_literal = {}
+      for trace_filter in trace_filters:
+         literal = trace_filter.get_prefilter_literal()
+         if literal is None:
+            unconditional.append(trace_filter)
+         else:
+            by_literal.setdefault(literal, []).append(trace_filter)
+
+      self.unconditional_filters = tuple(unconditional)
+      self.literal_filters = tuple((literal, tuple(filters)) for literal, filters in by_literal.items())
+
+   def dispatch(self, msg, seq=None, timestamp_ns=None):
+      """
+Process a trace message by all trace filters which can possibly match it.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Received trace message.
+
+* ``seq``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Sequence number of the message in the trace history of the connection.
+
+* ``timestamp_ns``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Monotonic receive time of the message in nanoseconds. None for the current time.
+
+**Returns:**
+
+  / *Type*: bool /
+
+  True if the message matched at least one trace filter.
+      """
+      matched = False
+      for trace_filter in self.unconditional_filters:
+         if trace_filter.process(msg, seq, timestamp_ns):
+            matched = True
+
+      for literal, filters in self.literal_filters:
+         if literal in msg:
+            for trace_filter in filters:
+               if trace_filter.process(msg, seq, timestamp_ns):
+                  matched = True
+      return matched
+
+
+class TraceHandoffBuffer(object):
+   """
+Handoff buffer between the reader stage and the dispatch stage of a connection's receiver pipeline.
+
+The reader appends the received lines, the dispatch stage takes all pending lines at once. Both sides only use the
+atomic append() and popleft() of a deque, so no lock is needed. Every counter is written by one side only.
+   """
+   def __init__(self):
+      """
+Constructor for TraceHandoffBuffer class.
+      """
+      self._lines = deque()
+      self._ready = threading.Event()
+      self.closed = False
+      # written by the reader stage
+      self.pushed = 0
+      self.max_depth = 0
+      # written by the dispatch stage
+      self.dispatched = 0
+      self.batches = 0
+      self.max_batch = 0
+      self.last_lag = 0.0
+      self.max_lag = 0.0
+      self.total_lag = 0.0
+
+   def __len__(self):
+      return len(self._lines)
+
+   def push(self, msg, timestamp_ns=None):
+      """
+Hand a received line over to the dispatch stage.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Received line.
+
+* ``timestamp_ns``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Monotonic time in nanoseconds when the line was read. None for the current time.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._lines.append((time.monotonic_ns() if timestamp_ns is None else timestamp_ns, msg))
+      self.pushed += 1
+      depth = len(self._lines)
+      if depth > self.max_depth:
+         self.max_depth = depth
+      self._ready.set()
+
+   def close(self):
+      """
+Signal the dispatch stage that no more lines will be pushed.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self.closed = True
+      self._ready.set()
+
+   def wait(self, timeout=None):
+      """
+Block until lines are pushed or the buffer is closed.
+
+**Arguments:**
+
+* ``timeout``
+
+  / *Condition*: optional / *Type*: float / *Default*: None /
+
+  Maximum time to wait in seconds.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._ready.wait(timeout)
+
+   def pop_batch(self):
+      """
+Take all pending lines. complete_batch() must be called once the batch has been processed.
+
+**Returns:**
+
+  / *Type*: list /
+
+  Pending (receive timestamp in nanoseconds, line) tuples in receiving order. An empty list if no line is pending.
+      """
+      # Clear before taking the lines, so a line pushed meanwhile wakes up the next wait() immediately.
+      self._ready.clear()
+      batch = []
+      lines = self._lines
+      try:
+         while True:
+            batch.append(lines.popleft())
+      except IndexError:
+         pass
+      return batch
+
+   def complete_batch(self, batch):
+      """
+Account a processed batch. The lag of a line is the time from reading it until its batch has been processed.
+
+**Arguments:**
+
+* ``batch``
+
+  / *Condition*: required / *Type*: list /
+
+  Batch returned by pop_batch().
+
+**Returns:**
+
+(*no returns*)
+      """
+      if not batch:
+         return
+      now = time.monotonic_ns()
+      lag = (now - batch[0][0]) / 1e9
+      if lag > self.max_lag:
+         self.max_lag = lag
+      self.last_lag = (now - batch[-1][0]) / 1e9
+      self.total_lag += (now * len(batch) - sum(ts for ts, _ in batch)) / 1e9
+      self.dispatched += len(batch)
+      self.batches += 1
+      if len(batch) > self.max_batch:
+         self.max_batch = len(batch)
+
+   def get_statistics(self):
+      """
+Get the queue-depth and lag statistics of the pipeline.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  depth: lines waiting for the dispatch stage.
+
+  max_depth: maximum number of waiting lines.
+
+  pushed / dispatched: number of lines handed over / processed by the dispatch stage.
+
+  batches / max_batch: number of batches and the largest batch processed by the dispatch stage.
+
+  last_lag / max_lag / mean_lag: time in seconds from reading a line until it has been dispatched.
+      """
+      dispatched = self.dispatched
+      return {
+         'depth': len(self._lines),
+         'max_depth': self.max_depth,
+         'pushed': self.pushed,
+         'dispatched': dispatched,
+         'batches': self.batches,
+         'max_batch': self.max_batch,
+         'last_lag': self.last_lag,
+         'max_lag': self.max_lag,
+         'mean_lag': self.total_lag / dispatched if dispatched else 0.0
+      }
+
+
+class TraceFilterRegistry(object):
+   """
+Registry of the active trace filters of one scope (a single connection or the global scope).
+
+Handles are unique over all registries, so a handle can be deactivated without knowing its scope.
+   """
+   _handle_counter = itertools.count(1)
+   _handle_lock = threading.Lock()
+
+   def __init__(self, name=''):
+      """
+Constructor for TraceFilterRegistry class.
+
+**Arguments:**
+
+* ``name``
+
+  / *Condition*: optional / *Type*: str / *Default*: '' /
+
+  Name of the registry's scope.
+      """
+      self.name = name
+      self._lock = threading.Lock()
+      self._filters = {}
+      self._active_filters = ()
+      self._index = TraceDispatchIndex(())
+
+   def __len__(self):
+      return len(self._active_filters)
+
+   def _rebuild(self):
+      """
+Rebuild the snapshot and the dispatch index of the active filters. Must be called with the lock held.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self._active_filters = tuple(self._filters.values())
+      self._index = TraceDispatchIndex(self._active_filters)
+
+   def add(self, trace_filter):
+      """
+Register a trace filter.
+
+**Arguments:**
+
+* ``trace_filter``
+
+  / *Condition*: required / *Type*: TraceFilter /
+
+  Trace filter to be registered.
+
+**Returns:**
+
+* ``handle``
+
+  / *Type*: int /
+
+  Handle to remove the trace filter.
+      """
+      with TraceFilterRegistry._handle_lock:
+         handle = next(TraceFilterRegistry._handle_counter)
+      with self._lock:
+         self._filters[handle] = trace_filter
+         self._rebuild()
+      return handle
+
+   def remove(self, handle):
+      """
+Remove a registered trace filter.
+
+**Arguments:**
+
+* ``handle``
+
+  / *Condition*: required / *Type*: int /
+
+  Handle returned by add() method.
+
+**Returns:**
+
+  / *Type*: bool /
+
+  True if the trace filter was removed.
+
+  False if no trace filter is registered with the handle.
+      """
+      with self._lock:
+         if handle not in self._filters:
+            return False
+         trace_filter = self._filters.pop(handle)
+         self._rebuild()
+      trace_filter.close()
+      return True
+
+   def get_filters(self):
+      """
+Get a snapshot of the active trace filters. The snapshot is safe to iterate without holding any lock.
+
+**Returns:**
+
+  / *Type*: tuple /
+
+  Active trace filters.
+      """
+      return self._active_filters
+
+   def get_items(self):
+      """
+Get the active trace filters with their handles.
+
+**Returns:**
+
+  / *Type*: list /
+
+  List of (handle, trace filter) tuples.
+      """
+      with self._lock:
+         return list(self._filters.items())
+
+   def dispatch(self, msg, seq=None, timestamp_ns=None):
+      """
+Process a trace message by the active trace filters of this registry.
+
+**Arguments:**
+
+* ``msg``
+
+  / *Condition*: required / *Type*: str /
+
+  Received trace message.
+
+* ``seq``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Sequence number of the message in the trace history of the connection.
+
+* ``timestamp_ns``
+
+  / *Condition*: optional / *Type*: int / *Default*: None /
+
+  Monotonic receive time of the message in nanoseconds. None for the current time.
+
+**Returns:**
+
+  / *Type*: bool /
+
+  True if the message matched at least one trace filter.
+      """
+      return self._index.dispatch(msg, seq, timestamp_ns)
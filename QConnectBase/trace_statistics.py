@@ -0,0 +1,226 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: trace_statistics.py
+#
+# Description:
+#   Provide the streaming statistics of numeric values extracted from trace messages.
+#   The memory consumption doesn't depend on the number of values.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize with running statistics and P-square percentile estimators.
+#
+# *******************************************************************************
+import math
+
+
+class P2Quantile(object):
+   """
+Streaming estimator of a percentile by the P-square algorithm (Jain and Chlamtac, 1985).
+Only five markers are kept, independent of the number of values.
+   """
+   def __init__(self, percentile):
+      """
+Constructor for P2Quantile class.
+
+**Arguments:**
+
+* ``percentile``
+
+  / *Condition*: required / *Type*: float /
+
+  Percentile to be estimated, between 0 and 100.
+      """
+      percentile = float(percentile)
+      if not 0 < percentile < 100:
+         raise ValueError("The percentile must be between 0 and 100 but is %s." % percentile)
+      self.percentile = percentile
+      self._p = percentile / 100.0
+      self._heights = []
+      self._positions = [1, 2, 3, 4, 5]
+      self._desired = [1, 1 + 2 * self._p, 1 + 4 * self._p, 3 + 2 * self._p, 5]
+      self._increments = [0, self._p / 2, self._p, (1 + self._p) / 2, 1]
+
+   def add(self, value):
+      """
+Add a value to the estimation.
+
+**Arguments:**
+
+* ``value``
+
+  / *Condition*: required / *Type*: float /
+
+  The value.
+
+**Returns:**
+
+(*no returns*)
+      """
+      heights = self._heights
+      if len(heights) < 5:
+         heights.append(value)
+         if len(heights) == 5:
+            heights.sort()
+         return
+
+      if value < heights[0]:
+         heights[0] = value
+         k = 0
+      elif value >= heights[4]:
+         heights[4] = value
+         k = 3
+      else:
+         k = 0
+         while value >= heights[k + 1]:
+            k += 1
+
+      positions = self._positions
+      for i in range(k + 1, 5):
+         positions[i] += 1
+      for i in range(5):
+         self._desired[i] += self._increments[i]
+
+      for i in range(1, 4):
+         delta = self._desired[i] - positions[i]
+         if (delta >= 1 and positions[i + 1] - positions[i] > 1) or (delta <= -1 and positions[i - 1] - positions[i] < -1):
+            step = 1 if delta > 0 else -1
+            height = self._parabolic(i, step)
+            if not heights[i - 1] < height < heights[i + 1]:
+               height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+            heights[i] = height
+            positions[i] += step
+
+   def _parabolic(self, i, step):
+      """
+Piecewise-parabolic prediction of the height of marker i moved by step.
+      """
+      heights = self._heights
+      positions = self._positions
+      return heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+         (positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i]) / (positions[i + 1] - positions[i]) +
+         (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1]) / (positions[i] - positions[i - 1]))
+
+   def get_value(self):
+      """
+Get the estimated percentile.
+
+**Returns:**
+
+  / *Type*: float /
+
+  The estimation. None if no value has been added.
+      """
+      heights = self._heights
+      if not heights:
+         return None
+      if len(heights) < 5:
+         ordered = sorted(heights)
+         return ordered[min(len(ordered) - 1, int(math.ceil(self._p * len(ordered))) - 1)]
+      return heights[2]
+
+
+class RunningStatistics(object):
+   """
+Running count, minimum, maximum, mean and variance (Welford's algorithm) plus streaming percentiles of a value series.
+   """
+   def __init__(self, percentiles=()):
+      """
+Constructor for RunningStatistics class.
+
+**Arguments:**
+
+* ``percentiles``
+
+  / *Condition*: optional / *Type*: list / *Default*: () /
+
+  Percentiles to be estimated, between 0 and 100.
+      """
+      self.percentiles = tuple(float(percentile) for percentile in percentiles)
+      self.reset()
+
+   def reset(self):
+      """
+Discard all values.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self.count = 0
+      self.minimum = None
+      self.maximum = None
+      self.mean = 0.0
+      self._m2 = 0.0
+      self._quantiles = [P2Quantile(percentile) for percentile in self.percentiles]
+
+   def add(self, value):
+      """
+Add a value to the statistics.
+
+**Arguments:**
+
+* ``value``
+
+  / *Condition*: required / *Type*: float /
+
+  The value.
+
+**Returns:**
+
+(*no returns*)
+      """
+      self.count += 1
+      if self.minimum is None or value < self.minimum:
+         self.minimum = value
+      if self.maximum is None or value > self.maximum:
+         self.maximum = value
+      delta = value - self.mean
+      self.mean += delta / self.count
+      self._m2 += delta * (value - self.mean)
+      for quantile in self._quantiles:
+         quantile.add(value)
+
+   @property
+   def variance(self):
+      """
+Sample variance of the values. 0.0 for less than two values.
+      """
+      if self.count < 2:
+         return 0.0
+      return self._m2 / (self.count - 1)
+
+   def get_snapshot(self):
+      """
+Get the current statistics.
+
+**Returns:**
+
+  / *Type*: dict /
+
+  count, min, max, mean, variance, stddev and 'percentiles' (dictionary with keys like 'p50', 'p99.9').
+      """
+      variance = self.variance
+      return {
+         'count': self.count,
+         'min': self.minimum,
+         'max': self.maximum,
+         'mean': self.mean if self.count else None,
+         'variance': variance,
+         'stddev': math.sqrt(variance),
+         'percentiles': {'p%g' % quantile.percentile: quantile.get_value() for quantile in self._quantiles}
+      }
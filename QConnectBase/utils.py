@@ -67,6 +67,22 @@ Class for converting dictionary to class object.
    exclude_list = []
    logfile = None
    encoding = 'utf-8'
+   trace_queue_size = constants.TRACE_QUEUE_DEFAULT_SIZE
+   trace_queue_policy = constants.TraceQueuePolicy.DROP_OLDEST
+   trace_queue_block_timeout = constants.TRACE_QUEUE_BLOCK_TIMEOUT
+   trace_history_size = constants.TRACE_HISTORY_DEFAULT_SIZE
+   log_async = False
+   log_queue_size = constants.LOG_QUEUE_DEFAULT_SIZE
+   log_flush_interval = constants.LOG_FLUSH_DEFAULT_INTERVAL
+   log_rotate_size = 0
+   log_rotate_interval = 0.0
+   log_compression = constants.LogCompression.NONE
+   robot_log_policy = constants.RobotLogPolicy.FULL
+   robot_log_sample_rate = constants.ROBOT_LOG_DEFAULT_SAMPLE_RATE
+   robot_log_rate_limit = constants.ROBOT_LOG_DEFAULT_RATE_LIMIT
+   trace_archive = None
+   trace_archive_index_interval = constants.TRACE_ARCHIVE_INDEX_INTERVAL
+   trace_database = None
 
    def __init__(self, **dictionary):
       for k, v in dictionary.items():
@@ -0,0 +1,137 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: TraceServer.py
+#
+# Description:
+#   Local TCP servers for the acceptance tests which send trace lines to their first client.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+#
+# *******************************************************************************
+import socket
+import threading
+import time
+
+
+class TraceServer(object):
+   """
+Local TCP servers sending trace lines to their first client: 'line 0' ... 'line <n-1>' at once or a text in chunks.
+   """
+   ROBOT_LIBRARY_SCOPE = 'SUITE'
+
+   def __init__(self):
+      self._server_sockets = []
+
+   def _start_server(self, serve, *args):
+      """
+Listen on a free port and serve the first client by a background thread.
+      """
+      server_socket = socket.socket()
+      server_socket.bind(('127.0.0.1', 0))
+      server_socket.listen(1)
+      self._server_sockets.append(server_socket)
+      threading.Thread(target=serve, args=(server_socket,) + args, daemon=True).start()
+      return server_socket.getsockname()[1]
+
+   def start_trace_server(self, n_lines):
+      """
+Start the server.
+
+**Arguments:**
+
+* ``n_lines``
+
+  / *Condition*: required / *Type*: int /
+
+  Number of lines sent to the client.
+
+**Returns:**
+
+  / *Type*: int /
+
+  Port of the server on 127.0.0.1.
+      """
+      return self._start_server(self._serve, int(n_lines))
+
+   @staticmethod
+   def _serve(server_socket, n_lines):
+      client_socket, _address = server_socket.accept()
+      client_socket.sendall(''.join('line %d\r\n' % i for i in range(n_lines)).encode())
+      # keep the connection open until the client closes it
+      client_socket.recv(1)
+      client_socket.close()
+
+   def start_chunk_server(self, text, chunk_size):
+      """
+Start a server which waits for a command line of the first client, then sends the UTF-8 encoded text in chunks of
+``chunk_size`` bytes with a short pause after each chunk, so lines and multi-byte characters are split across reads.
+
+**Arguments:**
+
+* ``text``
+
+  / *Condition*: required / *Type*: str /
+
+  Text sent to the client.
+
+* ``chunk_size``
+
+  / *Condition*: required / *Type*: int /
+
+  Number of bytes per chunk.
+
+**Returns:**
+
+  / *Type*: int /
+
+  Port of the server on 127.0.0.1.
+      """
+      return self._start_server(self._serve_chunks, text.encode('utf-8'), int(chunk_size))
+
+   @staticmethod
+   def _serve_chunks(server_socket, data, chunk_size):
+      client_socket, _address = server_socket.accept()
+      client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+      try:
+         command = b''
+         while not command.endswith(b'\n'):
+            received = client_socket.recv(1)
+            if not received:
+               raise ConnectionResetError("closed by the client")
+            command += received
+         for i in range(0, len(data), chunk_size):
+            client_socket.sendall(data[i:i + chunk_size])
+            time.sleep(0.02)
+         client_socket.recv(1)
+      except OSError:
+         # the client disconnected before all chunks were sent
+         pass
+      client_socket.close()
+
+   def stop_trace_server(self):
+      """
+Stop all started servers.
+
+**Returns:**
+
+(*no returns*)
+      """
+      for server_socket in self._server_sockets:
+         server_socket.close()
+      self._server_sockets = []
@@ -0,0 +1,115 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: test_connection_metrics.py
+#
+# Description:
+#   Unit tests of the connection metrics.
+#   Run by 'python -m pytest atest' from the repository root.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+#
+# *******************************************************************************
+from QConnectBase.connection_metrics import ConnectionMetrics, LatencyHistogram, get_text_size
+import pytest
+import random
+
+
+def test_text_size_is_utf8_size():
+   assert get_text_size('abc') == 3
+   assert get_text_size('ä€') == 5
+
+
+def test_connection_metrics_counts_lines_and_peak_rate():
+   metrics = ConnectionMetrics()
+   # 3 lines in second 10, 5 lines in second 11, 1 line in second 13
+   for timestamp_s in [10.1, 10.5, 10.9] + [11.0, 11.2, 11.4, 11.6, 11.8] + [13.5]:
+      metrics.add_received('line ä', 1000, int(timestamp_s * 1e9))
+   metrics.add_sent('cmd')
+   metrics.connects = 2
+   snapshot = metrics.get_snapshot()
+   assert (snapshot['lines_received'], snapshot['bytes_received']) == (9, 63)
+   assert (snapshot['lines_sent'], snapshot['bytes_sent']) == (1, 3)
+   assert snapshot['peak_lines_per_second'] == 5
+   assert snapshot['reconnects'] == 1
+   assert snapshot['read_time'] == 9e-6
+   # the last complete second of the received lines is long over
+   assert snapshot['lines_per_second'] == 0
+
+
+def _exact_percentile(values, percentile):
+   ordered = sorted(values)
+   return ordered[max(int(-(-percentile * len(ordered) // 100)), 1) - 1]
+
+
+def test_latency_histogram_percentiles_within_relative_error():
+   generator = random.Random(24)
+   values = [int(generator.lognormvariate(13, 2)) for _i in range(20000)] + [0, 5, 127, 128, 2 ** 45]
+   histogram = LatencyHistogram()
+   for value in values:
+      histogram.record(value)
+   assert (histogram.count, histogram.minimum, histogram.maximum, histogram.total) == (len(values), 0, 2 ** 45, sum(values))
+   for percentile in (1, 50, 90, 99, 99.9, 100):
+      exact = _exact_percentile(values, percentile)
+      estimate = histogram.get_percentile(percentile)
+      assert exact <= estimate <= max(exact * (1 + 2 ** -6), exact + 1)
+   # values below 2^7 ns are counted exactly
+   small = LatencyHistogram()
+   for value in (3, 3, 7, -5):
+      small.record(value)
+   assert [small.get_percentile(percentile) for percentile in (25, 50, 75, 100)] == [0, 3, 3, 7]
+   assert LatencyHistogram().get_percentile(50) is None
+
+
+def test_latency_histogram_merge_copy_and_snapshot():
+   first = LatencyHistogram()
+   second = LatencyHistogram()
+   for value in range(1000, 2000):
+      first.record(value * 1000)
+      second.record(value * 2000)
+   merged = first.copy()
+   merged.merge(second)
+   merged.merge(LatencyHistogram())
+   assert (merged.count, merged.minimum, merged.maximum) == (2000, 1000000, 3998000)
+   assert first.count == 1000
+   snapshot = merged.get_snapshot([50, 99.9])
+   assert snapshot['count'] == 2000
+   assert (snapshot['min'], snapshot['max']) == (0.001, 0.003998)
+   assert snapshot['mean'] == pytest.approx((first.total + second.total) / 2000 / 1e9)
+   assert sorted(snapshot['percentiles']) == ['p50', 'p99.9']
+   assert snapshot['percentiles']['p50'] == pytest.approx(0.002, rel=0.02)
+   assert LatencyHistogram().get_snapshot([50]) == {'count': 0, 'min': None, 'max': None, 'mean': None, 'percentiles': {'p50': None}}
+   with pytest.raises(ValueError):
+      merged.merge(LatencyHistogram(sub_bucket_bits=5))
+
+
+def test_latency_histogram_difference_counts_latencies_since_copy():
+   histogram = LatencyHistogram()
+   for value in range(1000, 2000):
+      histogram.record(value * 1000)
+   older = histogram.copy()
+   for value in (5, 300000, 300000):
+      histogram.record(value)
+   difference = histogram.get_difference(older)
+   assert (difference.count, difference.total, difference.minimum) == (3, 600005, 5)
+   assert 300000 <= difference.maximum <= 300000 * (1 + 2 ** -6)
+   assert difference.get_percentile(50) == difference.maximum
+   assert histogram.count == 1003
+   unchanged = histogram.get_difference(histogram.copy())
+   assert (unchanged.count, unchanged.minimum, unchanged.maximum) == (0, None, None)
+   assert histogram.get_difference(None).count == 1003
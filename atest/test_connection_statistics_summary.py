@@ -0,0 +1,117 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: test_connection_statistics_summary.py
+#
+# Description:
+#   Tests of the connection statistics summary which is logged at the end of each suite.
+#   Run by 'python -m pytest atest' from the repository root.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+#
+# *******************************************************************************
+from robot.api import ExecutionResult
+import os
+import subprocess
+import sys
+
+ATEST_DIR = os.path.dirname(os.path.abspath(__file__))
+TRACE_SERVER = os.path.join(ATEST_DIR, 'libraries', 'TraceServer.py')
+
+SETTINGS = """*** Settings ***
+Library     QConnectBase.ConnectionManager
+Library     %s
+""" % TRACE_SERVER
+
+CONNECT = """
+Connect To Trace Server
+    [Arguments]    ${conn_name}    ${n_lines}
+    ${port}=    start trace server    ${n_lines}
+    ${config}=    create dictionary    address=127.0.0.1    port=${port}    logfile=nonlog    robot_log_policy=none
+    connect  conn_name=${conn_name}    conn_type=TCPIPClient    conn_conf=${config}
+    # most of the lines are still waiting for the dispatch thread when all of them are received
+    wait until keyword succeeds    30s    10ms    All Lines Received    ${conn_name}    ${n_lines}
+
+All Lines Received
+    [Arguments]    ${conn_name}    ${n_lines}
+    ${statistics}=    get connection statistics    ${conn_name}
+    should be equal as integers    ${statistics}[lines_received]    ${n_lines}
+"""
+
+# connection opened twice under the same name, closed in the suite teardown
+RECONNECT_SUITE = SETTINGS + """Suite Teardown  Disconnect And Stop    RECONNECT_CONN
+
+*** Test Cases ***
+Reconnect
+    Connect To Trace Server    RECONNECT_CONN    ${20000}
+    disconnect    RECONNECT_CONN
+    Connect To Trace Server    RECONNECT_CONN    ${20000}
+
+*** Keywords ***
+Disconnect And Stop
+    [Arguments]    ${conn_name}
+    disconnect    ${conn_name}
+    stop trace server
+""" + CONNECT
+
+# connection which stays open, suite without suite teardown
+OPEN_SUITE = SETTINGS + """
+*** Test Cases ***
+Stay Connected
+    Connect To Trace Server    OPEN_CONN    ${2000}
+
+*** Keywords ***
+""" + CONNECT
+
+# closes the idle connection of the previous suite
+CLEANUP_SUITE = SETTINGS + """
+*** Test Cases ***
+Disconnect
+    disconnect    OPEN_CONN
+    stop trace server
+"""
+
+
+def test_summary_of_each_suite_counts_its_own_traffic(tmp_path):
+   suites = tmp_path / 'suites'
+   suites.mkdir()
+   (suites / '01_reconnect.robot').write_text(RECONNECT_SUITE)
+   (suites / '02_open.robot').write_text(OPEN_SUITE)
+   (suites / '03_cleanup.robot').write_text(CLEANUP_SUITE)
+   # the suites run in their own process, so the global library instance doesn't outlive them
+   env = dict(os.environ, PYTHONPATH=os.path.dirname(ATEST_DIR))
+   run = subprocess.run([sys.executable, '-m', 'robot', '--outputdir', str(tmp_path), '--log', 'NONE', '--report', 'NONE',
+                         str(suites)], cwd=str(tmp_path), env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+   assert run.returncode == 0, run.stdout
+
+   # the summary of a suite with suite teardown is part of the log
+   result = ExecutionResult(str(tmp_path / 'output.xml'))
+   (reconnect_suite, open_suite, _cleanup_suite) = result.suite.suites
+   messages = [msg.message for msg in reconnect_suite.teardown.messages]
+   assert len(messages) == 1
+   # both sessions with all their lines, the second one is counted after its threads have stopped
+   assert 'RECONNECT_CONN: 40000 lines' in messages[0]
+   assert 'read to dispatch' in messages[0] and '(40000)' in messages[0]
+   assert 'OPEN_CONN' not in messages[0]
+   assert not open_suite.has_teardown
+
+   # the summary of a suite without suite teardown is written to the console, the traffic of the previous suite
+   # and of the idle open connection is not repeated
+   output = run.stdout
+   assert output.count('OPEN_CONN: 2000 lines') == 1
+   assert 'RECONNECT_CONN' not in output
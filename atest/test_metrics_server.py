@@ -0,0 +1,106 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: test_metrics_server.py
+#
+# Description:
+#   Unit tests of the metrics endpoint: Prometheus text format, HTTP and Unix socket handling.
+#   Run by 'python -m pytest atest' from the repository root.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+#
+# *******************************************************************************
+from QConnectBase.metrics_server import MetricsServer, format_prometheus
+import json
+import os
+import pytest
+import socket
+import urllib.request
+
+METRICS = {
+   'conn "a"': {
+      'lines_received': 3,
+      'uptime': 1.5,
+      'peak_lines_per_second': float('inf'),
+      'threads': {'receiver': True, 'dispatch': False},
+      'match_latency': {'count': 2, 'mean': 0.25, 'percentiles': {'p50': 0.125, 'p99': float('nan')}},
+      'dispatch_delay': {'count': 0, 'mean': None, 'percentiles': {}}
+   },
+   'conn_b': {
+      'lines_received': 0,
+      'uptime': float('-inf')
+   }
+}
+
+
+def test_format_prometheus():
+   lines = format_prometheus(METRICS, prefix='qc').splitlines()
+   assert '# TYPE qc_lines_received_total counter' in lines
+   assert 'qc_lines_received_total{connection="conn \\"a\\""} 3.0' in lines
+   assert 'qc_lines_received_total{connection="conn_b"} 0.0' in lines
+   assert 'qc_peak_lines_per_second{connection="conn \\"a\\""} +Inf' in lines
+   assert 'qc_uptime_seconds{connection="conn_b"} -Inf' in lines
+   assert 'qc_thread_alive{connection="conn \\"a\\"",thread="dispatch"} 0.0' in lines
+   assert 'qc_match_latency_seconds{connection="conn \\"a\\"",quantile="0.5"} 0.125' in lines
+   assert 'qc_match_latency_seconds{connection="conn \\"a\\"",quantile="0.99"} NaN' in lines
+   assert 'qc_match_latency_seconds_sum{connection="conn \\"a\\""} 0.5' in lines
+   assert 'qc_match_latency_seconds_count{connection="conn \\"a\\""} 2' in lines
+   assert 'qc_dispatch_delay_seconds_count{connection="conn \\"a\\""} 0' in lines
+   assert not [line for line in lines if 'inf' in line or 'nan' in line]
+
+
+def test_http_endpoint():
+   server = MetricsServer(lambda: METRICS)
+   try:
+      with urllib.request.urlopen(server.url, timeout=5) as response:
+         assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+         assert response.read().decode('utf-8') == format_prometheus(METRICS)
+      with urllib.request.urlopen(server.url + '.json', timeout=5) as response:
+         assert json.loads(response.read().decode('utf-8'))['conn_b']['lines_received'] == 0
+   finally:
+      server.stop()
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="Unix sockets are not supported")
+def test_unix_socket_replaces_only_sockets(tmp_path):
+   path = str(tmp_path / 'metrics.sock')
+   stale_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+   stale_socket.bind(path)
+   stale_socket.close()
+   server = MetricsServer(lambda: METRICS, unix_socket=path)
+   client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+   try:
+      client.connect(path)
+      client.sendall(b'GET /metrics HTTP/1.0\r\n\r\n')
+      response = b''
+      data = client.recv(65536)
+      while data:
+         response += data
+         data = client.recv(65536)
+      assert response.startswith(b'HTTP/1.0 200')
+   finally:
+      client.close()
+      server.stop()
+   assert not os.path.exists(path)
+
+   with open(path, 'w') as regular_file:
+      regular_file.write('keep')
+   with pytest.raises(ValueError):
+      MetricsServer(lambda: METRICS, unix_socket=path)
+   with open(path) as regular_file:
+      assert regular_file.read() == 'keep'
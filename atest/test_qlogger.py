@@ -0,0 +1,130 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: test_qlogger.py
+#
+# Description:
+#   Unit tests of the trace log file handlers.
+#   Run by 'python -m pytest atest' from the repository root.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+#
+# *******************************************************************************
+from QConnectBase.qlogger import LogSegmentArchiver, QAsyncHandler, QBaseFileHandler
+from QConnectBase.utils import DictToClass
+import gzip
+import json
+import logging
+import os
+import time
+
+
+def _write_records(handler, n_records):
+   for i in range(n_records):
+      handler.handle(logging.LogRecord('test', logging.INFO, __file__, 0, 'record %04d' % i, None, None))
+
+
+def test_rotated_segments_are_compressed_and_indexed(tmp_path):
+   log_path = str(tmp_path / 'trace.log')
+   handler = QBaseFileHandler(log_path, 'a', DictToClass(log_rotate_size=1000, log_compression='gzip'))
+   _write_records(handler, 300)
+   handler.close()
+
+   entries = QBaseFileHandler.read_segment_index(log_path)
+   assert len(entries) > 1
+   assert [entry['number'] for entry in entries] == list(range(1, len(entries) + 1))
+   assert sum(entry['records'] for entry in entries) == 300
+   lines = []
+   for entry in entries:
+      assert entry['segment'].endswith('.log.gz')
+      assert entry['first_time'] <= entry['last_time']
+      with gzip.open(entry['path'], 'rt') as segment:
+         lines.extend(segment.read().splitlines())
+   assert lines == ['record %04d' % i for i in range(300)]
+   # the last segment is closed with the handler, no uncompressed file is left
+   assert sorted(name for name in os.listdir(tmp_path) if not name.endswith('.gz')) == ['trace.log.index.jsonl']
+
+
+def test_time_range_selects_segments(tmp_path):
+   log_path = str(tmp_path / 'trace.log')
+   handler = QBaseFileHandler(log_path, 'a', DictToClass(log_rotate_size=500))
+   _write_records(handler, 100)
+   handler.close()
+   entries = QBaseFileHandler.read_segment_index(log_path)
+   last = entries[-1]
+   assert QBaseFileHandler.read_segment_index(log_path, start_time=last['last_time'] + 1) == []
+   assert QBaseFileHandler.read_segment_index(log_path, start_time=last['first_time'])[-1]['number'] == last['number']
+
+
+def test_failed_compression_keeps_segment_in_index(tmp_path):
+   segment_path = str(tmp_path / 'trace.0001.log')
+   with open(segment_path, 'w') as segment:
+      segment.write('record\n')
+   # the compressed file can't be created because a directory is in the way
+   os.mkdir(segment_path + '.gz')
+   index_path = str(tmp_path / 'trace.log.index.jsonl')
+   archiver = LogSegmentArchiver(index_path, 'gzip')
+   archiver.submit(segment_path, {'segment': 'trace.0001.log', 'number': 1})
+   archiver.close()
+
+   with open(index_path) as index_file:
+      entries = [json.loads(line) for line in index_file]
+   assert entries == [{'segment': 'trace.0001.log', 'number': 1}]
+   assert os.path.exists(segment_path)
+
+
+class _SlowHandler(logging.Handler):
+   """
+Handler without stream which needs some time per record.
+   """
+   def __init__(self):
+      logging.Handler.__init__(self)
+      self.messages = []
+
+   def emit(self, record):
+      time.sleep(0.001)
+      self.messages.append(record.getMessage())
+
+
+def test_async_handler_writes_all_records_across_rotation(tmp_path):
+   log_path = str(tmp_path / 'trace.log')
+   target = QBaseFileHandler(log_path, 'a', DictToClass(log_rotate_size=1000))
+   target.setFormatter(logging.Formatter('%(message)s'))
+   handler = QAsyncHandler(target, maxsize=0, flush_interval=0.05)
+   _write_records(handler, 300)
+   handler.close()
+   assert handler.get_statistics() == {'written': 300, 'dropped': 0, 'pending': 0, 'maxsize': 0}
+   lines = []
+   for entry in QBaseFileHandler.read_segment_index(log_path):
+      with open(entry['path']) as segment:
+         lines.extend(segment.read().splitlines())
+   assert lines == ['record %04d' % i for i in range(300)]
+
+
+def test_async_handler_drops_records_if_queue_is_full():
+   target = _SlowHandler()
+   handler = QAsyncHandler(target, maxsize=10)
+   _write_records(handler, 200)
+   handler.close()
+   statistics = handler.get_statistics()
+   assert statistics['dropped'] > 0
+   assert statistics['written'] + statistics['dropped'] == 200
+   assert target.messages == sorted(target.messages)
+   # records after close are ignored
+   _write_records(handler, 1)
+   assert handler.get_statistics() == statistics
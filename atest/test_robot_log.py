@@ -0,0 +1,196 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: test_robot_log.py
+#
+# Description:
+#   Unit tests of the Robot Framework logging facade.
+#   Run by 'python -m pytest atest' from the repository root.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+#
+# *******************************************************************************
+from QConnectBase.connection_base import BrokenConnError, ConnectionBase
+from QConnectBase.robot_log import RobotLog, TraceLogForwarder
+import QConnectBase.connection_base
+import QConnectBase.constants as constants
+import QConnectBase.robot_log
+import pytest
+import threading
+
+
+class _LevelObject(object):
+   """
+Stand-in of the log level object of a running Robot Framework.
+   """
+   def __init__(self, priority):
+      self.priority = priority
+
+
+@pytest.fixture
+def written(monkeypatch):
+   messages = []
+
+   class _BuiltIn(object):
+      def log(self, msg, level):
+         messages.append((level, msg))
+
+   monkeypatch.setattr(QConnectBase.robot_log, 'BuiltIn', _BuiltIn)
+   return messages
+
+
+def test_log_level_outside_robot_is_info(written):
+   log_facade = RobotLog()
+   assert not log_facade.is_enabled(constants.LOG_LEVEL_DEBUG)
+   assert log_facade.is_enabled(constants.LOG_LEVEL_INFO)
+   assert log_facade.is_enabled(constants.LOG_LEVEL_WARNING)
+   # the message isn't formatted if its level is disabled
+   log_facade.debug("%d lines", "not a number")
+   log_facade.log("%d lines", constants.LOG_LEVEL_DEBUG, "not a number")
+   log_facade.info("%d lines", 3)
+   assert written == [(constants.LOG_LEVEL_INFO, "3 lines")]
+
+
+def test_log_level_follows_robot_level_object():
+   log_facade = RobotLog()
+   level_obj = _LevelObject(RobotLog.LEVEL_PRIORITIES[constants.LOG_LEVEL_WARNING])
+   log_facade._level_obj = level_obj
+   assert not log_facade.is_enabled(constants.LOG_LEVEL_INFO)
+   # 'Set Log Level' changes the level object, no refresh needed
+   level_obj.priority = RobotLog.LEVEL_PRIORITIES[constants.LOG_LEVEL_DEBUG]
+   assert log_facade.is_enabled(constants.LOG_LEVEL_DEBUG)
+   assert not log_facade.is_enabled('TRACE')
+
+
+@pytest.fixture
+def forwarded(monkeypatch):
+   written = []
+   monkeypatch.setattr(QConnectBase.robot_log.robot_log, 'info', lambda msg, *args: written.append(msg))
+   return written
+
+
+@pytest.mark.parametrize('policy, expected', [
+   (constants.RobotLogPolicy.FULL, ['line %d' % i for i in range(10)]),
+   (constants.RobotLogPolicy.SAMPLED, ['line 0', 'line 4', 'line 7', 'line 8']),
+   (constants.RobotLogPolicy.MATCHES_ONLY, ['line 7']),
+   (constants.RobotLogPolicy.NONE, [])
+])
+def test_trace_log_forwarder_policies(forwarded, policy, expected):
+   forwarder = TraceLogForwarder('conn', policy, sample_rate=4)
+   for i in range(10):
+      forwarder.forward('line %d' % i, matched=i == 7)
+   assert forwarded == expected
+   assert forwarder.get_statistics() == {'policy': policy, 'forwarded': len(expected), 'suppressed': 10 - len(expected)}
+   forwarder.close()
+   if len(expected) < 10:
+      assert forwarded[-1] == "[conn] %d of 10 trace lines were forwarded to the Robot log (policy '%s'), the complete " \
+                              "trace is in the trace log file." % (len(expected), policy)
+
+
+def test_trace_log_forwarder_rate_cap(forwarded):
+   forwarder = TraceLogForwarder('conn', constants.RobotLogPolicy.RATE_CAPPED, rate_limit=3)
+   for i in range(10):
+      forwarder.forward('line %d' % i, matched=i == 8)
+   assert forwarded == ['line 0', 'line 1', 'line 2', 'line 8']
+   # the next window starts after one second
+   forwarder._window_start -= 1.0
+   forwarder.forward('line 10')
+   assert forwarded[-2:] == ['[conn] 6 trace lines suppressed (rate limit 3 lines/s)', 'line 10']
+   with pytest.raises(ValueError):
+      TraceLogForwarder('conn', 'all')
+
+
+class _RobotLogger(object):
+   """
+Stand-in of robot.api.logger recording the written messages.
+   """
+   def __init__(self):
+      self.messages = []
+
+   def write(self, msg, level):
+      self.messages.append((level, msg))
+
+
+def test_messages_of_background_threads_are_deferred(monkeypatch):
+   robot_logger = _RobotLogger()
+   monkeypatch.setattr(QConnectBase.robot_log, 'logger', robot_logger)
+   log_facade = RobotLog()
+   log_facade._priority = RobotLog.LEVEL_PRIORITIES[constants.LOG_LEVEL_DEBUG]
+   log_facade._defer = True
+   log_facade.max_deferred = 5
+
+   def log_in_background():
+      for i in range(3):
+         log_facade.info("message %d", i)
+      log_facade.warning("warning")
+      for i in range(3):
+         log_facade.debug("debug %d", i)
+
+   background_thread = threading.Thread(target=log_in_background, name="conn-dispatch")
+   background_thread.start()
+   background_thread.join()
+   assert log_facade.get_pending_count() == 5
+   assert log_facade.dropped == 2
+
+   # only the Robot Framework thread writes the messages
+   flush_thread = threading.Thread(target=log_facade.flush)
+   flush_thread.start()
+   flush_thread.join()
+   assert robot_logger.messages == []
+
+   log_facade.flush()
+   assert log_facade.get_pending_count() == 0
+   assert [level for (level, _msg) in robot_logger.messages] == [constants.LOG_LEVEL_INFO, constants.LOG_LEVEL_WARNING,
+                                                                 constants.LOG_LEVEL_DEBUG, constants.LOG_LEVEL_WARNING]
+   (_level, msg) = robot_logger.messages[0]
+   lines = msg.splitlines()
+   assert lines[0] == '[conn-dispatch]'
+   assert [line.split(' ', 1)[1] for line in lines[1:]] == ['message 0', 'message 1', 'message 2']
+   assert robot_logger.messages[-1][1] == "2 log messages of background threads were dropped because the buffer was full."
+
+
+def test_read_errors_of_receiver_thread_are_deferred(monkeypatch):
+   robot_logger = _RobotLogger()
+   monkeypatch.setattr(QConnectBase.robot_log, 'logger', robot_logger)
+   # BuiltIn can't be used by a background thread
+   monkeypatch.setattr(QConnectBase.connection_base, 'BuiltIn', None)
+   log_facade = RobotLog()
+   log_facade._priority = RobotLog.LEVEL_PRIORITIES[constants.LOG_LEVEL_INFO]
+   log_facade._defer = True
+   monkeypatch.setattr(QConnectBase.connection_base, 'robot_log', log_facade)
+   connection = ConnectionBase()
+   reads = [ValueError("garbled"), BrokenConnError("closed")]
+
+   def read():
+      raise reads.pop(0)
+
+   connection._read = read
+   connection._is_connected = True
+
+   def read_in_background():
+      assert connection.read_obj() is None
+      with pytest.raises(BrokenConnError):
+         connection.read_obj()
+
+   background_thread = threading.Thread(target=read_in_background, name="conn-recv")
+   background_thread.start()
+   background_thread.join()
+   assert not connection._is_connected
+   assert [(level, msg) for (_timestamp, _thread_name, level, msg) in log_facade._deferred] == [
+      (constants.LOG_LEVEL_WARNING, "ConnectionBase.read_obj(): garbled"),
+      (constants.LOG_LEVEL_ERROR, "ConnectionBase.read_obj(): closed")]
@@ -0,0 +1,78 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: test_trace_archive.py
+#
+# Description:
+#   Unit tests of the binary trace archive: write/read round trip and time range reads of several connections.
+#   Run by 'python -m pytest atest' from the repository root.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+#
+# *******************************************************************************
+from QConnectBase.trace_archive import TraceArchiveReader, TraceArchiveWriter
+import pytest
+
+MS = 1000000
+
+
+def _write_archive(path, records, index_interval=64):
+   writer = TraceArchiveWriter.open(path, index_interval)
+   for (connection_name, msg, timestamp_ns) in records:
+      writer.write(connection_name, msg, timestamp_ns)
+   writer.close()
+
+
+def _to_wall_time(reader, timestamp_ns):
+   return (timestamp_ns + reader.wall_clock_offset_ns) / 1e9
+
+
+def test_round_trip(tmp_path):
+   path = str(tmp_path / 'trace.qta')
+   records = [('conn_a', 'line %d ä' % i, (1000 + i) * MS) for i in range(1000)]
+   _write_archive(path, records)
+   with TraceArchiveReader(path) as reader:
+      assert reader.get_connection_names() == ['conn_a']
+      result = list(reader.read())
+      assert [msg for (_time, _name, msg) in result] == [msg for (_name, msg, _ts) in records]
+      assert {name for (_time, name, _msg) in result} == {'conn_a'}
+      assert result[0][0] == pytest.approx(_to_wall_time(reader, 1000 * MS), abs=1e-6)
+      assert [msg for (_time, _name, msg) in reader.read(pattern=r'line 99\d')] == ['line %d ä' % i for i in range(990, 1000)]
+      assert len(list(reader.read(max_records=5))) == 5
+
+
+@pytest.mark.parametrize('index_interval', [1, 64, 4096])
+def test_time_range_with_interleaved_connections(tmp_path, index_interval):
+   # the dispatch thread of 'slow' writes its records 50 ms after 'fast' wrote records of the same time
+   path = str(tmp_path / 'trace.qta')
+   records = []
+   for i in range(2000):
+      records.append(('fast', 'fast %d' % i, (1000 + i) * MS))
+      if i >= 50:
+         records.append(('slow', 'slow %d' % (i - 50), (1000 + i - 50) * MS))
+   _write_archive(path, records, index_interval)
+
+   with TraceArchiveReader(path) as reader:
+      for (first, last) in [(0, 100), (500, 700), (1900, 1949), (1960, 2100), (1234, 1234)]:
+         start_ns = (1000 + first) * MS - MS // 2
+         end_ns = (1000 + last) * MS + MS // 2
+         expected = sorted(msg for (_name, msg, timestamp_ns) in records if start_ns <= timestamp_ns <= end_ns)
+         result = reader.read(_to_wall_time(reader, start_ns), _to_wall_time(reader, end_ns))
+         assert sorted(msg for (_time, _name, msg) in result) == expected
+         result = reader.read(_to_wall_time(reader, start_ns), _to_wall_time(reader, end_ns), connection_name='slow')
+         assert sorted(msg for (_time, _name, msg) in result) == [msg for msg in expected if msg.startswith('slow')]
@@ -0,0 +1,78 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: test_trace_database.py
+#
+# Description:
+#   Unit tests of the SQLite trace database: write/query round trip, full-text search with several writers and
+#   reporting of write errors.
+#   Run by 'python -m pytest atest' from the repository root.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+#
+# *******************************************************************************
+from QConnectBase.trace_database import TraceDatabaseReader, TraceDatabaseWriter
+import sqlite3
+
+
+def test_round_trip(tmp_path):
+   path = str(tmp_path / 'traces?#%.db')
+   writer = TraceDatabaseWriter.open(path)
+   for i in range(2500):
+      writer.write('conn_a', 'line %d %s' % (i, 'link down' if i % 100 == 0 else 'ok'), 1000.0 + i)
+   assert writer.flush()
+   assert writer.close()
+   assert writer.inserted == 2500
+   with TraceDatabaseReader(path) as reader:
+      assert len(reader.query()) == 2500
+      assert reader.query(max_records=2) == [(1000.0, 'conn_a', 'line 0 link down'), (1001.0, 'conn_a', 'line 1 ok')]
+      assert [msg for (_time, _name, msg) in reader.query('"link down"', start_time=1050, end_time=1400)] == \
+             ['line 100 link down', 'line 200 link down', 'line 300 link down', 'line 400 link down']
+
+
+def test_full_text_index_with_two_writers(tmp_path):
+   # two writers of the same file, e.g. of two test runs, insert interleaved batches
+   path = str(tmp_path / 'traces.db')
+   writers = [TraceDatabaseWriter(path), TraceDatabaseWriter(path)]
+   for i in range(3000):
+      writers[i % 2].write('conn_%d' % (i % 2), 'trace %d' % i, 1000.0 + i)
+      if i % 250 == 0:
+         writers[(i // 250) % 2].flush()
+   for writer in writers:
+      assert writer.close()
+   with TraceDatabaseReader(path) as reader:
+      for i in (0, 1, 1499, 2998, 2999):
+         assert reader.query('"trace %d"' % i) == [(1000.0 + i, 'conn_%d' % (i % 2), 'trace %d' % i)]
+      assert len(reader.query('trace', connection_name='conn_1')) == 1500
+
+
+def test_insert_error_is_reported(tmp_path):
+   path = str(tmp_path / 'traces.db')
+   writer = TraceDatabaseWriter.open(path)
+   db_connection = sqlite3.connect(path)
+   db_connection.execute("CREATE TRIGGER reject BEFORE INSERT ON traces BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+   db_connection.commit()
+   db_connection.close()
+   for i in range(10):
+      writer.write('conn_a', 'line %d' % i, 1000.0 + i)
+   assert not writer.flush()
+   assert writer.failed == 10
+   assert 'disk full' in writer.error
+   assert not TraceDatabaseWriter.flush_database(path)
+   assert not writer.close()
+   assert not writer.flush()
@@ -0,0 +1,342 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: test_trace_dispatcher.py
+#
+# Description:
+#   Unit tests of the trace filters, queues and dispatch structures of QConnectBase.trace_dispatcher.
+#   Run by 'python -m pytest atest' from the repository root.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+#
+# *******************************************************************************
+from QConnectBase.trace_dispatcher import FetchBlockBuffer, FetchBlockCursor, PatternCache, TraceAggregator, TraceCounter, \
+                                           TraceFilter, TraceFilterRegistry, TraceHandoffBuffer, TraceHistory, TraceMatch, \
+                                           TraceQueue, extract_required_literal, monotonic_ns_to_wall_time
+import QConnectBase.constants as constants
+import pytest
+import queue
+import random
+import re
+import threading
+import time
+
+
+@pytest.mark.parametrize('pattern, flags, literal', [
+   (r'value (\d+) done', 0, 'value '),
+   (r'error: (?P<code>\d+)', 0, 'error: '),
+   (r'(?:abcd)+x', 0, 'abcd'),
+   (r'(?:abcd)*xy', 0, 'xy'),
+   (r'(?i:ABC)xy', 0, 'xy'),
+   (r'.*', 0, None),
+   (r'alpha|beta', 0, None),
+   (r'abc', re.IGNORECASE, None)
+])
+def test_extract_required_literal(pattern, flags, literal):
+   regex = re.compile(pattern, flags)
+   assert extract_required_literal(regex) == literal
+   if literal is not None:
+      # every match contains the literal
+      for msg in ['value 1 done', 'error: 42', 'abcdabcdx', 'xy', 'abcxy', 'ABCxy']:
+         match = regex.search(msg)
+         assert match is None or literal in match.group(0)
+
+
+def test_registry_dispatches_to_matching_filters_only():
+   registry = TraceFilterRegistry('conn')
+   queues = [queue.Queue() for _i in range(4)]
+   handles = [registry.add(TraceFilter(re.compile(pattern), trace_queue))
+              for pattern, trace_queue in zip([r'link (up|down)', r'link down', r'.*', r'(?i)LINK'], queues)]
+   assert len(registry) == 4
+   registry.dispatch('link down')
+   assert [trace_queue.qsize() for trace_queue in queues] == [1, 1, 1, 1]
+   registry.dispatch('link up')
+   assert [trace_queue.qsize() for trace_queue in queues] == [2, 1, 2, 2]
+   assert registry.remove(handles[2])
+   assert not registry.remove(handles[2])
+   registry.dispatch('nothing')
+   assert [trace_queue.qsize() for trace_queue in queues] == [2, 1, 2, 2]
+   assert len(registry.get_filters()) == 3
+
+
+def test_trace_filter_puts_match_with_timestamp():
+   trace_queue = queue.Queue()
+   trace_filter = TraceFilter(re.compile(r'value (\d+)'), trace_queue)
+   assert not trace_filter.process('no match', 1, 100)
+   assert trace_filter.process('value 42', 2, 200)
+   (_time, match) = trace_queue.get_nowait()
+   assert isinstance(match, TraceMatch)
+   assert match.group(1) == '42'
+   assert match.timestamp_ns == 200
+   assert trace_queue.empty()
+
+
+def test_trace_filter_reports_unmatched_fetch_block_by_none():
+   trace_queue = queue.Queue()
+   trace_filter = TraceFilter(re.compile(r'start.*done'), trace_queue, use_fetch_block=True,
+                              end_of_block_regex=re.compile('^end$'), line_filter_regex=re.compile('.*'))
+   for seq, line in enumerate(['start', 'middle', 'end']):
+      trace_filter.process(line, seq)
+   assert trace_queue.get_nowait()[1] is None
+
+
+def test_trace_aggregator_rejects_non_finite_values():
+   aggregator = TraceAggregator(re.compile(r'load (?P<load>\S+)'))
+   for msg in ['load 1', 'load 3', 'load nan', 'load inf', 'load -Infinity', 'load abc']:
+      assert aggregator.process(msg)
+   snapshot = aggregator.get_snapshot()
+   assert snapshot['invalid'] == 4
+   assert snapshot['load']['count'] == 2
+   assert snapshot['load']['mean'] == 2.0
+   assert snapshot['load']['max'] == 3.0
+
+
+def _drain(trace_queue):
+   items = []
+   while not trace_queue.empty():
+      items.append(trace_queue.get_nowait())
+   return items
+
+
+@pytest.mark.parametrize('policy, kept', [
+   (constants.TraceQueuePolicy.DROP_OLDEST, [2, 3, 4]),
+   (constants.TraceQueuePolicy.DROP_NEWEST, [0, 1, 2]),
+   (constants.TraceQueuePolicy.KEEP_LATEST, [3, 4])
+])
+def test_trace_queue_overflow_policies(policy, kept):
+   trace_queue = TraceQueue(3, policy)
+   for i in range(5):
+      trace_queue.put(i)
+   assert trace_queue.dropped == 5 - len(kept)
+   assert trace_queue.get_statistics() == {'size': len(kept), 'maxsize': 3, 'policy': policy, 'dropped': 5 - len(kept)}
+   assert _drain(trace_queue) == kept
+
+
+def test_trace_queue_block_policy_waits_for_consumer_until_closed():
+   trace_queue = TraceQueue(1, constants.TraceQueuePolicy.BLOCK)
+   trace_queue.put(0)
+   producer = threading.Thread(target=lambda: [trace_queue.put(i) for i in (1, 2)])
+   producer.start()
+   assert trace_queue.get(timeout=5) == 0
+   assert trace_queue.get(timeout=5) == 1
+   producer.join(5)
+   assert not producer.is_alive()
+   assert trace_queue.dropped == 0
+
+   producer = threading.Thread(target=trace_queue.put, args=(3,))
+   producer.start()
+   producer.join(0.1)
+   assert producer.is_alive()
+   trace_queue.close()
+   producer.join(5)
+   assert not producer.is_alive()
+   assert trace_queue.dropped == 1
+   assert _drain(trace_queue) == [2]
+
+
+def test_trace_queue_block_policy_waits_at_most_block_timeout():
+   trace_queue = TraceQueue(1, constants.TraceQueuePolicy.BLOCK, block_timeout=0.2)
+   trace_queue.put(0)
+   start = time.monotonic()
+   trace_queue.put(1)
+   assert time.monotonic() - start >= 0.2
+   assert trace_queue.dropped == 1
+   # no waiting without block or with a zero timeout
+   start = time.monotonic()
+   trace_queue.put(2, False)
+   trace_queue.put(3, timeout=0)
+   assert time.monotonic() - start < 0.1
+   assert trace_queue.dropped == 3
+   assert _drain(trace_queue) == [0]
+
+
+def test_trace_filter_waits_for_consumer_with_block_policy():
+   trace_queue = TraceQueue(1, constants.TraceQueuePolicy.BLOCK, block_timeout=5)
+   trace_filter = TraceFilter(re.compile(r'value (\d+)'), trace_queue)
+   dispatcher = threading.Thread(target=lambda: [trace_filter.process('value %d' % i, i) for i in range(3)])
+   dispatcher.start()
+   assert [trace_queue.get(timeout=5)[1].group(1) for _i in range(3)] == ['0', '1', '2']
+   dispatcher.join(5)
+   assert not dispatcher.is_alive()
+   assert trace_queue.dropped == 0
+
+
+def test_trace_queue_rejects_unknown_policy():
+   with pytest.raises(ValueError):
+      TraceQueue(3, 'drop-all')
+
+
+def test_handoff_buffer_hands_over_lines_in_order():
+   handoff = TraceHandoffBuffer()
+   for i in range(5):
+      handoff.push('line %d' % i)
+   assert len(handoff) == 5
+   handoff.wait(5)
+   batch = handoff.pop_batch()
+   assert [msg for (_timestamp_ns, msg) in batch] == ['line %d' % i for i in range(5)]
+   assert handoff.pop_batch() == []
+   handoff.complete_batch(batch)
+   statistics = handoff.get_statistics()
+   assert (statistics['depth'], statistics['max_depth'], statistics['pushed'], statistics['dispatched']) == (0, 5, 5, 5)
+   assert (statistics['batches'], statistics['max_batch']) == (1, 5)
+
+
+def test_handoff_buffer_wakes_up_dispatcher():
+   handoff = TraceHandoffBuffer()
+   received = []
+
+   def dispatch():
+      while not handoff.closed or len(handoff):
+         handoff.wait(5)
+         batch = handoff.pop_batch()
+         received.extend(msg for (_timestamp_ns, msg) in batch)
+         handoff.complete_batch(batch)
+
+   dispatch_thread = threading.Thread(target=dispatch)
+   dispatch_thread.start()
+   for i in range(10000):
+      handoff.push('line %d' % i)
+   handoff.close()
+   dispatch_thread.join(5)
+   assert not dispatch_thread.is_alive()
+   assert received == ['line %d' % i for i in range(10000)]
+   assert handoff.get_statistics()['dispatched'] == 10000
+
+
+def test_pattern_cache_evicts_least_recently_used():
+   cache = PatternCache(2)
+   regex_a = cache.compile('a+')
+   assert cache.compile('a+') is regex_a
+   assert cache.compile('a+', re.IGNORECASE) is not regex_a
+   assert cache.compile('a+') is regex_a
+   cache.compile('b+')
+   assert cache.get_statistics() == {'size': 2, 'maxsize': 2, 'hits': 2, 'misses': 3, 'evictions': 1}
+   # 'a+' with IGNORECASE was least recently used
+   assert cache.compile('a+') is regex_a
+   assert cache.compile(regex_a) is regex_a
+   cache.compile('a+', re.IGNORECASE)
+   assert cache.get_statistics()['evictions'] == 2
+   cache.clear()
+   assert cache.get_statistics() == {'size': 0, 'maxsize': 2, 'hits': 0, 'misses': 0, 'evictions': 0}
+   with pytest.raises(re.error):
+      cache.compile('(')
+
+
+def _random_blocks(seed, n_lines):
+   generator = random.Random(seed)
+   words = ['alpha', 'beta', 'error 17', 'END', 'warn']
+   return [' '.join(generator.choice(words) for _i in range(generator.randint(1, 3))) for _j in range(n_lines)]
+
+
+@pytest.mark.parametrize('pattern', [r'error (\d+)', r'beta\r\nalpha', r'warn.*END$', r'(?s)error.*warn'])
+def test_fetch_block_buffer_skips_only_blocks_which_cannot_match(pattern):
+   search_regex = re.compile(pattern)
+   block_buffer = FetchBlockBuffer(search_regex, maxlen=4)
+   block = []
+   for msg in _random_blocks(1, 3000):
+      block_buffer.append(msg)
+      block = (block + [msg])[-4:]
+      if 'END' in msg:
+         result_obj = block_buffer.complete()
+         expected = search_regex.search('\r\n'.join(block))
+         assert (result_obj and result_obj.group(0)) == (expected and expected.group(0))
+         block = []
+
+
+def test_trace_history_overwrites_oldest_lines():
+   history = TraceHistory(3)
+   assert [history.append('line %d' % i, 100 + i) for i in range(5)] == [0, 1, 2, 3, 4]
+   assert (history.first_seq, history.next_seq, len(history)) == (2, 5, 3)
+   assert history.get_line(1) is None
+   assert history.get_line(4) == 'line 4'
+   assert history.get_lines([1, 2, 3]) == ['line 2', 'line 3']
+   assert history.get_entries(3) == [(3, 103, 'line 3'), (4, 104, 'line 4')]
+   with pytest.raises(ValueError):
+      TraceHistory(0)
+
+
+@pytest.mark.parametrize('line_filter', [None, 'a'])
+def test_fetch_block_cursor_matches_like_buffer(line_filter):
+   search_regex = re.compile(r'error (\d+)\r\n.*END')
+   history = TraceHistory(10)
+   cursor = FetchBlockCursor(search_regex, history, maxlen=4, select_all=line_filter is None)
+   block_buffer = FetchBlockBuffer(search_regex, maxlen=4)
+   for msg in _random_blocks(2, 3000):
+      seq = history.append(msg, 0)
+      if line_filter is not None and line_filter not in msg:
+         continue
+      cursor.append(msg, seq)
+      block_buffer.append(msg, seq)
+      assert len(cursor) == len(block_buffer)
+      if 'END' in msg:
+         result_obj = cursor.complete()
+         expected = block_buffer.complete()
+         assert (result_obj and result_obj.group(0)) == (expected and expected.group(0))
+   cursor.clear()
+   assert len(cursor) == 0
+   assert cursor.complete() is None
+
+
+def test_trace_match_carries_receive_time_and_latency():
+   match = TraceMatch(re.search(r'(?P<value>\d+)', 'value 42'), 3000000000, 1000000000)
+   assert match.group('value') == '42'
+   assert match['value'] == '42'
+   assert match.span() == (6, 8)
+   assert match.latency_ns == 2000000000
+   assert match.wall_time == monotonic_ns_to_wall_time(3000000000)
+   assert TraceMatch(match.match, 0).latency_ns is None
+   assert abs(monotonic_ns_to_wall_time(time.monotonic_ns()) - time.time()) < 1
+
+
+def test_trace_history_finds_first_line_since_time():
+   history = TraceHistory(4)
+   for timestamp_ns in (10, 20, 20, 30, 40, 50):
+      history.append('line %d' % timestamp_ns, timestamp_ns)
+   # lines with 10 and 20 are overwritten
+   assert history.find_seq(0) == 2
+   assert history.find_seq(20) == 2
+   assert history.find_seq(21) == 3
+   assert history.find_seq(50) == 5
+   assert history.find_seq(51) == 6
+   assert TraceHistory(4).find_seq(10) == 0
+
+
+def test_trace_counter_counts_within_sliding_window():
+   counter = TraceCounter(re.compile(r'error \d+'))
+   for i, msg in enumerate(['error 1', 'ok', 'error 2']):
+      counter.process(msg, i, 100 + i)
+   assert counter.get_statistics() == {'count': 2, 'total': 2, 'first_timestamp_ns': 100, 'last_timestamp_ns': 102}
+
+   counter = TraceCounter(re.compile(r'error \d+'), window=10)
+   now_ns = time.monotonic_ns()
+   for delta_s in (20, 5, 1):
+      counter.process('error %d' % delta_s, None, now_ns - delta_s * 1000000000)
+   statistics = counter.wait(2)
+   assert statistics == {'count': 2, 'total': 3, 'first_timestamp_ns': now_ns - 5000000000,
+                         'last_timestamp_ns': now_ns - 1000000000, 'reached': True}
+   assert not counter.wait(3, 0.05)['reached']
+
+
+def test_trace_counter_wakes_up_waiting_thread():
+   counter = TraceCounter(re.compile(r'error'))
+   timer = threading.Timer(0.05, lambda: [counter.process('error') for _i in range(3)])
+   timer.start()
+   statistics = counter.wait(3, 5)
+   timer.join()
+   assert statistics['reached']
+   assert statistics['count'] == 3
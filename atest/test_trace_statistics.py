@@ -0,0 +1,80 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: test_trace_statistics.py
+#
+# Description:
+#   Unit tests of the streaming statistics of trace aggregations: P-square percentile estimator and running statistics.
+#   Run by 'python -m pytest atest' from the repository root.
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+#
+# *******************************************************************************
+from QConnectBase.trace_statistics import P2Quantile, RunningStatistics
+import pytest
+import random
+import statistics
+
+
+def _exact_percentile(values, percentile):
+   ordered = sorted(values)
+   return ordered[int(round(percentile / 100.0 * (len(ordered) - 1)))]
+
+
+@pytest.mark.parametrize('distribution', ['uniform', 'gauss', 'exponential'])
+@pytest.mark.parametrize('percentile', [50, 90, 99])
+def test_p2_quantile_estimates_percentile(distribution, percentile):
+   generator = random.Random(percentile)
+   draw = {'uniform': lambda: generator.uniform(0, 100),
+           'gauss': lambda: generator.gauss(50, 10),
+           'exponential': lambda: generator.expovariate(0.1)}[distribution]
+   values = [draw() for _i in range(20000)]
+   quantile = P2Quantile(percentile)
+   for value in values:
+      quantile.add(value)
+   exact = _exact_percentile(values, percentile)
+   spread = _exact_percentile(values, 99) - _exact_percentile(values, 1)
+   assert abs(quantile.get_value() - exact) < 0.02 * spread
+
+
+def test_p2_quantile_with_few_values():
+   quantile = P2Quantile(50)
+   assert quantile.get_value() is None
+   for value in (5, 1, 3):
+      quantile.add(value)
+   assert quantile.get_value() == 3
+   with pytest.raises(ValueError):
+      P2Quantile(100)
+
+
+def test_running_statistics():
+   generator = random.Random(1)
+   # large offset to check the numerical stability of the variance
+   values = [generator.uniform(-1e6, 1e6) + 1e9 for _i in range(1000)]
+   running = RunningStatistics(percentiles=[50, 99.9])
+   for value in values:
+      running.add(value)
+   snapshot = running.get_snapshot()
+   assert snapshot['count'] == 1000
+   assert (snapshot['min'], snapshot['max']) == (min(values), max(values))
+   assert snapshot['mean'] == pytest.approx(statistics.mean(values))
+   assert snapshot['variance'] == pytest.approx(statistics.variance(values))
+   assert sorted(snapshot['percentiles']) == ['p50', 'p99.9']
+   running.reset()
+   assert running.get_snapshot() == {'count': 0, 'min': None, 'max': None, 'mean': None, 'variance': 0.0, 'stddev': 0.0,
+                                     'percentiles': {'p50': None, 'p99.9': None}}
@@ -0,0 +1,90 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: benchmark_robot_log.py
+#
+# Description:
+#   Compare the per-line logging overhead of the receive path with unconditional BuiltIn().log() DEBUG calls
+#   against the level-gated logging facade, while DEBUG is disabled.
+#
+#   Usage: python tools/benchmark_robot_log.py [number of lines]
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+#
+# *******************************************************************************
+import os
+import sys
+import time
+from inspect import currentframe
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot.libraries.BuiltIn import BuiltIn
+from QConnectBase.robot_log import robot_log
+import QConnectBase.constants as constants
+
+
+class _Connection(object):
+   def _read(self):
+      return "0000000042 2026/10/17 ECU1 NAV CTX1 log info V 2 [route calculated in 12 ms]"
+
+   def read_obj_unconditional(self):
+      """
+Former receive path: method identifier and three DEBUG messages per line.
+      """
+      _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+      BuiltIn().log('%s' % _mident, constants.LOG_LEVEL_DEBUG)
+      BuiltIn().log("%s: reading..." % _mident, constants.LOG_LEVEL_DEBUG)
+      msg = self._read()
+      BuiltIn().log("%s: read: '%s'" % (_mident, msg), constants.LOG_LEVEL_DEBUG)
+      return msg
+
+   def read_obj_gated(self):
+      """
+Current receive path: DEBUG messages are only built if the level is enabled.
+      """
+      msg = self._read()
+      if msg is not None and robot_log.is_enabled(constants.LOG_LEVEL_DEBUG):
+         _mident = '%s.%s()' % (self.__class__.__name__, currentframe().f_code.co_name)
+         BuiltIn().log("%s: read: '%s'" % (_mident, msg), constants.LOG_LEVEL_DEBUG)
+      return msg
+
+
+def measure(func, count):
+   start = time.perf_counter()
+   for _ in range(count):
+      func()
+   return time.perf_counter() - start
+
+
+def main():
+   n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+   connection = _Connection()
+   robot_log.refresh()
+
+   unconditional = measure(connection.read_obj_unconditional, n_lines)
+   gated = measure(connection.read_obj_gated, n_lines)
+
+   print("lines: %d, DEBUG enabled: %s" % (n_lines, robot_log.is_enabled(constants.LOG_LEVEL_DEBUG)))
+   print("unconditional : %8.3f us/line" % (unconditional / n_lines * 1e6))
+   print("gated         : %8.3f us/line" % (gated / n_lines * 1e6))
+   print("speed-up      : %8.1fx" % (unconditional / gated))
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,123 @@
+#  Copyright 2020-2023 Robert Bosch GmbH
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+# *******************************************************************************
+#
+# File: benchmark_trace_dispatch.py
+#
+# Description:
+#   Compare the per-line cost of the indexed trace dispatch engine against the former linear scan
+#   over all active trace filters.
+#
+#   Usage: python tools/benchmark_trace_dispatch.py [number of lines] [number of waiters]
+#
+# History:
+#
+# 17.10.2026 / V 0.1
+# - Initialize
+#
+# *******************************************************************************
+import os
+import queue
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from QConnectBase.connection_base import ConnectionBase
+from QConnectBase.trace_dispatcher import TraceFilter, TraceFilterRegistry
+
+_APPS = ['DLTD', 'SYS', 'NAV', 'HMI', 'AUDI', 'TUNR', 'DIAG', 'NETW']
+_WORDS = ['init', 'state', 'changed', 'request', 'response', 'timer', 'expired', 'value', 'signal', 'received', 'sent', 'ok']
+
+
+def generate_trace(count, seed=1):
+   """
+Generate synthetic ECU trace lines.
+   """
+   rnd = random.Random(seed)
+   lines = []
+   for i in range(count):
+      payload = ' '.join(rnd.choice(_WORDS) for _ in range(rnd.randint(4, 12)))
+      lines.append("%010d %s ECU1 %s CTX%d log info V %d [%s]" % (i, time.strftime("%Y/%m/%d"), rnd.choice(_APPS), rnd.randint(0, 9), rnd.randint(1, 4), payload))
+   return lines
+
+
+def generate_patterns(count):
+   """
+Generate the search patterns of the concurrent waiters.
+   """
+   patterns = [r"boot stage (\d+) finished",
+               r"heartbeat ok seq=(\d+)",
+               r"NAV .*route calculated in (\d+) ms",
+               r"DIAG .*session (\w+) opened",
+               r"error code 0x([0-9a-f]+)",
+               r"HMI .*screen (\w+) visible",
+               r"TUNR .*frequency (\d+\.\d+)",
+               r"cpu load (\d+)%",
+               r"free memory (\d+) kB",
+               r"NETW .*link (up|down)"]
+   return [patterns[i % len(patterns)] + ("" if i < len(patterns) else " #%d" % i) for i in range(count)]
+
+
+def run_linear_scan(connection, filters, lines):
+   """
+Former dispatch: every line is matched against every active filter via ConnectionBase._filter_msg().
+   """
+   for msg in lines:
+      for trace_filter in filters:
+         (is_hit, result_obj) = connection._filter_msg(trace_filter.search_regex, msg)
+         if is_hit:
+            trace_filter.trace_queue.put((time.time(), result_obj), False)
+
+
+def run_indexed(registry, lines):
+   """
+Indexed dispatch engine.
+   """
+   for msg in lines:
+      registry.dispatch(msg)
+
+
+def measure(func, *args):
+   start = time.perf_counter()
+   func(*args)
+   return time.perf_counter() - start
+
+
+def main():
+   n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+   n_waiters = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+
+   lines = generate_trace(n_lines)
+   registry = TraceFilterRegistry('benchmark')
+   filters = []
+   for pattern in generate_patterns(n_waiters):
+      trace_filter = TraceFilter(re.compile(pattern, re.M | re.S | re.U), queue.Queue())
+      filters.append(trace_filter)
+      registry.add(trace_filter)
+
+   connection = ConnectionBase()
+   linear = measure(run_linear_scan, connection, filters, lines)
+   indexed = measure(run_indexed, registry, lines)
+
+   print("lines: %d, concurrent waiters: %d" % (n_lines, n_waiters))
+   print("linear scan : %8.2f us/line" % (linear / n_lines * 1e6))
+   print("indexed     : %8.2f us/line" % (indexed / n_lines * 1e6))
+   print("speed-up    : %8.1fx" % (linear / indexed))
+
+
+if __name__ == "__main__":
+   main()